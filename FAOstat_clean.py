@@ -6,26 +6,48 @@ This script applies the following transformations:
 1. Adds ISO 3-letter country codes
 2. Removes all regions/continents (keeps only countries)
 3. Reorders data chronologically (oldest to newest year)
-4. Standardizes country names to match banana production dataset
+4. Standardizes country names using the shipped canonical_names.csv table
 5. Filters to keep only "Production" element (if applicable)
 6. Removes unnecessary columns (Unit, Value Footnotes, etc.)
 7. Standardizes column names to: Entity, CODE, Year, Value
 
+The raw file is never modified; the cleaned dataset is written to
+clean/<filename> (or the path given with --output).
+
 Usage:
-    python3 FAOstat_clean.py <filename>
+    python3 FAOstat_clean.py <filename> [-o output.csv] [--fill linear|locf|none] [--max-gap 3]
     
 Example:
     python3 FAOstat_clean.py Turkey_production_FAOstat.csv
 """
 
+import argparse
 import csv
 import os
 import sys
 from collections import defaultdict
+from functools import lru_cache
+
+from compact_dataset import CompactRows, EntityTable
+from country_names import load_canonical_names
+from dataset_io import PARQUET_SUFFIX, clean_output_path, iter_long_rows
+from gapfill import DEFAULT_MAX_GAP, FLAG_COLUMN, METHODS as FILL_METHODS, fill_rows
+from offset_index import IndexedWriter, build_index
+from parallel_csv import (CHUNKS_PER_WORKER, iter_range_rows, map_ranges, merge_sorted,
+                          should_parallelize, split_ranges)
+from regions import is_aggregate
+from reshape import write_series_for
+from result_cache import get_result, put_result, result_key
+from schema_detect import detect_schema, iter_wide_rows
+
+# Bump when a change to this script changes its output (invalidates cached results)
+CLEANER_VERSION = 1
 
+@lru_cache(maxsize=None)
 def get_iso_mapping():
     """
     Returns a comprehensive mapping from entity names to ISO 3-letter codes.
+    Built once per process; callers must not modify the returned dict.
     """
     return {
         # Countries with ISO codes
@@ -291,203 +313,284 @@ def get_iso_mapping():
         "World": "",
     }
 
-def load_banana_country_mapping(data_dir):
-    """
-    Load standardized country names from banana file if available.
-    """
-    banana_file = os.path.join(data_dir, "banana-production.csv")
-    iso_to_name = {}
-    
-    if os.path.exists(banana_file):
-        try:
-            with open(banana_file, 'r', newline='', encoding='utf-8') as f:
-                reader = csv.reader(f)
-                header = next(reader)  # Skip header
-                
-                for row in reader:
-                    if len(row) >= 2:
-                        entity_name = row[0]
-                        iso_code = row[1]
-                        
-                        # Skip regions/continents
-                        if (iso_code and len(iso_code) == 3 and iso_code.isupper() and 
-                            not any(region in entity_name for region in [
-                                'Africa', 'Europe', 'World', 'Americas', 'Asia', 'Oceania',
-                                'Caribbean', 'Central', 'Eastern', 'Northern', 'Southern', 
-                                'Western', 'Melanesia', 'Polynesia', 'Micronesia', 'Union',
-                                'Developed', 'Developing', 'Income', 'Island'
-                            ])):
-                            iso_to_name[iso_code] = entity_name
-        except Exception as e:
-            print(f"Warning: Could not load banana mapping: {e}")
-    
-    return iso_to_name
-
 def detect_file_structure(file_path):
     """
     Detect the structure of the input file to determine processing approach.
+    The schema is detected by source signature and cached per file fingerprint.
     """
-    with open(file_path, 'r', newline='', encoding='utf-8') as f:
-        reader = csv.reader(f)
-        header = next(reader)
-        
-        # Check a few rows to understand structure
-        sample_rows = []
-        for i, row in enumerate(reader):
-            sample_rows.append(row)
-            if i >= 5:  # Just check first few rows
-                break
+    schema = detect_schema(file_path)
     
     structure = {
-        'header': header,
-        'has_element': 'Element' in header or any('Element' in col for col in header),
-        'has_unit': 'Unit' in header,
-        'has_footnotes': any('footnote' in col.lower() for col in header),
-        'entity_col': 0,  # Assume first column is entity
-        'year_col': None,
-        'value_col': None
+        'header': schema.header,
+        'schema': schema,
+        'has_element': schema.element_col is not None,
+        'has_unit': schema.unit_col is not None,
+        'has_footnotes': bool(schema.footnote_cols),
+        'entity_col': schema.entity_col or 0,
+        'element_col': schema.element_col,
+        'year_col': schema.year_col,
+        'value_col': schema.value_col
     }
     
-    # Find year and value columns
-    for i, col in enumerate(header):
-        if 'year' in col.lower():
-            structure['year_col'] = i
-        elif 'value' in col.lower() and 'footnote' not in col.lower():
-            structure['value_col'] = i
+    # Wide files (years as columns) are melted to [entity, element, year, value]
+    if schema.layout == 'wide_years':
+        structure.update({
+            'entity_col': 0,
+            'element_col': 1 if schema.element_col is not None else None,
+            'year_col': 2,
+            'value_col': 3
+        })
     
     return structure
 
-def clean_faostat_dataset(file_path):
+def clean_rows(rows, structure, iso_mapping, canonical_names):
     """
-    Main cleaning function that processes any FAOstat dataset.
+    Clean parsed rows of a FAOstat dataset. Returns a dict with
+    'country_data' ({entity: CompactRows of [entity, code, year, value]},
+    each sorted by year) and the row counts used in the summary.
     """
-    print(f"Cleaning FAOstat dataset: {file_path}")
-    
-    # Create backup
-    backup_path = file_path.replace('.csv', '_original_backup.csv')
-    import shutil
-    shutil.copy2(file_path, backup_path)
-    print(f"✓ Backup created: {backup_path}")
-    
-    # Detect file structure
-    structure = detect_file_structure(file_path)
-    print(f"✓ File structure detected")
-    
-    # Load mappings
-    data_dir = os.path.dirname(file_path)
-    iso_mapping = get_iso_mapping()
-    banana_mapping = load_banana_country_mapping(data_dir)
-    print(f"✓ Country mappings loaded ({len(banana_mapping)} from banana dataset)")
-    
-    # Process data
-    country_data = defaultdict(list)
+    table = EntityTable.from_canonical_names(canonical_names)
+    country_data = {}
     rows_processed = 0
     rows_removed = 0
-    countries_found = set()
+    regions_removed = 0
+    unmapped_entities = set()
     
-    with open(file_path, 'r', newline='', encoding='utf-8') as infile:
-        reader = csv.reader(infile)
-        header = next(reader)
+    for row in rows:
+        rows_processed += 1
         
-        for row in reader:
-            rows_processed += 1
-            
-            if len(row) < 3:
-                rows_removed += 1
-                continue
-            
-            # Extract entity and year
-            entity = row[structure['entity_col']].strip('"')
+        if len(row) < 3:
+            rows_removed += 1
+            continue
+        
+        # Extract entity and year
+        entity = row[structure['entity_col']].strip('"')
+        
+        # Find year
+        year_str = None
+        if structure['year_col'] is not None:
+            year_str = row[structure['year_col']].strip('"')
+        else:
+            # Try to find year in any column
+            for cell in row:
+                try:
+                    year_val = int(cell.strip('"'))
+                    if 1900 <= year_val <= 2030:  # Reasonable year range
+                        year_str = str(year_val)
+                        break
+                except ValueError:
+                    continue
+        
+        if not year_str:
+            rows_removed += 1
+            continue
+        
+        try:
+            year = int(year_str)
+        except ValueError:
+            rows_removed += 1
+            continue
+        
+        # Check if this row should be kept based on element (if present)
+        if structure['has_element']:
+            element_col = structure['element_col']
+            if element_col is not None and len(row) > element_col:
+                element = row[element_col].strip('"')
+                if element != "Production":
+                    rows_removed += 1
+                    continue
+        
+        # Get ISO code
+        iso_code = iso_mapping.get(entity, "")
+        
+        # Only keep rows with ISO codes (actual countries)
+        if iso_code:
+            # Standardize country name using the canonical names table
+            if iso_code in canonical_names:
+                entity = canonical_names[iso_code]
             
-            # Find year
-            year_str = None
-            if structure['year_col'] is not None:
-                year_str = row[structure['year_col']].strip('"')
+            # Find value column
+            value = ""
+            if structure['value_col'] is not None:
+                value = row[structure['value_col']].strip('"')
             else:
-                # Try to find year in any column
+                # Try to find a numeric value in the row
                 for cell in row:
                     try:
-                        year_val = int(cell.strip('"'))
-                        if 1900 <= year_val <= 2030:  # Reasonable year range
-                            year_str = str(year_val)
-                            break
-                    except ValueError:
-                        continue
-            
-            if not year_str:
-                rows_removed += 1
-                continue
-            
-            try:
-                year = int(year_str)
-            except ValueError:
-                rows_removed += 1
-                continue
-            
-            # Check if this row should be kept based on element (if present)
-            if structure['has_element']:
-                element_col = None
-                for i, col in enumerate(header):
-                    if 'element' in col.lower():
-                        element_col = i
+                        float(cell.strip('"'))
+                        value = cell.strip('"')
                         break
-                
-                if element_col is not None and len(row) > element_col:
-                    element = row[element_col].strip('"')
-                    if element != "Production":
-                        rows_removed += 1
+                    except ValueError:
                         continue
             
-            # Get ISO code
-            iso_code = iso_mapping.get(entity, "")
-            
-            # Only keep rows with ISO codes (actual countries)
-            if iso_code:
-                # Standardize country name using banana mapping if available
-                if iso_code in banana_mapping:
-                    entity = banana_mapping[iso_code]
-                
-                # Find value column
-                value = ""
-                if structure['value_col'] is not None:
-                    value = row[structure['value_col']].strip('"')
-                else:
-                    # Try to find a numeric value in the row
-                    for cell in row:
-                        try:
-                            float(cell.strip('"'))
-                            value = cell.strip('"')
-                            break
-                        except ValueError:
-                            continue
-                
-                # Store data for sorting
-                new_row = [entity, iso_code, str(year), value]
-                country_data[entity].append((year, new_row))
-                countries_found.add(entity)
+            # Store data for sorting
+            if entity not in country_data:
+                country_data[entity] = CompactRows(table)
+            country_data[entity].append(entity, iso_code, year, value)
+        else:
+            rows_removed += 1
+            if is_aggregate(entity):
+                regions_removed += 1
             else:
-                rows_removed += 1
-    
-    print(f"✓ Data processed: {rows_processed} rows, {rows_removed} removed, {len(countries_found)} countries found")
+                unmapped_entities.add(entity)
     
     # Sort data chronologically for each country
     for entity in country_data:
-        country_data[entity].sort(key=lambda x: x[0])  # Sort by year
+        country_data[entity].sort_by_year()
     
-    # Write cleaned data
-    with open(file_path, 'w', newline='', encoding='utf-8') as outfile:
-        writer = csv.writer(outfile)
+    return {
+        'country_data': country_data,
+        'rows_processed': rows_processed,
+        'rows_removed': rows_removed,
+        'regions_removed': regions_removed,
+        'unmapped_entities': unmapped_entities,
+    }
+
+def clean_range(file_path, start, end, structure):
+    """
+    Worker for parallel cleaning: clean the records in bytes [start, end)
+    of `file_path`.
+    """
+    reader = iter_range_rows(file_path, start, end)
+    if structure['schema'].layout == 'wide_years':
+        reader = iter_wide_rows(reader, structure['schema'])
+    return clean_rows(reader, structure, get_iso_mapping(), load_canonical_names())
+
+def merge_results(results):
+    """
+    Combine per-chunk clean_rows results in file order. Each country's rows
+    are merged by year, keeping chunk order for equal years, which gives the
+    same output as cleaning the file in one pass.
+    """
+    merged = {
+        'country_data': {},
+        'rows_processed': 0,
+        'rows_removed': 0,
+        'regions_removed': 0,
+        'unmapped_entities': set(),
+    }
+    per_entity = defaultdict(list)
+    for result in results:
+        for entity, rows in result['country_data'].items():
+            per_entity[entity].append(rows)
+        for key in ('rows_processed', 'rows_removed', 'regions_removed'):
+            merged[key] += result[key]
+        merged['unmapped_entities'] |= result['unmapped_entities']
+    
+    table = None
+    for entity, chunks in per_entity.items():
+        if len(chunks) == 1:
+            merged['country_data'][entity] = chunks[0]
+            continue
+        # Chunks come from different workers, each with its own entity table
+        if table is None:
+            table = chunks[0].table
+        rows = CompactRows(table)
+        for year, row in merge_sorted([chunk.keyed_by_year() for chunk in chunks], key=lambda x: x[0]):
+            rows.append(row[0], row[1], year, row[3])
+        merged['country_data'][entity] = rows
+    return merged
+
+def clean_faostat_dataset(file_path, output_path=None, workers=None, fill='none',
+                          max_gap=DEFAULT_MAX_GAP):
+    """
+    Main cleaning function that processes any FAOstat dataset.
+    The raw file is left untouched; the cleaned dataset is written to
+    `output_path` (default: clean/<same name>), which is returned.
+    Files over parallel_csv.PARALLEL_THRESHOLD are cleaned in `workers`
+    processes (default: one per CPU). With `fill` set to 'linear' or 'locf',
+    gaps of up to `max_gap` years are filled and flagged (see gapfill.py).
+    """
+    print(f"Cleaning FAOstat dataset: {file_path}")
+    
+    if output_path is None:
+        output_path = clean_output_path(file_path)
+    if os.path.abspath(output_path) == os.path.abspath(file_path):
+        raise ValueError("Output path must differ from the raw input file")
+    os.makedirs(os.path.dirname(output_path) or '.', exist_ok=True)
+    
+    # Serve repeat runs on the same raw content from the result cache
+    cache_key = result_key(file_path, 'FAOstat_clean', CLEANER_VERSION,
+                           {'fill': fill, 'max_gap': max_gap if fill != 'none' else None})
+    if get_result(cache_key, output_path):
+        build_index(output_path)
+        write_series_for(output_path)
+        print(f"✓ Cleaned output served from result cache ({cache_key})")
+        return output_path
+    
+    # Detect file structure
+    structure = detect_file_structure(file_path)
+    print(f"✓ File structure detected ({structure['schema'].source})")
+    
+    # Load mappings
+    iso_mapping = get_iso_mapping()
+    canonical_names = load_canonical_names()
+    print(f"✓ Country mappings loaded ({len(canonical_names)} canonical names)")
+    
+    # Process data, splitting large files across worker processes
+    if file_path.endswith(PARQUET_SUFFIX):
+        # Parquet exports are already in the long layout
+        rows = ([entity, code, str(year), value] for entity, code, year, value in iter_long_rows(file_path))
+        result = clean_rows(rows, structure, iso_mapping, canonical_names)
+    elif should_parallelize(file_path, workers):
+        workers = workers or os.cpu_count()
+        ranges = split_ranges(file_path, workers * CHUNKS_PER_WORKER)
+        print(f"✓ Processing {len(ranges)} chunks on {workers} workers")
+        chunk_results = map_ranges(file_path, ranges, clean_range, structure, workers=workers)
+        result = merge_results(chunk_results)
+    else:
+        with open(file_path, 'r', newline='', encoding='utf-8') as infile:
+            reader = csv.reader(infile)
+            next(reader)
+            if structure['schema'].layout == 'wide_years':
+                reader = iter_wide_rows(reader, structure['schema'])
+            result = clean_rows(reader, structure, iso_mapping, canonical_names)
+    
+    country_data = result['country_data']
+    rows_processed = result['rows_processed']
+    rows_removed = result['rows_removed']
+    regions_removed = result['regions_removed']
+    unmapped_entities = result['unmapped_entities']
+    countries_found = set(country_data)
+    
+    print(f"✓ Data processed: {rows_processed} rows, {rows_removed} removed, {len(countries_found)} countries found")
+    print(f"  Region/aggregate rows removed: {regions_removed}")
+    if unmapped_entities:
+        print(f"  ⚠ Entities without an ISO code (not regions, also removed): {', '.join(sorted(unmapped_entities))}")
+    
+    # Rows for each country in alphabetical order
+    rows = (
+        row
+        for entity in sorted(country_data.keys())
+        for row in country_data[entity]
+    )
+    header = ['Entity', 'CODE', 'Year', 'Value']
+    if fill != 'none':
+        # Gap-fill missing years per country, flagging the filled rows
+        rows = fill_rows(((r[0], r[1], int(r[2]), r[3]) for r in rows), fill, max_gap)
+        header.append(FLAG_COLUMN)
+    
+    # Write cleaned data, indexing each country's rows as they are written
+    total_final_rows = 0
+    filled_rows = 0
+    with open(output_path, 'w', newline='', encoding='utf-8') as outfile:
+        writer = IndexedWriter(outfile)
         
         # Write standard header
-        writer.writerow(['Entity', 'CODE', 'Year', 'Value'])
+        writer.writerow(header)
         
-        # Write data for each country in alphabetical order
-        for entity in sorted(country_data.keys()):
-            for year, row in country_data[entity]:
-                writer.writerow(row)
+        for row in rows:
+            writer.writerow(row)
+            total_final_rows += 1
+            if fill != 'none' and row[4]:
+                filled_rows += 1
+    writer.save(output_path)
+    write_series_for(output_path)
     
-    total_final_rows = sum(len(data) for data in country_data.values())
+    put_result(cache_key, output_path)
     print(f"✓ Dataset cleaned successfully!")
+    if fill != 'none':
+        print(f"  Gap-filled cells: {filled_rows} ({fill}, max gap {max_gap} years)")
     print(f"  Final rows: {total_final_rows + 1} (including header)")
     print(f"  Countries: {len(countries_found)}")
     
@@ -495,20 +598,29 @@ def clean_faostat_dataset(file_path):
     if countries_found:
         print(f"  Sample countries and year ranges:")
         for entity in sorted(list(countries_found)[:5]):  # First 5 countries
-            years = [year for year, row in country_data[entity]]
+            years = country_data[entity].years
             if years:
                 print(f"    {entity}: {min(years)}-{max(years)} ({len(years)} years)")
+    
+    return output_path
 
-def main():
+def main(argv=None):
     """
     Main function to handle command line arguments.
     """
-    if len(sys.argv) != 2:
-        print("Usage: python3 FAOstat_clean.py <filename>")
-        print("Example: python3 FAOstat_clean.py Turkey_production_FAOstat.csv")
-        sys.exit(1)
+    parser = argparse.ArgumentParser(
+        description="Clean a FAOstat dataset into the clean/ tree (the raw file is not modified).",
+        epilog="Example: python3 FAOstat_clean.py Turkey_production_FAOstat.csv",
+    )
+    parser.add_argument('filename')
+    parser.add_argument('-o', '--output', help="output file (default: clean/<same name>)")
+    parser.add_argument('--fill', choices=FILL_METHODS, default='none',
+                        help="fill missing years per country (default: none)")
+    parser.add_argument('--max-gap', type=int, default=DEFAULT_MAX_GAP,
+                        help="longest run of missing years to fill")
+    args = parser.parse_args(argv)
     
-    filename = sys.argv[1]
+    filename = args.filename
     
     # Handle both absolute and relative paths
     if not os.path.isabs(filename):
@@ -528,13 +640,16 @@ def main():
         sys.exit(1)
     
     try:
-        clean_faostat_dataset(file_path)
+        output_path = clean_faostat_dataset(file_path, args.output, fill=args.fill, max_gap=args.max_gap)
         print(f"\n🎉 Success! '{file_path}' has been cleaned and standardized.")
-        print("   The file now has the format: Entity, CODE, Year, Value")
+        print(f"   Cleaned file: {output_path} (raw file unchanged)")
+        print("   Format: Entity, CODE, Year, Value")
         print("   ✓ Only countries (no regions/continents)")
         print("   ✓ Chronologically ordered (oldest to newest)")
         print("   ✓ Standardized country names")
         print("   ✓ ISO 3-letter codes added")
+        if args.fill != 'none':
+            print(f"   ✓ Gaps of up to {args.max_gap} years filled ({args.fill}), flagged in '{FLAG_COLUMN}'")
         
     except Exception as e:
         print(f"Error processing file: {e}")
@@ -6,11 +6,17 @@ Adds a "Code" column as the second column.
 
 import csv
 import os
+from functools import lru_cache
 
+from compact_dataset import CompactRows
+from regions import is_aggregate
+
+@lru_cache(maxsize=None)
 def get_iso_mapping():
     """
     Returns a comprehensive mapping from entity names to ISO 3-letter codes.
     Based on the mapping from FAOstat_clean.py.
+    Built once per process; callers must not modify the returned dict.
     """
     return {
         # Countries with ISO codes
@@ -288,9 +294,10 @@ def add_country_codes(input_file):
     rows_processed = 0
     countries_found = 0
     regions_removed = 0
+    unmapped_entities = set()
     
-    # Read original data
-    data_rows = []
+    # Read original data (held in compact columns until the file is rewritten)
+    data_rows = CompactRows()
     
     with open(input_file, 'r', newline='', encoding='utf-8') as infile:
         reader = csv.reader(infile)
@@ -308,10 +315,12 @@ def add_country_codes(input_file):
             iso_code = iso_mapping.get(entity, "")
             
             if iso_code:  # Only keep rows with valid ISO codes (actual countries)
-                data_rows.append([entity, iso_code, year, value])
+                data_rows.append(entity, iso_code, year, value)
                 countries_found += 1
-            else:
+            elif is_aggregate(entity):
                 regions_removed += 1
+            else:
+                unmapped_entities.add(entity)
             
             rows_processed += 1
     
@@ -332,6 +341,8 @@ def add_country_codes(input_file):
     print(f"  Total rows processed: {rows_processed}")
     print(f"  Countries kept: {countries_found}")
     print(f"  Regions/aggregates removed: {regions_removed}")
+    if unmapped_entities:
+        print(f"  ⚠ Entities without an ISO code (also removed): {', '.join(sorted(unmapped_entities))}")
     print(f"  Final rows (including header): {len(data_rows) + 1}")
 
 def main():
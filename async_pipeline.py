@@ -0,0 +1,268 @@
+#!/usr/bin/env python3
+"""
+async_pipeline.py - Download and clean in one overlapping pass
+
+`fetch` downloads every OWID data link into backup/ and cleaning runs later,
+so a refresh costs network time plus CPU time. Here each download streams
+into backup/ while its first lines are used to pick the cleaning stage, and
+the stage is handed to a worker process as soon as the body ends. Downloads
+of the remaining files carry on meanwhile, so the total approaches the
+larger of the two rather than their sum.
+
+Stages, chosen from the URL and the detected schema:
+
+- raw FAOSTAT data                -> FAOstat_clean into clean/
+- GBD export                      -> gbd_ingest, one file per cause in clean/
+- dataset with a cleaned copy     -> delta_refresh onto clean/<name>, first
+                                     seeded from data/<name> (data/ is
+                                     never modified)
+- anything else                   -> kept in backup/ only
+
+Downloads are limited to `concurrency` at a time and requests to the same
+host are spaced by `host_delay` seconds, as fetch_data.py does. The cleaners
+read whole files (they sort and may split the input into parallel ranges),
+so the body is spooled to backup/<name>.part rather than parsed in memory;
+the raw copy is what delta_refresh and the catalog work from anyway.
+
+Usage:
+    python3 async_pipeline.py [--no-sheet] [--concurrency 4] [--workers N]
+                              [--host-delay 1.5] [--skip-existing]
+"""
+
+import argparse
+import asyncio
+import csv
+import io
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from urllib.parse import urlsplit
+
+from dataset_io import clean_output_path
+from fetch_data import (BACKUP_DIR, CSV_URL, OUTPUT_FILE, create_mapping_csv,
+                        extract_filename_from_owid_url, http_pool)
+from schema_detect import SAMPLE_ROWS, detect_schema_from_header
+from watch import RAW_FAOSTAT_SOURCES
+
+CONCURRENCY = 4
+HOST_DELAY = 1.5   # seconds between requests to the same host
+DATA_DIR = "data"
+SNIFF_BYTES = 64 * 1024
+
+
+def load_jobs(puzzle_file=OUTPUT_FILE):
+    """[(url, filename)] for every OWID data link in data.csv, first occurrence only."""
+    jobs = []
+    seen = set()
+    with open(puzzle_file, 'r', newline='', encoding='utf-8') as f:
+        for row in csv.DictReader(f):
+            url = (row.get('OWID_datalink') or '').strip()
+            if not url:
+                continue
+            filename, _ = extract_filename_from_owid_url(url)
+            if filename not in seen:
+                seen.add(filename)
+                jobs.append((url, filename))
+    return jobs
+
+
+def choose_stage(url, schema, filename):
+    """Name of the cleaning stage for a download, or None to only keep the raw file."""
+    if schema is None:
+        return None
+    host = (urlsplit(url).hostname or '').lower()
+    if schema.source in RAW_FAOSTAT_SOURCES or host.endswith('fao.org'):
+        return 'faostat'
+    if schema.source == 'gbd' or host.endswith('healthdata.org'):
+        return 'gbd'
+    if schema.code_col is not None and (os.path.exists(clean_output_path(filename))
+                                        or os.path.exists(os.path.join(DATA_DIR, filename))):
+        return 'refresh'
+    return None
+
+
+def run_stage(stage, path, filename):
+    """Run one cleaning stage in a worker process. Returns a short result description."""
+    if stage == 'faostat':
+        from FAOstat_clean import clean_faostat_dataset
+        return f"cleaned -> {clean_faostat_dataset(path)}"
+    if stage == 'gbd':
+        from gbd_ingest import ingest_gbd_export
+        return f"{len(ingest_gbd_export(path))} causes -> clean/"
+    if stage == 'refresh':
+        from delta_refresh import delta_is_empty, refresh_clean_copy
+        target, delta = refresh_clean_copy(path, os.path.join(DATA_DIR, filename))
+        return "up to date" if delta_is_empty(delta) else f"delta applied to {target}"
+    raise ValueError(f"Unknown stage '{stage}'")
+
+
+class StreamSink:
+    """
+    Receives response chunks: spools them to `path`.part and detects the
+    schema from the first lines while the rest of the body is still arriving.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.tmp_path = path + '.part'
+        self.file = open(self.tmp_path, 'wb')
+        self.head = bytearray()
+        self.schema = None
+        self.bytes = 0
+
+    def write(self, chunk):
+        self.file.write(chunk)
+        self.bytes += len(chunk)
+        if self.schema is None and len(self.head) < SNIFF_BYTES:
+            self.head += chunk
+            if self.head.count(b'\n') > SAMPLE_ROWS or len(self.head) >= SNIFF_BYTES:
+                self.sniff()
+
+    def sniff(self):
+        text = bytes(self.head).decode('utf-8-sig', errors='replace')
+        lines = text.splitlines()
+        if len(self.head) >= SNIFF_BYTES or self.head.count(b'\n') > SAMPLE_ROWS:
+            lines = lines[:-1]   # the last line may be cut mid-row
+        rows = list(csv.reader(io.StringIO('\n'.join(lines))))
+        if rows:
+            self.schema = detect_schema_from_header(rows[0], rows[1:SAMPLE_ROWS + 1])
+
+    def commit(self):
+        self.file.close()
+        if self.schema is None:
+            self.sniff()   # short body, all of it is in `head`
+        os.replace(self.tmp_path, self.path)
+
+    def discard(self):
+        self.file.close()
+        if os.path.exists(self.tmp_path):
+            os.remove(self.tmp_path)
+
+
+class HostThrottle:
+    """Spaces the start of requests to the same host by at least `delay` seconds."""
+
+    def __init__(self, delay):
+        self.delay = delay
+        self.next_start = {}
+        self.locks = {}
+
+    async def wait(self, url):
+        host = urlsplit(url).hostname or ''
+        lock = self.locks.setdefault(host, asyncio.Lock())
+        async with lock:
+            now = time.monotonic()
+            start = max(now, self.next_start.get(host, now))
+            self.next_start[host] = start + self.delay
+        if start > now:
+            await asyncio.sleep(start - now)
+
+
+async def process_job(url, filename, pool, semaphore, throttle, skip_existing=False):
+    """Download one file and run its stage. Returns a result dict."""
+    path = os.path.join(BACKUP_DIR, filename)
+    result = {'filename': filename, 'url': url, 'stage': None, 'status': 'ok', 'detail': '',
+              'seconds': None}
+    if skip_existing and os.path.exists(path):
+        result['status'] = 'skipped'
+        return result
+
+    async with semaphore:
+        await throttle.wait(url)
+        sink = StreamSink(path)
+        started = time.monotonic()
+        try:
+            await asyncio.to_thread(http_pool.stream, url, sink.write)
+            sink.commit()
+        except Exception as e:
+            sink.discard()
+            result.update(status='failed', detail=f"download: {e}")
+            print(f"  ✗ {filename}: download failed ({e})")
+            return result
+    result['seconds'] = time.monotonic() - started
+    print(f"  ↓ {filename}: {sink.bytes} bytes in {result['seconds']:.1f}s")
+
+    # The download slot is free again; cleaning runs while others download
+    stage = choose_stage(url, sink.schema, filename)
+    result['stage'] = stage
+    if stage is None:
+        return result
+    loop = asyncio.get_running_loop()
+    try:
+        result['detail'] = await loop.run_in_executor(pool, run_stage, stage, path, filename)
+        print(f"  ✓ {filename}: {stage}, {result['detail']}")
+    except Exception as e:
+        result.update(status='failed', detail=f"{stage}: {e}")
+        print(f"  ✗ {filename}: {stage} failed ({e})")
+    return result
+
+
+async def run_pipeline(jobs, concurrency=CONCURRENCY, workers=None, host_delay=HOST_DELAY,
+                       skip_existing=False):
+    """Download and clean every (url, filename) job. Returns the result dicts in job order."""
+    os.makedirs(BACKUP_DIR, exist_ok=True)
+    semaphore = asyncio.Semaphore(concurrency)
+    throttle = HostThrottle(host_delay)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return await asyncio.gather(*(
+            process_job(url, filename, pool, semaphore, throttle, skip_existing)
+            for url, filename in jobs
+        ))
+
+
+def print_summary(results, elapsed):
+    counts = {}
+    for result in results:
+        counts[result['status']] = counts.get(result['status'], 0) + 1
+    cleaned = sum(1 for r in results if r['stage'] and r['status'] == 'ok')
+    print("=" * 70)
+    print(f"{len(results)} links in {elapsed:.1f}s: {counts.get('ok', 0)} ok "
+          f"({cleaned} cleaned), {counts.get('skipped', 0)} skipped, "
+          f"{counts.get('failed', 0)} failed")
+    for result in results:
+        if result['status'] == 'failed':
+            print(f"  ✗ {result['filename']}: {result['detail']}")
+            print(f"    URL: {result['url']}")
+    print(f"\nConnection Reuse:")
+    print(http_pool.format_stats())
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Download OWID data links and clean them as they arrive.")
+    parser.add_argument('--no-sheet', action='store_true',
+                        help=f"use the local {OUTPUT_FILE} instead of fetching it first")
+    parser.add_argument('--concurrency', type=int, default=CONCURRENCY, help="parallel downloads")
+    parser.add_argument('--workers', type=int, help="cleaning processes (default: CPU count)")
+    parser.add_argument('--host-delay', type=float, default=HOST_DELAY,
+                        help="seconds between requests to the same host")
+    parser.add_argument('--skip-existing', action='store_true',
+                        help="do not download files already in backup/")
+    args = parser.parse_args(argv)
+
+    if not args.no_sheet:
+        print(f"Fetching data from: {CSV_URL}")
+        http_pool.fetch_to_file(CSV_URL, OUTPUT_FILE)
+    if not os.path.exists(OUTPUT_FILE):
+        print(f"Error: {OUTPUT_FILE} not found. Please run the main fetch first.")
+        sys.exit(1)
+
+    jobs = load_jobs()
+    print(f"\nFound {len(jobs)} OWID data links to fetch.\n")
+    started = time.monotonic()
+    try:
+        results = asyncio.run(run_pipeline(jobs, args.concurrency, args.workers,
+                                           args.host_delay, args.skip_existing))
+    finally:
+        http_pool.close()
+    print_summary(results, time.monotonic() - started)
+
+    with open(OUTPUT_FILE, 'r', newline='', encoding='utf-8') as f:
+        create_mapping_csv([r for r in csv.DictReader(f) if (r.get('OWID_datalink') or '').strip()])
+    if any(r['status'] == 'failed' for r in results):
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,236 @@
+#!/usr/bin/env python3
+"""
+build_bundles.py - Pre-bake one small JSON bundle per puzzle config
+
+For each config/NNN_*.json this script:
+1. Resolves the dataset behind `csvUrl` locally (clean/, data/, backup/,
+   or a cleaned_* file for the same dataset)
+2. Keeps only countries (regions and aggregates are dropped)
+3. Applies the year window (`yearStart`/`yearEnd` from the config, falling
+   back to the matching data.csv row)
+4. Divides values by `scale` (e.g. kWh -> MWh with scale 1000)
+5. Writes a minified bundle with the config fields and the per-country series,
+   plus a gzip copy, named with a content hash for cache-busting:
+
+    bundles/001_banana_production.3f9a1c2b7d.json
+    bundles/001_banana_production.3f9a1c2b7d.json.gz
+    bundles/manifest.json
+
+Usage:
+    python3 build_bundles.py [config_file ...]
+"""
+
+import csv
+import glob
+import gzip
+import hashlib
+import json
+import os
+import sys
+
+from add_country_codes import get_iso_mapping
+from dataset_io import iter_long_rows
+from fetch_data import extract_filename_from_owid_url
+from regions import is_country
+from reshape import build_series_from_rows, iter_wide_as_long
+from schema_detect import detect_schema
+
+CONFIG_DIR = "config"
+BUNDLE_DIR = "bundles"
+SEARCH_DIRS = ["clean", "data", "backup"]
+PUZZLE_FILE = "data.csv"
+MANIFEST_FILE = os.path.join(BUNDLE_DIR, "manifest.json")
+
+# Config fields copied into the bundle as-is
+BUNDLE_FIELDS = ['title', 'subtitle', 'source', 'target', 'unitSuffix', 'infoDescription']
+HASH_LENGTH = 10
+SIGNIFICANT_DIGITS = 6
+
+
+def resolve_dataset(csv_url):
+    """Return the local file holding the dataset behind `csv_url`, or None."""
+    filename, _ = extract_filename_from_owid_url(csv_url)
+    stem = os.path.splitext(filename)[0]
+    candidates = []
+    for directory in SEARCH_DIRS:
+        candidates.append(os.path.join(directory, filename))
+    for directory in SEARCH_DIRS:
+        candidates.append(os.path.join(directory, f"cleaned_{stem}.csv"))
+        candidates.append(os.path.join(directory, f"cleaned_{stem.replace('-', '_')}.csv"))
+    for path in candidates:
+        if os.path.exists(path):
+            return path
+    return None
+
+
+def configs_using(dataset_path):
+    """Config files whose csvUrl resolves to `dataset_path`."""
+    target = os.path.normpath(dataset_path)
+    matches = []
+    for config_path in sorted(glob.glob(os.path.join(CONFIG_DIR, "*.json"))):
+        try:
+            with open(config_path, 'r', encoding='utf-8') as f:
+                csv_url = json.load(f).get('csvUrl', '')
+        except (OSError, ValueError):
+            continue
+        resolved = resolve_dataset(csv_url)
+        if resolved and os.path.normpath(resolved) == target:
+            matches.append(config_path)
+    return matches
+
+
+def load_puzzle_rows():
+    """Map OWID data links to their data.csv rows."""
+    if not os.path.exists(PUZZLE_FILE):
+        return {}
+    with open(PUZZLE_FILE, 'r', newline='', encoding='utf-8') as f:
+        return {row['OWID_datalink'].strip(): row for row in csv.DictReader(f)
+                if row.get('OWID_datalink', '').strip()}
+
+
+def parse_year(value):
+    if value in (None, ""):
+        return None
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def iter_country_rows(file_path):
+    """
+    Yield (entity, code, year, value) rows for countries only.
+    Wide files carry no codes, so codes are looked up by entity name.
+    """
+    schema = detect_schema(file_path)
+    if schema.layout == 'long':
+        for entity, code, year, value in iter_long_rows(file_path):
+            if is_country(entity, code):
+                yield entity, code, year, value
+        return
+
+    iso_mapping = get_iso_mapping()
+    for entity, _, year, value in iter_wide_as_long(file_path, schema):
+        code = iso_mapping.get(entity, "")
+        if is_country(entity, code):
+            yield entity, code, year, value
+
+
+def round_value(value, scale):
+    if value is None:
+        return None
+    value = value / scale if scale not in (None, 1) else value
+    if isinstance(value, float):
+        value = float(f"{value:.{SIGNIFICANT_DIGITS}g}")
+        if value.is_integer():
+            value = int(value)
+    return value
+
+
+def build_bundle(puzzle, file_path):
+    """
+    Build the bundle dict for one puzzle spec (a config dict, optionally
+    completed by its data.csv row).
+    """
+    year_start = parse_year(puzzle.get('yearStart'))
+    year_end = parse_year(puzzle.get('yearEnd'))
+    scale = puzzle.get('scale') or 1
+    scale = float(scale) if not isinstance(scale, (int, float)) else scale
+
+    rows = (
+        row for row in iter_country_rows(file_path)
+        if (year_start is None or row[2] >= year_start)
+        and (year_end is None or row[2] <= year_end)
+    )
+    series = build_series_from_rows(rows)
+
+    for entry in series.values():
+        entry[2] = [round_value(v, scale) for v in entry[2]]
+
+    bundle = {field: puzzle.get(field, "") for field in BUNDLE_FIELDS}
+    bundle['yearStart'] = year_start
+    bundle['yearEnd'] = year_end
+    bundle['series'] = series
+    return bundle
+
+
+def write_bundle(name, bundle):
+    """Write the minified and gzipped bundle, returning its manifest entry."""
+    payload = json.dumps(bundle, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+    digest = hashlib.sha256(payload).hexdigest()[:HASH_LENGTH]
+
+    os.makedirs(BUNDLE_DIR, exist_ok=True)
+    # Drop bundles left over from previous builds of the same puzzle
+    for old_path in glob.glob(os.path.join(BUNDLE_DIR, f"{name}.*.json*")):
+        if f".{digest}." not in os.path.basename(old_path):
+            os.remove(old_path)
+
+    json_path = os.path.join(BUNDLE_DIR, f"{name}.{digest}.json")
+    with open(json_path, 'wb') as f:
+        f.write(payload)
+    with open(json_path + '.gz', 'wb') as raw:
+        with gzip.GzipFile(fileobj=raw, mode='wb', compresslevel=9, mtime=0) as gz:
+            gz.write(payload)
+
+    return {
+        'file': os.path.basename(json_path),
+        'hash': digest,
+        'bytes': len(payload),
+        'gzipBytes': os.path.getsize(json_path + '.gz'),
+    }
+
+
+def load_puzzle_spec(config_path, puzzle_rows):
+    """Read a config and fill year bounds from its data.csv row when missing."""
+    with open(config_path, 'r', encoding='utf-8') as f:
+        puzzle = json.load(f)
+    row = puzzle_rows.get(puzzle.get('csvUrl', '').strip(), {})
+    for field in ('yearStart', 'yearEnd'):
+        if puzzle.get(field) in (None, "") and row.get(field):
+            puzzle[field] = row[field]
+    return puzzle
+
+
+def build_all(config_paths):
+    puzzle_rows = load_puzzle_rows()
+    manifest = {}
+    if os.path.exists(MANIFEST_FILE):
+        with open(MANIFEST_FILE, 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+
+    built, missing = 0, []
+    for config_path in config_paths:
+        name = os.path.splitext(os.path.basename(config_path))[0]
+        puzzle = load_puzzle_spec(config_path, puzzle_rows)
+        file_path = resolve_dataset(puzzle.get('csvUrl', ''))
+        if file_path is None:
+            missing.append(name)
+            print(f"  ⊘ {name}: dataset not available locally")
+            continue
+
+        entry = write_bundle(name, build_bundle(puzzle, file_path))
+        entry['dataset'] = file_path
+        manifest[name] = entry
+        built += 1
+        print(f"  ✓ {name}: {entry['file']} ({entry['bytes']} bytes, {entry['gzipBytes']} gzipped)")
+
+    os.makedirs(BUNDLE_DIR, exist_ok=True)
+    with open(MANIFEST_FILE, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+
+    print(f"\n✓ {built} bundles built, {len(missing)} skipped (dataset not fetched)")
+    return built, missing
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    config_paths = argv or sorted(glob.glob(os.path.join(CONFIG_DIR, "*.json")))
+    if not config_paths:
+        print(f"No config files found in {CONFIG_DIR}/")
+        sys.exit(1)
+    print(f"Building puzzle bundles into {BUNDLE_DIR}/")
+    build_all(config_paths)
+
+
+if __name__ == "__main__":
+    main()
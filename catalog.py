@@ -0,0 +1,285 @@
+#!/usr/bin/env python3
+"""
+catalog.py - Index of every dataset in clean/, data/ and backup/
+
+Scans each dataset once and records what is needed to author a puzzle:
+schema, value column, row count, year range, number of countries, value
+distribution, missing-year gaps per country, per-year puzzle-difficulty
+metrics (see difficulty.py), content hash and source URL.
+The index lives in .cache/catalog.json and is updated incrementally: files
+whose size and modification time have not changed are not read again, and
+files that were only touched (same content hash) are not rescanned.
+
+Usage:
+    python3 catalog.py build                 update the index
+    python3 catalog.py query [--name banana] [--min-countries 100]
+                             [--year-end 2022] [--source owid_grapher]
+    python3 catalog.py show <file>           print one entry as JSON
+"""
+
+import argparse
+import csv
+import glob
+import json
+import math
+import os
+import sys
+
+from file_cache import cache_path, file_sha256, load_json, save_json
+from regions import is_country
+from schema_detect import detect_schema
+
+CATALOG_VERSION = 3
+SCAN_DIRS = ["clean", "data", "backup"]
+PUZZLE_FILE = "data.csv"
+BACKUP_MAPPING_FILE = "backup_mapping.csv"
+
+# Pipeline byproducts that are not datasets of their own
+SKIPPED_SUFFIXES = ('_original_backup.csv',)
+
+
+def catalog_file():
+    return cache_path('catalog.json')
+
+
+def dataset_files(dirs=SCAN_DIRS):
+    files = []
+    for directory in dirs:
+        files.extend(glob.glob(os.path.join(directory, "*.csv")))
+    return sorted(f for f in files if not f.endswith(SKIPPED_SUFFIXES))
+
+
+def source_urls():
+    """Map dataset file names to the URL they were downloaded from."""
+    from fetch_data import extract_filename_from_owid_url
+
+    urls = {}
+    if os.path.exists(BACKUP_MAPPING_FILE):
+        with open(BACKUP_MAPPING_FILE, 'r', newline='', encoding='utf-8') as f:
+            for row in csv.DictReader(f):
+                if row.get('filename') and row.get('backup_link'):
+                    urls[row['filename']] = row['backup_link']
+    if os.path.exists(PUZZLE_FILE):
+        with open(PUZZLE_FILE, 'r', newline='', encoding='utf-8') as f:
+            for row in csv.DictReader(f):
+                link = (row.get('OWID_datalink') or '').strip()
+                if link:
+                    filename, _ = extract_filename_from_owid_url(link)
+                    urls.setdefault(filename, link)
+    return urls
+
+
+def url_for(file_path, urls):
+    name = os.path.basename(file_path)
+    if name in urls:
+        return urls[name]
+    # cleaned_<stem>.csv comes from <stem>.csv (with '-' or '_')
+    if name.startswith('cleaned_'):
+        stem = name[len('cleaned_'):]
+        return urls.get(stem) or urls.get(stem.replace('_', '-'))
+    return None
+
+
+def year_gaps(years):
+    """[1990, 1991, 1995, 1999] -> [[1992, 1994], [1996, 1998]]"""
+    gaps = []
+    for previous, current in zip(years, years[1:]):
+        if current - previous > 1:
+            gaps.append([previous + 1, current - 1])
+    return gaps
+
+
+def value_summary(values):
+    """Distribution summary of a list of floats (NaN already removed)."""
+    if not values:
+        return None
+    values = sorted(values)
+    n = len(values)
+
+    def percentile(p):
+        return values[min(n - 1, int(p * (n - 1) + 0.5))]
+
+    return {
+        'count': n,
+        'min': values[0],
+        'p10': percentile(0.1),
+        'median': percentile(0.5),
+        'p90': percentile(0.9),
+        'max': values[-1],
+        'mean': sum(values) / n,
+    }
+
+
+def scan_dataset(file_path, schema=None):
+    """Read one dataset and return its catalog entry (without file metadata)."""
+    from difficulty import dataset_difficulty
+    from validate import LONG_SOURCES, WIDE_LAYOUTS, load_columns
+
+    schema = schema or detect_schema(file_path)
+    entry = {'schema': schema.source, 'layout': schema.layout}
+    if schema.source not in LONG_SOURCES and schema.layout not in WIDE_LAYOUTS:
+        entry['status'] = 'unsupported'
+        return entry
+
+    columns = load_columns(file_path, schema)
+    entry['value_column'] = schema.header[schema.value_col] if schema.layout == 'long' else None
+    entry['rows'] = len(columns)
+    entry['year_min'] = min(columns.years) if len(columns) else None
+    entry['year_max'] = max(columns.years) if len(columns) else None
+
+    # Which series are countries; wide files carry no codes, so look them up by name
+    iso_mapping = None
+    if schema.layout != 'long':
+        from add_country_codes import get_iso_mapping
+        iso_mapping = get_iso_mapping()
+    is_country_series = [False] * len(columns.series_names)
+    for sid, (entity, code) in enumerate(zip(columns.series_names, columns.series_codes)):
+        if iso_mapping is not None:
+            code = iso_mapping.get(entity, "")
+        is_country_series[sid] = is_country(entity, code)
+
+    series_years = {}
+    values = []
+    by_year = {}
+    names = columns.series_names
+    for sid, year, value in zip(columns.series_ids, columns.years, columns.values):
+        if is_country_series[sid] and not math.isnan(value):
+            series_years.setdefault(sid, []).append(year)
+            values.append(value)
+            by_year.setdefault(year, []).append((value, names[sid]))
+
+    gaps = {}
+    latest_count = 0
+    latest_year = max((years[-1] for years in series_years.values()), default=None)
+    for sid, years in series_years.items():
+        years.sort()
+        series_gaps = year_gaps(years)
+        if series_gaps:
+            gaps[columns.series_names[sid]] = series_gaps
+        if years[-1] == latest_year:
+            latest_count += 1
+
+    entry['countries'] = len(series_years)
+    entry['latest_year'] = latest_year
+    entry['countries_in_latest_year'] = latest_count
+    entry['values'] = value_summary(values)
+    entry['gaps'] = dict(sorted(gaps.items()))
+    entry['difficulty'] = dataset_difficulty(by_year)
+    entry['status'] = 'ok'
+    return entry
+
+
+def update_catalog(files=None, verbose=True):
+    """Bring the catalog up to date and return it. Unchanged files are skipped."""
+    path = catalog_file()
+    catalog = load_json(path)
+    if catalog.get('version') != CATALOG_VERSION:
+        catalog = {'version': CATALOG_VERSION, 'datasets': {}}
+    datasets = catalog['datasets']
+    files = dataset_files() if files is None else files
+    urls = source_urls()
+
+    scanned = 0
+    for file_path in files:
+        st = os.stat(file_path)
+        stat_key = [st.st_size, st.st_mtime_ns]
+        entry = datasets.get(file_path)
+        if entry and entry.get('stat') == stat_key:
+            entry['source_url'] = url_for(file_path, urls)
+            continue
+        sha256 = file_sha256(file_path)
+        if entry and entry.get('sha256') == sha256:
+            # Touched or copied over with the same content
+            entry['stat'] = stat_key
+            entry['source_url'] = url_for(file_path, urls)
+            continue
+        entry = scan_dataset(file_path)
+        entry['stat'] = stat_key
+        entry['sha256'] = sha256
+        entry['bytes'] = st.st_size
+        entry['source_url'] = url_for(file_path, urls)
+        datasets[file_path] = entry
+        scanned += 1
+        if verbose:
+            print(f"  ✓ {file_path}")
+
+    # Forget files that no longer exist
+    for file_path in [f for f in datasets if not os.path.exists(f)]:
+        del datasets[file_path]
+
+    save_json(path, catalog)
+    if verbose:
+        print(f"✓ Catalog updated: {scanned} scanned, {len(datasets) - scanned} unchanged")
+    return catalog
+
+
+def load_catalog():
+    """Return the catalog as last built (may be empty)."""
+    return load_json(catalog_file()).get('datasets', {})
+
+
+def query(datasets, name=None, source=None, min_countries=None, year_end=None):
+    """Filter catalog entries; year_end keeps datasets with data up to at least that year."""
+    matches = []
+    for file_path, entry in sorted(datasets.items()):
+        if entry.get('status') != 'ok':
+            continue
+        if name and name.lower() not in file_path.lower():
+            continue
+        if source and entry['schema'] != source:
+            continue
+        if min_countries is not None and entry['countries'] < min_countries:
+            continue
+        if year_end is not None and (entry['latest_year'] or 0) < year_end:
+            continue
+        matches.append((file_path, entry))
+    return matches
+
+
+def print_matches(matches):
+    for file_path, entry in matches:
+        print(f"{file_path}")
+        print(f"    {entry['schema']}, {entry['rows']} rows, years {entry['year_min']}-{entry['year_max']}, "
+              f"{entry['countries']} countries ({entry['countries_in_latest_year']} in {entry['latest_year']}), "
+              f"{len(entry['gaps'])} with gaps")
+    print(f"\n{len(matches)} dataset(s)")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build and query the dataset catalog.")
+    sub = parser.add_subparsers(dest='action', metavar='<action>')
+    sub.required = True
+
+    p = sub.add_parser('build', help="update the catalog")
+    p.add_argument('files', nargs='*')
+
+    p = sub.add_parser('query', help="list datasets matching filters")
+    p.add_argument('--name', help="substring of the file path")
+    p.add_argument('--source', help="schema source, e.g. owid_grapher")
+    p.add_argument('--min-countries', type=int)
+    p.add_argument('--year-end', type=int, help="require data up to at least this year")
+    p.add_argument('--json', action='store_true')
+
+    p = sub.add_parser('show', help="print the catalog entry of a file")
+    p.add_argument('file')
+
+    args = parser.parse_args(argv)
+
+    if args.action == 'build':
+        update_catalog(args.files or None)
+    elif args.action == 'query':
+        matches = query(load_catalog(), args.name, args.source, args.min_countries, args.year_end)
+        if args.json:
+            print(json.dumps(dict(matches), indent=2, ensure_ascii=False))
+        else:
+            print_matches(matches)
+    else:
+        entry = load_catalog().get(os.path.normpath(args.file))
+        if entry is None:
+            print(f"Error: '{args.file}' is not in the catalog (run: python3 catalog.py build)")
+            sys.exit(1)
+        print(json.dumps(entry, indent=2, ensure_ascii=False))
+
+
+if __name__ == "__main__":
+    main()
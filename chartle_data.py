@@ -0,0 +1,437 @@
+#!/usr/bin/env python3
+"""
+chartle_data.py - Single entry point for the chartle-data pipeline
+
+Each subcommand imports its subsystem only when it runs, so quick commands
+such as `top` do not pay for the fetch client, the country mappings or the
+bundle builder.
+
+Usage:
+    python3 chartle_data.py fetch
+    python3 chartle_data.py pipeline [--no-sheet] [--concurrency 4] [--workers N] [--skip-existing]
+    python3 chartle_data.py clean <file> [<file> ...] [--output-dir clean] [--fill linear|locf|none]
+    python3 chartle_data.py gapfill <input_csv> <output_csv> [--method linear] [--max-gap 3]
+    python3 chartle_data.py faostat-bulk <bulk.zip> [--element Production] [--items A,B] [--output-dir clean]
+    python3 chartle_data.py gbd <input_csv> <output_csv>
+    python3 chartle_data.py gbd-split <export_csv> [--filter measure=Deaths ...] [--causes A,B]
+    python3 chartle_data.py sort <input_csv> <output_csv>
+    python3 chartle_data.py combine <a.csv> <b.csv> [...] -o <output_csv> [--on-duplicate last] [--label-column Item] [--sort]
+    python3 chartle_data.py top <input_csv> [--year 2014]
+    python3 chartle_data.py build [config_file ...]
+    python3 chartle_data.py plan [--days 7] [--today YYYY-MM-DD] [--offline] [--max-built 30]
+    python3 chartle_data.py refresh <fresh_file> <cleaned_file> [--dry-run]
+    python3 chartle_data.py series <long_file> [<long_file> ...]
+    python3 chartle_data.py validate [file ...] [--report report.json] [--max-errors 1000]
+    python3 chartle_data.py catalog build|query|show ...
+    python3 chartle_data.py index build|series|year ...
+    python3 chartle_data.py difficulty build|query|show ...
+    python3 chartle_data.py derive ratio|share|rolling ... -o <output_csv>
+    python3 chartle_data.py cache stats|evict|clear [--max-mb 256]
+    python3 chartle_data.py columnar export|corpus|to-csv ...
+    python3 chartle_data.py watch [--interval 1.0] [--debounce 2.0] [--workers 2]
+    python3 chartle_data.py batch [commands_file]     (one subcommand per line, '-' for stdin)
+    python3 chartle_data.py check-startup [--budget-ms 30]
+"""
+
+import argparse
+import sys
+
+# Modules that must not be imported just to start the CLI
+SUBSYSTEM_MODULES = (
+    'FAOstat_clean', 'add_country_codes', 'async_pipeline', 'build_bundles', 'catalog',
+    'clean_GBD_ebola', 'columnar', 'combine', 'compact_dataset', 'country_names',
+    'dataset_io', 'delta_refresh', 'difficulty', 'faostat_bulk', 'fetch_data',
+    'file_cache', 'find_top_ebola_2014', 'gapfill', 'gbd_ingest', 'http_pool', 'join',
+    'offset_index', 'parallel_csv', 'planner', 'regions', 'reshape', 'result_cache',
+    'schema_detect', 'sort_ebola_by_year', 'validate', 'watch',
+)
+STARTUP_BUDGET_MS = 30
+
+
+def cmd_fetch(args):
+    import fetch_data
+    fetch_data.main()
+
+
+def cmd_pipeline(args):
+    import async_pipeline
+    argv = ['--concurrency', str(args.concurrency), '--host-delay', str(args.host_delay)]
+    if args.workers:
+        argv += ['--workers', str(args.workers)]
+    if args.no_sheet:
+        argv.append('--no-sheet')
+    if args.skip_existing:
+        argv.append('--skip-existing')
+    return async_pipeline.main(argv)
+
+
+def cmd_clean(args):
+    import FAOstat_clean
+    from dataset_io import clean_output_path
+    for filename in args.files:
+        argv = [filename, '--fill', args.fill, '--max-gap', str(args.max_gap)]
+        if args.output_dir:
+            argv += ['--output', clean_output_path(filename, args.output_dir)]
+        FAOstat_clean.main(argv)
+
+
+def cmd_faostat_bulk(args):
+    from faostat_bulk import ingest_bulk_zip
+    items = [i.strip() for i in args.items.split(',')] if args.items else None
+    ingest_bulk_zip(args.zip_path, args.output_dir, args.element, items, args.encoding)
+
+
+def cmd_gapfill(args):
+    import gapfill
+    gapfill.main([args.input_csv, args.output_csv, '--method', args.method,
+                  '--max-gap', str(args.max_gap)])
+
+
+def cmd_gbd(args):
+    from clean_GBD_ebola import run_gbd_pipeline
+    run_gbd_pipeline(args.input_csv, args.output_csv)
+
+
+def cmd_gbd_split(args):
+    import gbd_ingest
+    argv = [args.input_csv, '--output-dir', args.output_dir]
+    for item in args.filter or []:
+        argv += ['--filter', item]
+    if args.causes:
+        argv += ['--causes', args.causes]
+    gbd_ingest.main(argv)
+
+
+def cmd_sort(args):
+    from sort_ebola_by_year import sort_by_year
+    sort_by_year(args.input_csv, args.output_csv)
+
+
+def cmd_combine(args):
+    import combine
+    argv = args.files + ['-o', args.output, '--on-duplicate', args.on_duplicate]
+    if args.label_column:
+        argv += ['--label-column', args.label_column]
+    if args.sort:
+        argv.append('--sort')
+    combine.main(argv)
+
+
+def cmd_top(args):
+    from find_top_ebola_2014 import print_top_value
+    print_top_value(args.input_csv, args.year)
+
+
+def cmd_build(args):
+    import build_bundles
+    build_bundles.main(args.configs)
+
+
+def cmd_plan(args):
+    import planner
+    argv = ['--days', str(args.days), '--concurrency', str(args.concurrency),
+            '--max-built', str(args.max_built)]
+    if args.today:
+        argv += ['--today', args.today]
+    if args.offline:
+        argv.append('--offline')
+    if args.workers:
+        argv += ['--workers', str(args.workers)]
+    return planner.main(argv)
+
+
+def cmd_refresh(args):
+    from delta_refresh import refresh
+    refresh(args.fresh_file, args.cleaned_file, dry_run=args.dry_run)
+
+
+def cmd_series(args):
+    from reshape import write_series_for
+    for file_path in args.files:
+        out_path, count = write_series_for(file_path)
+        print(f"✓ {out_path} ({count} series)")
+
+
+def cmd_validate(args):
+    import validate
+    argv = list(args.files) + ['--max-errors', str(args.max_errors)]
+    if args.report:
+        argv += ['--report', args.report]
+    return validate.main(argv)
+
+
+def cmd_catalog(args):
+    import catalog
+    catalog.main(args.catalog_args)
+
+
+def cmd_difficulty(args):
+    import difficulty
+    difficulty.main(args.difficulty_args)
+
+
+def cmd_index(args):
+    import offset_index
+    offset_index.main(args.index_args)
+
+
+def cmd_derive(args):
+    import join
+    join.main(args.derive_args)
+
+
+def cmd_cache(args):
+    import result_cache
+    argv = [args.action]
+    if args.max_mb is not None:
+        argv += ['--max-mb', str(args.max_mb)]
+    result_cache.main(argv)
+
+
+def cmd_columnar(args):
+    import columnar
+    columnar.main(args.columnar_args)
+
+
+def cmd_watch(args):
+    import watch
+    watch.Watcher(interval=args.interval, debounce=args.debounce, workers=args.workers).run()
+
+
+def cmd_batch(args):
+    """Run many subcommands in this process, reusing loaded modules and caches."""
+    import shlex
+
+    if args.commands_file in (None, '-'):
+        lines = sys.stdin.read().splitlines()
+    else:
+        with open(args.commands_file, 'r', encoding='utf-8') as f:
+            lines = f.read().splitlines()
+
+    failures = 0
+    for line in lines:
+        line = line.strip()
+        if not line or line.startswith('#'):
+            continue
+        print(f"$ {line}")
+        status = run(shlex.split(line))
+        if status:
+            failures += 1
+            print(f"✗ Command failed with status {status}: {line}")
+            if not args.keep_going:
+                return status
+    if failures:
+        print(f"\n✗ {failures} command(s) failed")
+        return 1
+    return 0
+
+
+def measure_startup(runs=5):
+    """
+    Cold import + argument parser setup time of this CLI, measured in `runs`
+    fresh interpreters. Returns (best time in ms, subsystems imported eagerly).
+    """
+    import json
+    import os
+    import subprocess
+
+    probe = (
+        "import json, sys, time\n"
+        "t = time.perf_counter()\n"
+        "import chartle_data\n"
+        "chartle_data.build_parser()\n"
+        "elapsed = (time.perf_counter() - t) * 1000\n"
+        "loaded = sorted(m for m in chartle_data.SUBSYSTEM_MODULES if m in sys.modules)\n"
+        "print(json.dumps({'ms': elapsed, 'loaded': loaded}))\n"
+    )
+    cli_dir = os.path.dirname(os.path.abspath(__file__))
+    results = []
+    for _ in range(runs):
+        output = subprocess.run(
+            [sys.executable, '-c', probe], cwd=cli_dir,
+            capture_output=True, text=True, check=True,
+        ).stdout
+        results.append(json.loads(output))
+    return min(r['ms'] for r in results), results[0]['loaded']
+
+
+def cmd_check_startup(args):
+    """
+    Check the CLI startup time against the budget and that no subsystem is
+    imported eagerly. tests/test_startup.py runs the same check.
+    """
+    best_ms, eager = measure_startup(args.runs)
+    print(f"CLI startup: {best_ms:.1f} ms (best of {args.runs}, budget {args.budget_ms} ms)")
+    if eager:
+        print(f"✗ Subsystems imported at startup: {', '.join(eager)}")
+    if best_ms > args.budget_ms or eager:
+        print("✗ Startup budget exceeded")
+        return 1
+    print("✓ Within startup budget")
+    return 0
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(
+        prog='chartle-data',
+        description="Fetch, clean and build chartle puzzle data.",
+    )
+    sub = parser.add_subparsers(dest='command', metavar='<command>')
+    sub.required = True
+
+    p = sub.add_parser('fetch', help="fetch data.csv and every OWID data link into backup/")
+    p.set_defaults(func=cmd_fetch)
+
+    p = sub.add_parser('pipeline', help="download OWID data links and clean them as they arrive")
+    p.add_argument('--no-sheet', action='store_true', help="use the local data.csv")
+    p.add_argument('--concurrency', type=int, default=4, help="parallel downloads")
+    p.add_argument('--workers', type=int, help="cleaning processes")
+    p.add_argument('--host-delay', type=float, default=1.5, help="seconds between requests to a host")
+    p.add_argument('--skip-existing', action='store_true', help="do not download files already in backup/")
+    p.set_defaults(func=cmd_pipeline)
+
+    p = sub.add_parser('clean', help="clean FAOstat datasets into clean/ (FAOstat_clean.py)")
+    p.add_argument('files', nargs='+')
+    p.add_argument('--output-dir', help="directory for cleaned files (default: clean)")
+    p.add_argument('--fill', choices=('linear', 'locf', 'none'), default='none',
+                   help="fill missing years per country")
+    p.add_argument('--max-gap', type=int, default=3, help="longest run of missing years to fill")
+    p.set_defaults(func=cmd_clean)
+
+    p = sub.add_parser('gapfill', help="fill missing years in a long dataset")
+    p.add_argument('input_csv')
+    p.add_argument('output_csv')
+    p.add_argument('--method', choices=('linear', 'locf', 'none'), default='linear')
+    p.add_argument('--max-gap', type=int, default=3)
+    p.set_defaults(func=cmd_gapfill)
+
+    p = sub.add_parser('faostat-bulk', help="clean every item of a FAOSTAT bulk zip in one pass")
+    p.add_argument('zip_path')
+    p.add_argument('--element', default='Production', help="element to keep ('' keeps all)")
+    p.add_argument('--items', help="comma-separated item names to keep (default: all)")
+    p.add_argument('--output-dir', default='clean')
+    p.add_argument('--encoding', default='latin-1')
+    p.set_defaults(func=cmd_faostat_bulk)
+
+    p = sub.add_parser('gbd', help="clean a GBD export and add ISO codes")
+    p.add_argument('input_csv')
+    p.add_argument('output_csv')
+    p.set_defaults(func=cmd_gbd)
+
+    p = sub.add_parser('gbd-split', help="split a full GBD export into per-cause datasets")
+    p.add_argument('input_csv')
+    p.add_argument('--output-dir', default='clean')
+    p.add_argument('--filter', action='append', metavar='NAME=VALUE')
+    p.add_argument('--causes')
+    p.set_defaults(func=cmd_gbd_split)
+
+    p = sub.add_parser('sort', help="sort a dataset by year, then entity")
+    p.add_argument('input_csv')
+    p.add_argument('output_csv')
+    p.set_defaults(func=cmd_sort)
+
+    p = sub.add_parser('combine', help="merge datasets already sorted by (Entity, Year)")
+    p.add_argument('files', nargs='+')
+    p.add_argument('-o', '--output', required=True)
+    p.add_argument('--on-duplicate', choices=('first', 'last', 'error'), default='last')
+    p.add_argument('--label-column', help="add each input's file stem in this column")
+    p.add_argument('--sort', action='store_true', help="sort unsorted inputs instead of stopping")
+    p.set_defaults(func=cmd_combine)
+
+    p = sub.add_parser('top', help="print the top value for a year in a GBD dataset")
+    p.add_argument('input_csv')
+    p.add_argument('--year', default='2014')
+    p.set_defaults(func=cmd_top)
+
+    p = sub.add_parser('build', help="build per-puzzle JSON bundles from config/*.json")
+    p.add_argument('configs', nargs='*')
+    p.set_defaults(func=cmd_build)
+
+    p = sub.add_parser('plan', help="prefetch and prebuild the next days of scheduled puzzles")
+    p.add_argument('--days', type=int, default=7, help="scheduled dates to prepare")
+    p.add_argument('--today', help="plan from this date (YYYY-MM-DD)")
+    p.add_argument('--offline', action='store_true', help="build from local datasets only")
+    p.add_argument('--concurrency', type=int, default=4, help="parallel downloads")
+    p.add_argument('--workers', type=int, help="cleaning and build processes")
+    p.add_argument('--max-built', type=int, default=30, help="future days kept built")
+    p.set_defaults(func=cmd_plan)
+
+    p = sub.add_parser('refresh', help="apply a fresh download to its cleaned file as a delta")
+    p.add_argument('fresh_file')
+    p.add_argument('cleaned_file')
+    p.add_argument('--dry-run', action='store_true')
+    p.set_defaults(func=cmd_refresh)
+
+    p = sub.add_parser('series', help="write per-country .series.json files")
+    p.add_argument('files', nargs='+')
+    p.set_defaults(func=cmd_series)
+
+    p = sub.add_parser('validate', help="check cleaned datasets against the validation rules")
+    p.add_argument('files', nargs='*')
+    p.add_argument('--report', help="write the full report as JSON to this file")
+    p.add_argument('--max-errors', type=int, default=1000)
+    p.set_defaults(func=cmd_validate)
+
+    p = sub.add_parser('catalog', help="build or query the dataset catalog")
+    p.add_argument('catalog_args', nargs=argparse.REMAINDER, metavar='build|query|show ...')
+    p.set_defaults(func=cmd_catalog)
+
+    p = sub.add_parser('difficulty', help="query per-year puzzle-difficulty metrics from the catalog")
+    p.add_argument('difficulty_args', nargs=argparse.REMAINDER, metavar='build|query|show ...')
+    p.set_defaults(func=cmd_difficulty)
+
+    p = sub.add_parser('index', help="build or query sidecar offset indexes of cleaned CSVs")
+    p.add_argument('index_args', nargs=argparse.REMAINDER, metavar='build|series|year ...')
+    p.set_defaults(func=cmd_index)
+
+    p = sub.add_parser('derive', help="derive ratio, share or rolling-mean datasets (join.py)")
+    p.add_argument('derive_args', nargs=argparse.REMAINDER, metavar='ratio|share|rolling ...')
+    p.set_defaults(func=cmd_derive)
+
+    p = sub.add_parser('cache', help="inspect or trim the cleaner result cache")
+    p.add_argument('action', choices=('stats', 'evict', 'clear'))
+    p.add_argument('--max-mb', type=float)
+    p.set_defaults(func=cmd_cache)
+
+    p = sub.add_parser('columnar', help="export datasets to Parquet (needs pyarrow)")
+    p.add_argument('columnar_args', nargs=argparse.REMAINDER, metavar='export|corpus|to-csv ...')
+    p.set_defaults(func=cmd_columnar)
+
+    p = sub.add_parser('watch', help="reprocess datasets as they land in data/, backup/, config/")
+    p.add_argument('--interval', type=float, default=1.0, help="polling interval in seconds")
+    p.add_argument('--debounce', type=float, default=2.0, help="quiet time before processing a file")
+    p.add_argument('--workers', type=int, default=2, help="worker processes")
+    p.set_defaults(func=cmd_watch)
+
+    p = sub.add_parser('batch', help="run subcommands listed in a file in one process")
+    p.add_argument('commands_file', nargs='?')
+    p.add_argument('--keep-going', action='store_true', help="continue after a failing command")
+    p.set_defaults(func=cmd_batch)
+
+    p = sub.add_parser('check-startup', help="check CLI startup time against the budget")
+    p.add_argument('--budget-ms', type=float, default=STARTUP_BUDGET_MS)
+    p.add_argument('--runs', type=int, default=5)
+    p.set_defaults(func=cmd_check_startup)
+
+    return parser
+
+
+def run(argv):
+    """Parse `argv` and run the subcommand. Returns an exit status."""
+    parser = build_parser()
+    try:
+        args = parser.parse_args(argv)
+        return args.func(args) or 0
+    except SystemExit as e:
+        # The underlying scripts report errors with sys.exit()
+        if e.code is None:
+            return 0
+        return e.code if isinstance(e.code, int) else 1
+
+
+def main():
+    sys.exit(run(sys.argv[1:]))
+
+
+if __name__ == "__main__":
+    main()
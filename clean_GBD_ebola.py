@@ -1,5 +1,14 @@
 import csv
+import os
+import tempfile
 from add_country_codes import get_iso_mapping
+from clean_GBD_ebola_columns import remove_unneeded_columns
+from clean_GBD_ebola_entity import fix_entity_and_missing_codes
+from fill_missing_iso_codes import fill_missing_iso_codes
+from result_cache import get_result, put_result, result_key
+
+# Bump when a change to the GBD steps changes their output (invalidates cached results)
+CLEANER_VERSION = 1
 
 # Country name replacements for standardization
 COUNTRY_REPLACEMENTS = {
@@ -29,6 +38,28 @@ def clean_and_add_codes(input_csv, output_csv):
             row['Code'] = code
             writer.writerow(row)
 
+def run_gbd_pipeline(input_csv, output_csv):
+    """
+    Run the GBD cleaning steps in order on a raw GBD export:
+    standardize names + add codes -> keep columns -> drop rows without codes
+    -> fill remaining codes. Intermediate files go to a temporary directory.
+    Results are cached per raw file content (see result_cache.py).
+    """
+    cache_key = result_key(input_csv, 'clean_GBD_ebola', CLEANER_VERSION)
+    if get_result(cache_key, output_csv):
+        print(f"GBD export served from result cache and saved to {output_csv}")
+        return
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        cleaned = os.path.join(tmp_dir, 'cleaned.csv')
+        final = os.path.join(tmp_dir, 'final.csv')
+        ready = os.path.join(tmp_dir, 'ready.csv')
+        clean_and_add_codes(input_csv, cleaned)
+        remove_unneeded_columns(cleaned, final)
+        fix_entity_and_missing_codes(final, ready)
+        fill_missing_iso_codes(ready, output_csv)
+    put_result(cache_key, output_csv)
+    print(f"GBD export cleaned and saved to {output_csv}")
+
 if __name__ == '__main__':
     clean_and_add_codes(
         'data/GBD_ebola_death_rate.csv',
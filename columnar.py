@@ -0,0 +1,229 @@
+#!/usr/bin/env python3
+"""
+columnar.py - Parquet copies of cleaned datasets
+
+Exports cleaned datasets to Parquet so consumers can read a single column or
+a year range without parsing text:
+
+- Entity and Code are dictionary-encoded (each country name stored once)
+- Year is int32 and Value float64 (empty / NA cells become nulls)
+- rows are sorted by (Year, Entity) and written in small row groups with
+  min/max statistics, so each row group covers a narrow year range and year
+  filters skip the row groups that cannot match (iter_parquet_rows gives
+  the rows back in the (Entity, Year) order of the CSV datasets)
+- the original value column name is kept in the file metadata
+
+A whole directory of datasets can also be written as one corpus partitioned
+by dataset name (corpus/dataset=<name>/data.parquet), readable with any
+Hive-partitioning aware reader.
+
+dataset_io.iter_long_rows() reads .parquet files transparently, so the
+pipeline stages built on it accept Parquet input as well as CSV.
+
+Requires the optional `pyarrow` package (pip install pyarrow).
+
+Usage:
+    python3 columnar.py export <dataset.csv> [-o dataset.parquet]
+    python3 columnar.py corpus <out_dir> [dataset.csv ...]
+    python3 columnar.py to-csv <dataset.parquet> <output.csv>
+"""
+
+import argparse
+import os
+import sys
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # optional dependency, checked when used
+    pa = pq = None
+
+# About five years of ~200 countries per row group, so year filters prune
+ROW_GROUP_SIZE = 1024
+COMPRESSION = 'zstd'
+VALUE_COLUMN_KEY = b'chartle.value_column'
+SOURCE_KEY = b'chartle.source'
+PARTITION_KEY = 'dataset'
+
+
+def require_pyarrow():
+    if pa is None:
+        raise ImportError(
+            "Parquet support needs the optional 'pyarrow' package: pip install pyarrow"
+        )
+
+
+def _parse_value(value):
+    if value in ("", "NA"):
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        return None
+
+
+def format_value(value):
+    """Render a float from Parquet the way it appears in the CSV datasets."""
+    if value is None:
+        return ""
+    if value.is_integer():
+        return str(int(value))
+    return repr(value)
+
+
+def build_table(file_path):
+    """Read a CSV dataset into a dictionary-encoded Arrow table sorted by (Year, Entity)."""
+    require_pyarrow()
+    from dataset_io import iter_long_rows, read_header
+    from schema_detect import detect_schema
+
+    if detect_schema(file_path).layout == 'long':
+        rows = iter_long_rows(file_path)
+        value_column = (read_header(file_path) + ['Value'] * 4)[3]
+    else:
+        from reshape import iter_wide_as_long
+        rows = iter_wide_as_long(file_path)
+        value_column = 'Value'
+
+    rows = sorted(rows, key=lambda r: (r[2], r[0]))
+    table = pa.table({
+        'Entity': pa.array([r[0] for r in rows], pa.string()).dictionary_encode(),
+        'Code': pa.array([r[1] for r in rows], pa.string()).dictionary_encode(),
+        'Year': pa.array([r[2] for r in rows], pa.int32()),
+        'Value': pa.array([_parse_value(r[3]) for r in rows], pa.float64()),
+    })
+    return table.replace_schema_metadata({
+        VALUE_COLUMN_KEY: value_column.encode('utf-8'),
+        SOURCE_KEY: os.path.basename(file_path).encode('utf-8'),
+    })
+
+
+def write_table(table, out_path):
+    os.makedirs(os.path.dirname(out_path) or '.', exist_ok=True)
+    tmp_path = out_path + '.tmp'
+    pq.write_table(
+        table, tmp_path,
+        row_group_size=ROW_GROUP_SIZE,
+        compression=COMPRESSION,
+        use_dictionary=['Entity', 'Code'],
+        write_statistics=True,
+    )
+    os.replace(tmp_path, out_path)
+
+
+def export_dataset(file_path, out_path=None):
+    """Write `file_path` as Parquet next to it (or to `out_path`). Returns the output path."""
+    out_path = out_path or os.path.splitext(file_path)[0] + '.parquet'
+    write_table(build_table(file_path), out_path)
+    return out_path
+
+
+def dataset_name(file_path):
+    return os.path.splitext(os.path.basename(file_path))[0]
+
+
+def export_corpus(files, out_dir):
+    """
+    Write each dataset to out_dir/dataset=<name>/data.parquet. Returns the
+    number of datasets written.
+    """
+    from schema_detect import detect_schema
+
+    written = 0
+    for file_path in files:
+        schema = detect_schema(file_path)
+        if schema.layout == 'long' and schema.code_col is None:
+            print(f"  ⊘ {file_path}: not a cleaned dataset ({schema.source}), skipped")
+            continue
+        partition = os.path.join(out_dir, f"{PARTITION_KEY}={dataset_name(file_path)}")
+        write_table(build_table(file_path), os.path.join(partition, 'data.parquet'))
+        written += 1
+    return written
+
+
+def corpus_path(out_dir, name):
+    """Path of one dataset inside a corpus written by export_corpus."""
+    return os.path.join(out_dir, f"{PARTITION_KEY}={name}", 'data.parquet')
+
+
+def read_value_column(file_path):
+    """Original value column name stored in the file metadata."""
+    require_pyarrow()
+    metadata = pq.read_schema(file_path).metadata or {}
+    return metadata.get(VALUE_COLUMN_KEY, b'Value').decode('utf-8')
+
+
+def read_table(file_path, columns=None, year_start=None, year_end=None):
+    """
+    Read selected columns of a Parquet dataset, keeping only years within
+    [year_start, year_end]. Row groups outside the range are not read.
+    """
+    require_pyarrow()
+    filters = []
+    if year_start is not None:
+        filters.append(('Year', '>=', year_start))
+    if year_end is not None:
+        filters.append(('Year', '<=', year_end))
+    return pq.read_table(file_path, columns=columns, filters=filters or None)
+
+
+def iter_parquet_rows(file_path, year_start=None, year_end=None):
+    """
+    Yield (entity, code, year, value) like dataset_io.iter_long_rows, in
+    (Entity, Year) order; value is a string.
+    """
+    table = read_table(file_path, ['Entity', 'Code', 'Year', 'Value'], year_start, year_end)
+    columns = [table.column(name).to_pylist() for name in ('Entity', 'Code', 'Year', 'Value')]
+    for entity, code, year, value in sorted(zip(*columns), key=lambda r: (r[0], r[2])):
+        yield entity, code, year, format_value(value)
+
+
+def to_csv(file_path, out_path):
+    """Write a Parquet dataset back to the long CSV layout."""
+    from dataset_io import write_long_csv
+
+    header = ['Entity', 'Code', 'Year', read_value_column(file_path)]
+    write_long_csv(out_path, header, iter_parquet_rows(file_path))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export datasets to Parquet and back.")
+    sub = parser.add_subparsers(dest='action', metavar='<action>')
+    sub.required = True
+
+    p = sub.add_parser('export', help="write one dataset as Parquet")
+    p.add_argument('file')
+    p.add_argument('-o', '--output')
+
+    p = sub.add_parser('corpus', help="write datasets as one corpus partitioned by name")
+    p.add_argument('out_dir')
+    p.add_argument('files', nargs='*', help="default: every dataset in clean/ and data/")
+
+    p = sub.add_parser('to-csv', help="convert a Parquet dataset back to CSV")
+    p.add_argument('file')
+    p.add_argument('output')
+
+    args = parser.parse_args(argv)
+    try:
+        require_pyarrow()
+    except ImportError as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+
+    if args.action == 'export':
+        out_path = export_dataset(args.file, args.output)
+        print(f"✓ {args.file} -> {out_path} ({os.path.getsize(out_path)} bytes)")
+    elif args.action == 'corpus':
+        files = args.files
+        if not files:
+            from catalog import dataset_files
+            files = dataset_files(["clean", "data"])
+        count = export_corpus(files, args.out_dir)
+        print(f"✓ {count} datasets written to {args.out_dir}/")
+    else:
+        to_csv(args.file, args.output)
+        print(f"✓ {args.file} -> {args.output}")
+
+
+if __name__ == "__main__":
+    main()
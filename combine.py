@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+"""
+combine.py - Merge or append datasets that are already sorted by (Entity, Year)
+
+Every cleaner writes its output sorted by (Entity, Year), so combining
+datasets does not need a full re-sort: the inputs are k-way merged in one
+streaming pass, holding one row per input in memory.
+
+- append (default): the inputs hold the same variable, e.g. an existing
+  cleaned GBD file and the export of a new year. Rows are keyed on
+  (Entity, Year) and keys present in several inputs are resolved by the
+  duplicate policy:
+      first  keep the row from the earliest input
+      last   keep the row from the latest input (revisions win)
+      error  stop at the first duplicate
+- --label-column NAME: the inputs are different variables, e.g. the
+  production-of-* files. Each row gets the input's label (its file stem) in
+  an extra column and rows are keyed on (Entity, Year, label), giving one
+  multi-commodity table.
+
+Each input is checked for sortedness as it is read; an out-of-order row
+stops the merge with the file and line. With --sort, inputs that are not
+sorted (e.g. GBD files ordered by year) are first copied to a temporary
+directory sorted by (Entity, Year), with dataset_io.sort_long_csv. The
+output is written to a temporary file first, so it may be one of the inputs.
+
+Usage:
+    python3 combine.py <a.csv> <b.csv> [...] -o out.csv [--on-duplicate first|last|error] [--sort]
+    python3 combine.py production-of-*.csv -o production.csv --label-column Item
+"""
+
+import argparse
+import csv
+import heapq
+import os
+import sys
+import tempfile
+from itertools import groupby
+
+from dataset_io import LONG_HEADER, iter_long_rows, read_header, sort_long_csv
+from schema_detect import detect_schema
+
+DUPLICATE_POLICIES = ('first', 'last', 'error')
+
+
+def iter_checked_rows(file_path, label=None):
+    """
+    Yield ((entity, year[, label]), row) from a long dataset, raising
+    ValueError as soon as a row sorts before the one preceding it.
+    """
+    previous = None
+    for n, (entity, code, year, value) in enumerate(iter_long_rows(file_path), 1):
+        if previous is not None and (entity, year) < previous:
+            raise ValueError(
+                f"{file_path} is not sorted by (Entity, Year): "
+                f"data row {n} ({entity}, {year}) comes after {previous} (use --sort)"
+            )
+        previous = (entity, year)
+        if label is None:
+            yield previous, (entity, code, year, value)
+        else:
+            yield (entity, year, label), (entity, code, year, value, label)
+
+
+def input_label(file_path):
+    return os.path.splitext(os.path.basename(file_path))[0]
+
+
+def is_sorted(file_path):
+    try:
+        for _ in iter_checked_rows(file_path):
+            pass
+    except ValueError:
+        return False
+    return True
+
+
+def sorted_inputs(files, tmp_dir):
+    """
+    `files` with every input that is not sorted by (Entity, Year) replaced
+    by a sorted copy in `tmp_dir`. Copies keep the input's file stem, which
+    --label-column uses.
+    """
+    result = []
+    for i, file_path in enumerate(files):
+        if is_sorted(file_path):
+            result.append(file_path)
+            continue
+        copy_path = os.path.join(tmp_dir, str(i), input_label(file_path) + '.csv')
+        os.makedirs(os.path.dirname(copy_path))
+        print(f"  Sorting {file_path} by (Entity, Year)")
+        result.append(sort_long_csv(file_path, copy_path))
+    return result
+
+
+def merge_rows(files, on_duplicate='last', label_column=None):
+    """
+    Yield merged rows of `files` in (Entity, Year) order, resolving
+    duplicate keys with `on_duplicate`. Ties keep input order, so the
+    first row of a run of equal keys comes from the earliest input.
+    """
+    if on_duplicate not in DUPLICATE_POLICIES:
+        raise ValueError(f"Unknown duplicate policy '{on_duplicate}' "
+                         f"(expected one of {', '.join(DUPLICATE_POLICIES)})")
+
+    streams = [iter_checked_rows(path, input_label(path) if label_column else None)
+               for path in files]
+    merged = heapq.merge(*streams, key=lambda item: item[0])
+    for key, group in groupby(merged, key=lambda item: item[0]):
+        _, row = next(group)
+        for _, duplicate in group:
+            if on_duplicate == 'error':
+                raise ValueError(f"Duplicate key {key}: {row} and {duplicate}")
+            if on_duplicate == 'last':
+                row = duplicate
+        yield row
+
+
+def combine(files, out_path, on_duplicate='last', label_column=None, sort=False):
+    """
+    Merge sorted long datasets into `out_path`, keeping the first input's
+    header. With `sort`, unsorted inputs are sorted first instead of
+    raising ValueError. Returns the number of rows written.
+    """
+    for file_path in files:
+        schema = detect_schema(file_path)
+        if schema.layout != 'long':
+            raise ValueError(f"{file_path} is a {schema.layout} dataset; only long datasets can be combined")
+
+    header = read_header(files[0])[:4]
+    header += LONG_HEADER[len(header):]
+    if label_column:
+        header.append(label_column)
+
+    tmp_path = out_path + '.tmp'
+    written = 0
+    try:
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            if sort:
+                files = sorted_inputs(files, tmp_dir)
+            with open(tmp_path, 'w', newline='', encoding='utf-8') as f:
+                writer = csv.writer(f)
+                writer.writerow(header)
+                for row in merge_rows(files, on_duplicate, label_column):
+                    writer.writerow(row)
+                    written += 1
+        os.replace(tmp_path, out_path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    return written
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Merge datasets sorted by (Entity, Year) in one pass.")
+    parser.add_argument('files', nargs='+')
+    parser.add_argument('-o', '--output', required=True)
+    parser.add_argument('--on-duplicate', choices=DUPLICATE_POLICIES, default='last',
+                        help="which row to keep when inputs share a key (default: last)")
+    parser.add_argument('--label-column',
+                        help="add each input's file stem in this column and key rows on it too")
+    parser.add_argument('--sort', action='store_true',
+                        help="sort inputs that are not sorted by (Entity, Year) instead of stopping")
+    args = parser.parse_args(argv)
+
+    for file_path in args.files:
+        if not os.path.exists(file_path):
+            print(f"Error: File '{file_path}' does not exist")
+            sys.exit(1)
+
+    try:
+        written = combine(args.files, args.output, args.on_duplicate, args.label_column, args.sort)
+    except ValueError as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+    print(f"✓ {len(args.files)} datasets merged: {written} rows -> {args.output}")
+
+
+if __name__ == "__main__":
+    main()
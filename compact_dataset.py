@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+"""
+compact_dataset.py - Compact in-memory rows for the cleaners
+
+A cleaner holding rows as [entity, code, year, value] lists pays for a list
+and three or four string objects per row, a few hundred bytes. CompactRows
+stores the same rows in columns:
+
+- (entity, code) pairs interned to a small int in an EntityTable, seeded
+  from the canonical country names so most pairs are known up front
+- years in an int array, values in a float array, plus the number of
+  decimal places each value was written with in a byte array
+
+Values are kept exactly as written: a value goes in the float array if
+formatting the float with its decimal places gives back the original text
+("3900", "0.56", "1160.00" as FAOSTAT writes it), or if format_number does
+("1e-05"). Only other text ("", "NA", "1,160") goes in a small overflow
+dict by row index. Years that are not plain integers are kept the same way.
+Rows read back are identical to the rows added, at roughly 17 bytes per row.
+
+Usage:
+    python3 compact_dataset.py <long_dataset.csv>   (memory comparison)
+"""
+
+import sys
+from array import array
+
+YEAR = 0
+VALUE = 1
+YEAR_MIN, YEAR_MAX = -2 ** 31, 2 ** 31 - 1   # range of the 'i' year array
+SHORTEST = -1       # decimals of a value written back with format_number
+MAX_DECIMALS = 127  # range of the 'b' decimals array
+
+
+def format_number(number):
+    """Text a float value is written back as: 3900.0 -> '3900', 0.5 -> '0.5'"""
+    if number.is_integer() and abs(number) < 1e16:
+        return str(int(number))
+    return repr(number)
+
+
+def value_decimals(number, text):
+    """
+    Decimal places that format `number` back to `text`: SHORTEST when
+    format_number does, None when nothing does.
+    """
+    decimals = len(text) - text.index('.') - 1 if '.' in text else 0
+    if decimals <= MAX_DECIMALS and f"{number:.{decimals}f}" == text:
+        return decimals
+    if format_number(number) == text:
+        return SHORTEST
+    return None
+
+
+def format_value(number, decimals):
+    return format_number(number) if decimals == SHORTEST else f"{number:.{decimals}f}"
+
+
+class EntityTable:
+    """Interns (entity, code) pairs to consecutive small ints."""
+
+    __slots__ = ('entities', 'codes', 'ids')
+
+    def __init__(self, pairs=()):
+        self.entities = []
+        self.codes = []
+        self.ids = {}
+        for entity, code in pairs:
+            self.intern(entity, code)
+
+    @classmethod
+    def from_canonical_names(cls, canonical_names):
+        """Table seeded with the {iso_code: name} pairs of the country table."""
+        return cls(sorted((name, code) for code, name in canonical_names.items()))
+
+    def intern(self, entity, code):
+        key = (entity, code)
+        pair_id = self.ids.get(key)
+        if pair_id is None:
+            pair_id = self.ids[key] = len(self.entities)
+            self.entities.append(entity)
+            self.codes.append(code)
+        return pair_id
+
+    def __len__(self):
+        return len(self.entities)
+
+
+class CompactRows:
+    """
+    Append-only (entity, code, year, value) rows in columnar arrays.
+    Iterating yields [entity, code, year_text, value_text] lists.
+    """
+
+    __slots__ = ('table', 'ids', 'years', 'values', 'decimals', 'overflow')
+
+    def __init__(self, table=None):
+        self.table = table if table is not None else EntityTable()
+        self.ids = array('I')
+        self.years = array('i')
+        self.values = array('d')
+        self.decimals = array('b')
+        self.overflow = {}   # (row index, YEAR or VALUE) -> original text
+
+    def append(self, entity, code, year, value):
+        index = len(self.ids)
+        self.ids.append(self.table.intern(entity, code))
+
+        number = year
+        if not isinstance(year, int):
+            try:
+                number = int(year)
+            except ValueError:
+                number = None
+            if number is not None and str(number) != year:
+                number = None
+        if number is not None and YEAR_MIN <= number <= YEAR_MAX:
+            self.years.append(number)
+        else:
+            self.years.append(0)
+            self.overflow[index, YEAR] = str(year)
+
+        try:
+            number = float(value)
+        except ValueError:
+            number = None
+        decimals = value_decimals(number, value) if number is not None else None
+        if decimals is not None:
+            self.values.append(number)
+            self.decimals.append(decimals)
+        else:
+            self.values.append(0.0)
+            self.decimals.append(SHORTEST)
+            self.overflow[index, VALUE] = value
+
+    def __len__(self):
+        return len(self.ids)
+
+    def row(self, index):
+        pair_id = self.ids[index]
+        year = self.overflow.get((index, YEAR))
+        if year is None:
+            year = str(self.years[index])
+        value = self.overflow.get((index, VALUE))
+        if value is None:
+            value = format_value(self.values[index], self.decimals[index])
+        return [self.table.entities[pair_id], self.table.codes[pair_id], year, value]
+
+    def __iter__(self):
+        for index in range(len(self.ids)):
+            yield self.row(index)
+
+    def keyed_by_year(self):
+        """Yield (year, row) pairs, the shape the cleaners sort and merge on."""
+        for index in range(len(self.ids)):
+            yield self.years[index], self.row(index)
+
+    def sort_by_year(self):
+        """Stable in-place sort by year."""
+        order = sorted(range(len(self.ids)), key=self.years.__getitem__)
+        position = {old: new for new, old in enumerate(order)}
+        self.ids = array('I', (self.ids[i] for i in order))
+        self.years = array('i', (self.years[i] for i in order))
+        self.values = array('d', (self.values[i] for i in order))
+        self.decimals = array('b', (self.decimals[i] for i in order))
+        self.overflow = {(position[i], column): text for (i, column), text in self.overflow.items()}
+
+    @classmethod
+    def from_rows(cls, rows, table=None):
+        """Build from [entity, code, year, value] rows."""
+        compact = cls(table)
+        for entity, code, year, value in rows:
+            compact.append(entity, code, year, value)
+        return compact
+
+    def nbytes(self):
+        """
+        Approximate memory held by the row columns, including the overflow
+        dict's key tuples and texts (the table is shared).
+        """
+        return (sys.getsizeof(self.ids) + sys.getsizeof(self.years) +
+                sys.getsizeof(self.values) + sys.getsizeof(self.decimals) +
+                sys.getsizeof(self.overflow) +
+                sum(sys.getsizeof(key) + sys.getsizeof(key[0]) + sys.getsizeof(text)
+                    for key, text in self.overflow.items()))
+
+
+def list_rows_nbytes(rows):
+    """Approximate memory of the same rows held as lists of strings."""
+    total = sys.getsizeof(rows)
+    for row in rows:
+        total += sys.getsizeof(row) + sum(sys.getsizeof(cell) for cell in row)
+    return total
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    if len(argv) != 1:
+        print("Usage: python3 compact_dataset.py <long_dataset.csv>")
+        sys.exit(1)
+
+    from dataset_io import iter_long_rows
+
+    rows = [[entity, code, str(year), value] for entity, code, year, value in iter_long_rows(argv[0])]
+    compact = CompactRows.from_rows(rows)
+    if [list(r) for r in compact] != rows:
+        print("✗ Rows differ after the round trip")
+        sys.exit(1)
+    n = max(len(rows), 1)
+    as_lists = list_rows_nbytes(rows)
+    print(f"{len(rows)} rows, {len(compact.table)} entities, {len(compact.overflow)} overflow cells")
+    print(f"  lists of strings: {as_lists / n:.0f} bytes/row")
+    print(f"  compact rows:     {compact.nbytes() / n:.0f} bytes/row")
+
+
+if __name__ == "__main__":
+    main()
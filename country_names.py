@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+country_names.py - Canonical display name for each ISO 3-letter code
+
+The cleaners standardize country names to the OWID spelling used by the
+banana production dataset. Instead of re-reading that file on every clean,
+the ISO -> name table is shipped as canonical_names.csv and loaded from a
+marshal copy in .cache/, which is rebuilt only when the CSV changes.
+
+The table is regenerated from its source dataset with:
+    python3 country_names.py build [source_csv]
+
+It is only rewritten when the source file's content hash differs from the
+one it was last built from. Codes missing from the source keep their
+existing names.
+"""
+
+import csv
+import hashlib
+import marshal
+import os
+import sys
+
+from file_cache import atomic_write, cache_path, file_fingerprint, file_sha256, load_json, save_json
+from regions import is_aggregate
+
+PROJECT_DIR = os.path.dirname(os.path.abspath(__file__))
+NAMES_FILE = os.path.join(PROJECT_DIR, "canonical_names.csv")
+SOURCE_FILE = os.path.join(PROJECT_DIR, "data", "banana-production.csv")
+
+_loaded = {}
+
+
+def names_from_dataset(file_path):
+    """Read {iso_code: entity} for every country row of a long OWID dataset."""
+    iso_to_name = {}
+    with open(file_path, 'r', newline='', encoding='utf-8') as f:
+        reader = csv.reader(f)
+        next(reader, None)
+        for row in reader:
+            if len(row) < 2:
+                continue
+            entity_name, iso_code = row[0], row[1]
+            if (len(iso_code) == 3 and iso_code.isupper() and
+                    not is_aggregate(entity_name, iso_code)):
+                iso_to_name[iso_code] = entity_name
+    return iso_to_name
+
+
+def read_names_csv(file_path=NAMES_FILE):
+    with open(file_path, 'r', newline='', encoding='utf-8') as f:
+        reader = csv.reader(f)
+        next(reader, None)
+        return {row[0]: row[1] for row in reader if len(row) >= 2}
+
+
+def names_version(file_path=NAMES_FILE):
+    """Short content hash of the names table, used as its version."""
+    with open(file_path, 'rb') as f:
+        return hashlib.sha256(f.read()).hexdigest()[:12]
+
+
+def load_canonical_names(file_path=NAMES_FILE):
+    """
+    Return {iso_code: display_name}. Served from memory, then from the
+    marshal cache, and only parsed from CSV when the table changed.
+    """
+    if not os.path.exists(file_path):
+        return {}
+
+    fingerprint = file_fingerprint(file_path)
+    cached = _loaded.get(file_path)
+    if cached and cached[0] == fingerprint:
+        return cached[1]
+
+    binary_path = cache_path('canonical_names', fingerprint + '.marshal')
+    try:
+        with open(binary_path, 'rb') as f:
+            names = marshal.load(f)
+    except (OSError, EOFError, ValueError, TypeError):
+        names = read_names_csv(file_path)
+        with atomic_write(binary_path, 'wb') as f:
+            marshal.dump(names, f)
+
+    _loaded[file_path] = (fingerprint, names)
+    return names
+
+
+def build_names_table(source_path=SOURCE_FILE, names_path=NAMES_FILE, force=False):
+    """
+    Regenerate the names table from `source_path` if the source changed since
+    the last build. Returns True when the table was rewritten.
+    """
+    state_path = cache_path('canonical_names', 'source_state.json')
+    state = load_json(state_path)
+    source_hash = file_sha256(source_path)
+    if not force and state.get(source_path) == source_hash and os.path.exists(names_path):
+        return False
+
+    names = read_names_csv(names_path) if os.path.exists(names_path) else {}
+    names.update(names_from_dataset(source_path))
+
+    with open(names_path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(['Code', 'Entity'])
+        for code in sorted(names):
+            writer.writerow([code, names[code]])
+
+    state[source_path] = source_hash
+    save_json(state_path, state)
+    return True
+
+
+def main():
+    if len(sys.argv) < 2 or sys.argv[1] != 'build':
+        print("Usage: python3 country_names.py build [source_csv] [--force]")
+        sys.exit(1)
+
+    args = [a for a in sys.argv[2:] if a != '--force']
+    source_path = args[0] if args else SOURCE_FILE
+    if not os.path.exists(source_path):
+        print(f"Error: File '{source_path}' does not exist")
+        sys.exit(1)
+
+    if build_names_table(source_path, force='--force' in sys.argv):
+        print(f"✓ {os.path.basename(NAMES_FILE)} rebuilt from {source_path} "
+              f"({len(read_names_csv())} names, version {names_version()})")
+    else:
+        print(f"✓ {os.path.basename(NAMES_FILE)} is up to date with {source_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,177 @@
+#!/usr/bin/env python3
+"""
+Shared helpers for reading and writing datasets in the long layout used by
+the cleaned outputs and OWID grapher downloads:
+
+    Entity, Code, Year, <value column>
+
+The column names vary between sources (Entity/entity, Code/CODE/code,
+val/Value/<long OWID name>) but the positions do not, so rows are read by
+position.
+
+Parquet exports written by columnar.py (*.parquet) are accepted wherever a
+long CSV is read.
+"""
+
+import csv
+import heapq
+import os
+import tempfile
+from collections import OrderedDict
+from itertools import islice
+
+from file_cache import atomic_path
+
+LONG_HEADER = ['Entity', 'Code', 'Year', 'Value']
+
+PARQUET_SUFFIX = '.parquet'
+
+# Rows sorted in memory at a time by sort_long_csv; larger files are merged from sorted runs
+SORT_CHUNK_ROWS = 500_000
+
+# Open files kept by OutputFiles; the least recently written is closed first
+MAX_OPEN_FILES = 64
+
+# Cleaned outputs are written here; raw inputs in data/ and backup/ are never modified
+CLEAN_DIR = "clean"
+
+
+def clean_output_path(raw_path, output_dir=CLEAN_DIR):
+    """Where the cleaned version of `raw_path` is written: clean/<same name>.csv"""
+    name = os.path.splitext(os.path.basename(raw_path))[0] + '.csv'
+    return os.path.join(output_dir, name)
+
+
+def read_header(file_path):
+    """Return the header row of a CSV file (or the columns of a Parquet export)."""
+    if file_path.endswith(PARQUET_SUFFIX):
+        from columnar import read_value_column
+        return LONG_HEADER[:3] + [read_value_column(file_path)]
+    with open(file_path, 'r', newline='', encoding='utf-8') as f:
+        return next(csv.reader(f), [])
+
+
+def iter_long_rows(file_path):
+    """
+    Yield (entity, code, year, value) tuples from a long-layout CSV.
+    Year is an int, value is kept as the original string. Rows without a
+    parseable year are skipped. Parquet exports written by columnar.py are
+    read column-wise through pyarrow.
+    """
+    if file_path.endswith(PARQUET_SUFFIX):
+        from columnar import iter_parquet_rows
+        yield from iter_parquet_rows(file_path)
+        return
+    with open(file_path, 'r', newline='', encoding='utf-8') as f:
+        reader = csv.reader(f)
+        next(reader, None)
+        for row in reader:
+            if len(row) < 4:
+                continue
+            try:
+                year = int(row[2])
+            except ValueError:
+                continue
+            yield row[0], row[1], year, row[3]
+
+
+def write_long_csv(file_path, header, rows, index=False):
+    """
+    Write (entity, code, year, value) rows under the given header. With
+    `index`, returns the offset_index.IndexedWriter that recorded the rows;
+    call its save() with the file's final path.
+    """
+    with open(file_path, 'w', newline='', encoding='utf-8') as f:
+        if index:
+            from offset_index import IndexedWriter
+            writer = IndexedWriter(f)
+        else:
+            writer = csv.writer(f)
+        writer.writerow(header)
+        for entity, code, year, value in rows:
+            writer.writerow([entity, code, year, value])
+    return writer if index else None
+
+
+class OutputFiles:
+    """
+    CSV writers of many output files written row by row, with a bounded
+    number of open file handles. `path_for(key)` names the file of a key;
+    each file starts with `header`.
+    """
+
+    def __init__(self, path_for, header, max_open=MAX_OPEN_FILES):
+        self.path_for = path_for
+        self.header = header
+        self.max_open = max_open
+        self.open_files = OrderedDict()   # key -> (file, writer), least recent first
+        self.paths = {}                   # key -> output path
+        self.rows = {}                    # key -> rows written
+
+    def writer_for(self, key):
+        entry = self.open_files.get(key)
+        if entry is not None:
+            self.open_files.move_to_end(key)
+            return entry[1]
+
+        if len(self.open_files) >= self.max_open:
+            _, (old_file, _) = self.open_files.popitem(last=False)
+            old_file.close()
+
+        if key in self.paths:
+            f = open(self.paths[key], 'a', newline='', encoding='utf-8')
+            writer = csv.writer(f)
+        else:
+            path = self.path_for(key)
+            f = open(path, 'w', newline='', encoding='utf-8')
+            writer = csv.writer(f)
+            writer.writerow(self.header)
+            self.paths[key] = path
+            self.rows[key] = 0
+        self.open_files[key] = (f, writer)
+        return writer
+
+    def write(self, key, row):
+        self.writer_for(key).writerow(row)
+        self.rows[key] += 1
+
+    def close(self):
+        for f, _ in self.open_files.values():
+            f.close()
+        self.open_files.clear()
+
+
+def sort_long_csv(file_path, out_path=None, chunk_rows=SORT_CHUNK_ROWS, keep=None, index=False):
+    """
+    Sort a long CSV by (Entity, Year) into `out_path` (default: in place).
+    Rows without a parseable year are dropped, as iter_long_rows does, and
+    so are rows for which `keep(row)` is false. See sort_long_rows.
+    """
+    rows = iter_long_rows(file_path)
+    if keep is not None:
+        rows = filter(keep, rows)
+    return sort_long_rows(rows, read_header(file_path), out_path or file_path, chunk_rows, index)
+
+
+def sort_long_rows(rows, header, out_path, chunk_rows=SORT_CHUNK_ROWS, index=False):
+    """
+    Write (entity, code, year, value) rows to `out_path` sorted by
+    (Entity, Year). At most `chunk_rows` rows are held in memory: more are
+    sorted in runs spilled to temporary files and merged. With `index`, the
+    offset index of the output is built while it is written. Returns
+    `out_path`.
+    """
+    key = lambda row: (row[0], row[2])
+    rows = iter(rows)
+    with atomic_path(out_path) as tmp_path, tempfile.TemporaryDirectory() as tmp_dir:
+        runs = []
+        chunk = sorted(islice(rows, chunk_rows), key=key)
+        while len(chunk) == chunk_rows:
+            runs.append(os.path.join(tmp_dir, f"run-{len(runs)}.csv"))
+            write_long_csv(runs[-1], header, chunk)
+            chunk = sorted(islice(rows, chunk_rows), key=key)
+        sorted_rows = heapq.merge(*(iter_long_rows(run) for run in runs), chunk, key=key)
+        writer = write_long_csv(tmp_path, header, sorted_rows, index)
+    if index:
+        writer.save(out_path)
+    return out_path
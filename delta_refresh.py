@@ -0,0 +1,267 @@
+#!/usr/bin/env python3
+"""
+delta_refresh.py - Apply a freshly fetched dataset to its cleaned version
+as a delta instead of re-cleaning the full history.
+
+Rows are keyed on (Code, Year). Comparing the fresh file with the previous
+cleaned output gives three lists:
+1. added   - keys only in the fresh file (usually the new year)
+2. changed - keys in both files whose value differs (revisions)
+3. removed - keys only in the cleaned file
+
+The delta is saved next to the cleaned file as <name>.delta.json and applied
+to the cleaned CSV and to its <name>.series.json, if one exists. The other
+artifacts derived from the cleaned file are then brought up to date:
+- its offset index and Parquet copy, when they exist, are rebuilt
+- its catalog entry is rescanned, when a catalog has been built
+- the bundles of the configs using it are rebuilt
+When nothing changed the cleaned file is not rewritten.
+
+Usage:
+    python3 delta_refresh.py <fresh_file> <cleaned_file> [--dry-run]
+
+Example:
+    python3 delta_refresh.py backup/banana-production.csv data/banana-production.csv
+"""
+
+import csv
+import json
+import os
+import shutil
+import sys
+
+from dataset_io import PARQUET_SUFFIX, clean_output_path, iter_long_rows
+from file_cache import atomic_write
+from regions import is_country
+from reshape import apply_delta_to_series, load_series, series_path_for, write_series
+
+
+def values_equal(a, b):
+    """Compare two value strings numerically when possible ('71485' == '71485.0')."""
+    if a == b:
+        return True
+    try:
+        return float(a) == float(b)
+    except ValueError:
+        return False
+
+
+def load_keyed_rows(file_path, keep_row=None):
+    """
+    Load a long-layout CSV into {(code, year): (entity, value)}.
+    Region and aggregate rows are skipped, as the cleaners drop them.
+    """
+    if keep_row is None:
+        keep_row = is_country
+
+    keyed = {}
+    for entity, code, year, value in iter_long_rows(file_path):
+        if keep_row(entity, code):
+            keyed[(code, year)] = (entity, value)
+    return keyed
+
+
+def compute_delta(fresh, cleaned):
+    """
+    Compare two keyed row dicts and return the delta.
+    Entity names for existing keys are taken from the cleaned side so that
+    name standardization done by the cleaner is preserved.
+    """
+    added = []
+    changed = []
+    for key, (entity, value) in fresh.items():
+        old = cleaned.get(key)
+        if old is None:
+            added.append([entity, key[0], key[1], value])
+        elif not values_equal(old[1], value):
+            changed.append([old[0], key[0], key[1], old[1], value])
+
+    removed = [[code, year] for (code, year) in cleaned if (code, year) not in fresh]
+
+    # Canonical names for codes already present in the cleaned file
+    names = {code: entity for (code, _), (entity, _) in cleaned.items()}
+    for row in added:
+        row[0] = names.get(row[1], row[0])
+
+    added.sort(key=lambda r: (r[0], r[2]))
+    changed.sort(key=lambda r: (r[0], r[2]))
+    removed.sort()
+    return {'added': added, 'changed': changed, 'removed': removed}
+
+
+def delta_is_empty(delta):
+    return not (delta['added'] or delta['changed'] or delta['removed'])
+
+
+def apply_delta(cleaned_path, delta):
+    """
+    Rewrite the cleaned CSV with the delta applied, in a single streaming pass.
+    Added rows are merged into place while the file is sorted by
+    (Entity, Year); if the file uses another order they are appended.
+    """
+    if delta_is_empty(delta):
+        return
+
+    changed = {(r[1], r[2]): r[4] for r in delta['changed']}
+    removed = {(code, year) for code, year in delta['removed']}
+    pending = [[r[0], r[1], str(r[2]), r[3]] for r in delta['added']]
+    pending_idx = 0
+    in_order = True
+    last_key = None
+
+    with open(cleaned_path, 'r', newline='', encoding='utf-8') as infile, \
+         atomic_write(cleaned_path, newline='') as outfile:
+        reader = csv.reader(infile)
+        writer = csv.writer(outfile)
+        writer.writerow(next(reader))
+
+        for row in reader:
+            try:
+                year = int(row[2])
+            except (IndexError, ValueError):
+                writer.writerow(row)
+                continue
+
+            sort_key = (row[0], year)
+            if last_key is not None and sort_key < last_key:
+                in_order = False
+            last_key = sort_key
+
+            if in_order:
+                while pending_idx < len(pending) and (pending[pending_idx][0], int(pending[pending_idx][2])) < sort_key:
+                    writer.writerow(pending[pending_idx])
+                    pending_idx += 1
+
+            key = (row[1], year)
+            if key in removed:
+                continue
+            if key in changed:
+                row[3] = changed[key]
+            writer.writerow(row)
+
+        for row in pending[pending_idx:]:
+            writer.writerow(row)
+
+
+def save_delta(cleaned_path, delta, fresh_path):
+    delta_path = os.path.splitext(cleaned_path)[0] + '.delta.json'
+    payload = {'source': fresh_path, 'target': cleaned_path}
+    payload.update(delta)
+    with atomic_write(delta_path) as f:
+        json.dump(payload, f, separators=(',', ':'))
+    return delta_path
+
+
+def refresh_derived(cleaned_path):
+    """
+    Rebuild what is derived from `cleaned_path` after its rows changed.
+    Returns the names of the refreshed artifacts.
+    """
+    from build_bundles import configs_using, main as build_bundles
+    from catalog import catalog_file, update_catalog
+    from offset_index import build_index, has_index
+
+    done = []
+    if has_index(cleaned_path):
+        build_index(cleaned_path)
+        done.append('index')
+
+    parquet_path = os.path.splitext(cleaned_path)[0] + PARQUET_SUFFIX
+    if os.path.exists(parquet_path):
+        from columnar import export_dataset
+        try:
+            export_dataset(cleaned_path, parquet_path)
+            done.append('parquet')
+        except ImportError:
+            # Exporting needs pyarrow; a stale copy must not be served instead
+            os.remove(parquet_path)
+            done.append('parquet removed')
+
+    if os.path.exists(catalog_file()):
+        update_catalog([cleaned_path], verbose=False)
+        done.append('catalog')
+
+    configs = configs_using(cleaned_path)
+    if configs:
+        build_bundles(configs)
+        done.append('bundles')
+    return done
+
+
+def refresh(fresh_path, cleaned_path, dry_run=False):
+    """
+    Compute the delta between a fresh download and its cleaned version and
+    apply it. Returns the delta.
+    """
+    fresh = load_keyed_rows(fresh_path)
+    cleaned = load_keyed_rows(cleaned_path)
+    delta = compute_delta(fresh, cleaned)
+
+    print(f"✓ Delta computed: {len(delta['added'])} added, "
+          f"{len(delta['changed'])} changed, {len(delta['removed'])} removed")
+
+    if dry_run or delta_is_empty(delta):
+        if delta_is_empty(delta):
+            print(f"  {cleaned_path} is up to date, nothing rewritten")
+        return delta
+
+    delta_path = save_delta(cleaned_path, delta, fresh_path)
+    apply_delta(cleaned_path, delta)
+    print(f"✓ Delta applied to {cleaned_path} (saved as {delta_path})")
+
+    # Derived outputs are patched from the delta rather than rebuilt
+    series_path = series_path_for(cleaned_path)
+    if os.path.exists(series_path):
+        series = load_series(series_path)
+        apply_delta_to_series(series, delta)
+        write_series(series, series_path)
+        print(f"✓ Delta applied to {series_path}")
+
+    derived = refresh_derived(cleaned_path)
+    if derived:
+        print(f"✓ Derived outputs refreshed: {', '.join(derived)}")
+    return delta
+
+
+def refresh_clean_copy(fresh_path, seed_path=None):
+    """
+    Apply `fresh_path` to its cleaned copy clean/<name>. A missing copy is
+    first seeded from `seed_path` (default: the fresh file itself) and its
+    .series.json; raw files in data/ and backup/ are never modified.
+    Returns (cleaned path, delta).
+    """
+    target = clean_output_path(fresh_path)
+    if os.path.exists(target):
+        return target, refresh(fresh_path, target)
+
+    seed = seed_path if seed_path and os.path.exists(seed_path) else fresh_path
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    shutil.copyfile(seed, target)
+    if os.path.exists(series_path_for(seed)):
+        shutil.copyfile(series_path_for(seed), series_path_for(target))
+    print(f"✓ {target} created from {seed}")
+    delta = refresh(fresh_path, target)
+    if delta_is_empty(delta):
+        # Configs now resolve to the new copy
+        refresh_derived(target)
+    return target, delta
+
+
+def main():
+    args = [a for a in sys.argv[1:] if a != '--dry-run']
+    if len(args) != 2:
+        print("Usage: python3 delta_refresh.py <fresh_file> <cleaned_file> [--dry-run]")
+        print("Example: python3 delta_refresh.py backup/banana-production.csv data/banana-production.csv")
+        sys.exit(1)
+
+    fresh_path, cleaned_path = args
+    for path in (fresh_path, cleaned_path):
+        if not os.path.exists(path):
+            print(f"Error: File '{path}' does not exist")
+            sys.exit(1)
+
+    refresh(fresh_path, cleaned_path, dry_run='--dry-run' in sys.argv)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,237 @@
+#!/usr/bin/env python3
+"""
+difficulty.py - Puzzle-difficulty metrics per dataset and year
+
+A puzzle asks for the leading country of a dataset, so a good puzzle year
+has a clear leader. For every year of every dataset (countries only) the
+catalog stores:
+
+    leader        the country with the highest value
+    top1_share    leader's share of the total of positive values
+    hhi           Herfindahl-Hirschman index of those shares (0-1)
+    gap12         (rank 1 - rank 2) / |rank 1|, how far ahead the leader is
+    near_leader   other countries within 10% of the leader's value
+    countries     countries with a value that year
+    leader_streak consecutive years the leader has led, ending that year
+    yoy_change    median absolute year-over-year relative change across countries
+
+plus the number of leader changes over the whole series. The metrics are
+computed by catalog.py while it scans each dataset, so they are updated
+incrementally with the rest of the catalog and kept as one list per metric.
+Queries only read the catalog.
+
+Usage:
+    python3 difficulty.py build
+    python3 difficulty.py query [--year 2022] [--min-share 0.3] [--min-gap 0.2]
+                                [--max-near 0] [--min-streak 3] [--min-countries 50] [--limit 20]
+    python3 difficulty.py show <file> [--year 2022]
+"""
+
+import argparse
+import json
+import os
+import sys
+
+NEAR_LEADER = 0.10      # "within 10% of the leader"
+DIGITS = 4
+
+METRICS = ('leader', 'top1_share', 'hhi', 'gap12', 'near_leader', 'countries',
+           'leader_streak', 'yoy_change')
+
+
+def _round(value):
+    return None if value is None else round(value, DIGITS)
+
+
+def year_metrics(values):
+    """Concentration metrics of one year from [(value, name), ...]."""
+    ranked = sorted(values, key=lambda item: (-item[0], item[1]))
+    top, leader = ranked[0]
+    positive_total = sum(value for value, _ in ranked if value > 0)
+
+    top1_share = hhi = None
+    if positive_total > 0:
+        top1_share = max(top, 0) / positive_total
+        hhi = sum((value / positive_total) ** 2 for value, _ in ranked if value > 0)
+
+    gap12 = None
+    if len(ranked) > 1 and top != 0:
+        gap12 = (top - ranked[1][0]) / abs(top)
+
+    threshold = top - NEAR_LEADER * abs(top)
+    near_leader = sum(1 for value, _ in ranked[1:] if value >= threshold)
+    return {
+        'leader': leader,
+        'top1_share': _round(top1_share),
+        'hhi': _round(hhi),
+        'gap12': _round(gap12),
+        'near_leader': near_leader,
+        'countries': len(ranked),
+    }
+
+
+def _median(values):
+    values = sorted(values)
+    n = len(values)
+    if not n:
+        return None
+    middle = n // 2
+    return values[middle] if n % 2 else (values[middle - 1] + values[middle]) / 2
+
+
+def dataset_difficulty(by_year):
+    """
+    Metrics for every year of a dataset from {year: [(value, name), ...]}.
+    Returns {'years': [...], <metric>: [...], 'leader_changes': n}.
+    """
+    result = {'years': []}
+    for metric in METRICS:
+        result[metric] = []
+
+    previous = {}
+    leader_changes = 0
+    for year in sorted(by_year):
+        metrics = year_metrics(by_year[year])
+        current = {name: value for value, name in by_year[year]}
+
+        streak = 1
+        if result['leader']:
+            if result['leader'][-1] == metrics['leader'] and result['years'][-1] == year - 1:
+                streak = result['leader_streak'][-1] + 1
+            elif result['leader'][-1] != metrics['leader']:
+                leader_changes += 1
+        metrics['leader_streak'] = streak
+
+        changes = [abs(value - previous[name]) / abs(previous[name])
+                   for name, value in current.items() if previous.get(name)]
+        metrics['yoy_change'] = _round(_median(changes))
+
+        result['years'].append(year)
+        for metric in METRICS:
+            result[metric].append(metrics[metric])
+        previous = current
+
+    result['leader_changes'] = leader_changes
+    return result
+
+
+def metrics_for_year(difficulty, year=None):
+    """One year's metrics as a dict; the latest year when `year` is None."""
+    years = difficulty.get('years') or []
+    if not years:
+        return None
+    if year is None:
+        i = len(years) - 1
+    elif year in years:
+        i = years.index(year)
+    else:
+        return None
+    row = {'year': years[i]}
+    for metric in METRICS:
+        row[metric] = difficulty[metric][i]
+    return row
+
+
+def query(datasets, year=None, min_share=None, min_gap=None, max_near=None,
+          min_streak=None, min_countries=None):
+    """
+    [(file, metrics)] of datasets whose `year` (default: latest) passes
+    the filters, clearest leader first.
+    """
+    matches = []
+    for file_path, entry in datasets.items():
+        if entry.get('status') != 'ok' or not entry.get('difficulty'):
+            continue
+        row = metrics_for_year(entry['difficulty'], year)
+        if row is None:
+            continue
+        if min_share is not None and (row['top1_share'] or 0) < min_share:
+            continue
+        if min_gap is not None and (row['gap12'] or 0) < min_gap:
+            continue
+        if max_near is not None and row['near_leader'] > max_near:
+            continue
+        if min_streak is not None and row['leader_streak'] < min_streak:
+            continue
+        if min_countries is not None and row['countries'] < min_countries:
+            continue
+        row['leader_changes'] = entry['difficulty']['leader_changes']
+        matches.append((file_path, row))
+    matches.sort(key=lambda match: (-(match[1]['gap12'] or 0), match[0]))
+    return matches
+
+
+def _fmt(value):
+    return "-" if value is None else f"{value:.2f}"
+
+
+def print_matches(matches):
+    for file_path, row in matches:
+        print(f"{file_path} ({row['year']})")
+        print(f"    leader {row['leader']}: share {_fmt(row['top1_share'])}, gap {_fmt(row['gap12'])}, "
+              f"HHI {_fmt(row['hhi'])}, {row['near_leader']} within 10%, "
+              f"led {row['leader_streak']} yrs, {row['countries']} countries, "
+              f"yoy {_fmt(row['yoy_change'])}")
+    print(f"\n{len(matches)} dataset(s)")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Query puzzle-difficulty metrics from the catalog.")
+    sub = parser.add_subparsers(dest='action', metavar='<action>')
+    sub.required = True
+
+    sub.add_parser('build', help="update the catalog, computing metrics for changed datasets")
+
+    p = sub.add_parser('query', help="datasets with a clear leader, clearest first")
+    p.add_argument('--year', type=int, help="default: each dataset's latest year")
+    p.add_argument('--min-share', type=float, help="minimum leader share of the total (0-1)")
+    p.add_argument('--min-gap', type=float, help="minimum relative gap between rank 1 and 2")
+    p.add_argument('--max-near', type=int, help="maximum countries within 10%% of the leader")
+    p.add_argument('--min-streak', type=int, help="minimum years the leader has led")
+    p.add_argument('--min-countries', type=int)
+    p.add_argument('--limit', type=int)
+    p.add_argument('--json', action='store_true')
+
+    p = sub.add_parser('show', help="metrics of one dataset, every year or one")
+    p.add_argument('file')
+    p.add_argument('--year', type=int)
+
+    args = parser.parse_args(argv)
+
+    from catalog import load_catalog, update_catalog
+
+    if args.action == 'build':
+        update_catalog()
+        return
+
+    datasets = load_catalog()
+    if args.action == 'query':
+        matches = query(datasets, args.year, args.min_share, args.min_gap, args.max_near,
+                        args.min_streak, args.min_countries)[:args.limit]
+        if args.json:
+            print(json.dumps(dict(matches), indent=2, ensure_ascii=False))
+        else:
+            print_matches(matches)
+        return
+
+    entry = datasets.get(os.path.normpath(args.file))
+    if entry is None or not entry.get('difficulty'):
+        print(f"Error: no metrics for '{args.file}' (run: python3 difficulty.py build)")
+        sys.exit(1)
+    if args.year is not None:
+        row = metrics_for_year(entry['difficulty'], args.year)
+        if row is None:
+            print(f"Error: '{args.file}' has no countries with values in {args.year}")
+            sys.exit(1)
+        print_matches([(args.file, dict(row, leader_changes=entry['difficulty']['leader_changes']))])
+    else:
+        difficulty = entry['difficulty']
+        print(f"{args.file}: {difficulty['leader_changes']} leader changes")
+        for i, year in enumerate(difficulty['years']):
+            print(f"  {year}  {difficulty['leader'][i]:<24} share {_fmt(difficulty['top1_share'][i])}  "
+                  f"gap {_fmt(difficulty['gap12'][i])}  near {difficulty['near_leader'][i]}  "
+                  f"streak {difficulty['leader_streak'][i]}")
+
+
+if __name__ == "__main__":
+    main()
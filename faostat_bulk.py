@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+"""
+faostat_bulk.py - Clean every commodity of a FAOSTAT bulk download in one pass
+
+FAOSTAT publishes each domain as one zip (e.g. Production_Crops_Livestock_E_All_Data.zip)
+holding every item. This script streams the data CSV straight out of the zip
+(nothing is extracted to disk), keeps the wanted element (default "Production",
+'' keeps every element), partitions the rows by Element and Item in a single
+pass and writes one cleaned dataset per element and item, in the same format
+as FAOstat_clean.py:
+
+    production-of-cherries.csv    Entity, CODE, Year, Value
+    production-of-apricots.csv    ...
+
+Both the "Normalized" layout (one row per year) and the wide layout
+(Y1961, Y1962, ... columns) are supported.
+
+Kept rows are spooled to one temporary file per element and item as they are
+read, then each file is sorted externally (dataset_io.sort_long_rows), so
+memory use does not grow with the zip.
+
+Usage:
+    python3 faostat_bulk.py <bulk.zip> [--element Production] [--items Cherries,Apricots]
+                            [--output-dir clean] [--encoding latin-1]
+"""
+
+import argparse
+import csv
+import io
+import os
+import re
+import sys
+import tempfile
+import zipfile
+from collections import defaultdict
+from itertools import count
+
+from country_names import load_canonical_names
+from dataset_io import CLEAN_DIR, OutputFiles, iter_long_rows, sort_long_rows
+from FAOstat_clean import get_iso_mapping
+from reshape import write_series_for
+from schema_detect import detect_schema_from_header
+
+# Auxiliary tables shipped in the same zip
+AUXILIARY_MEMBERS = ('flags', 'areacodes', 'itemcodes', 'elements', 'symboles')
+
+# Area kept when several areas map to one ISO code. FAOSTAT's "China" also
+# counts Taiwan, Hong Kong and Macao, which have rows of their own.
+PREFERRED_AREAS = {'CHN': 'China, mainland'}
+
+OUTPUT_HEADER = ['Entity', 'CODE', 'Year', 'Value']
+
+
+def find_data_member(zf):
+    """Pick the data CSV inside a bulk zip, preferring the Normalized layout."""
+    members = [name for name in zf.namelist()
+               if name.lower().endswith('.csv')
+               and not any(aux in name.lower().replace('_', '') for aux in AUXILIARY_MEMBERS)]
+    if not members:
+        raise ValueError("No data CSV found in archive")
+    normalized = [name for name in members if 'normalized' in name.lower()]
+    return (normalized or members)[0]
+
+
+def slugify(text):
+    return re.sub(r'[^a-z0-9]+', '-', text.lower()).strip('-')
+
+
+def output_name(element, item):
+    """'Production', 'Cherries' -> 'production-of-cherries.csv'"""
+    return f"{slugify(element)}-of-{slugify(item)}.csv"
+
+
+def iter_observations(reader, schema):
+    """Yield (area, item, element, year_str, value) from either bulk layout."""
+    area_col = schema.entity_col
+    item_col = schema.item_col
+    element_col = schema.element_col
+
+    if schema.layout == 'wide_years':
+        year_columns = schema.year_columns
+        for row in reader:
+            element = row[element_col] if element_col is not None else ""
+            area, item = row[area_col], row[item_col]
+            for col, year in year_columns:
+                if col < len(row) and row[col] != "":
+                    yield area, item, element, str(year), row[col]
+    else:
+        year_col, value_col = schema.year_col, schema.value_col
+        for row in reader:
+            if len(row) <= value_col:
+                continue
+            element = row[element_col] if element_col is not None else ""
+            yield row[area_col], row[item_col], element, row[year_col], row[value_col]
+
+
+def choose_area(areas, iso_code):
+    """
+    The one area kept for an ISO code several areas map to ("China" and
+    "China, mainland" are both CHN): the preferred area, else the first by name.
+    """
+    preferred = PREFERRED_AREAS.get(iso_code)
+    return preferred if preferred in areas else min(areas)
+
+
+def ingest_bulk_zip(zip_path, output_dir=CLEAN_DIR, element="Production", items=None, encoding="latin-1"):
+    """
+    Stream the bulk CSV out of `zip_path` and write one cleaned file per
+    (element, item). Returns {(element, item): output_path}.
+    """
+    iso_mapping = get_iso_mapping()
+    canonical_names = load_canonical_names()
+    wanted_items = set(items) if items else None
+
+    with tempfile.TemporaryDirectory() as spool_dir:
+        # (element, item) -> spool file of (area, iso_code, year, value) rows
+        spool_names = count()
+        spool = OutputFiles(lambda key: os.path.join(spool_dir, f"{next(spool_names)}.csv"),
+                            ['Area', 'CODE', 'Year', 'Value'])
+        try:
+            areas_by_code = spool_partitions(zip_path, spool, iso_mapping, element, wanted_items, encoding)
+        finally:
+            spool.close()
+
+        os.makedirs(output_dir, exist_ok=True)
+        outputs = {}
+        duplicates = set()
+        for row_element, item in sorted(spool.paths):
+            kept_areas = set()
+            for iso_code, areas in areas_by_code[row_element, item].items():
+                kept = choose_area(areas, iso_code)
+                kept_areas.add(kept)
+                duplicates.update((area, iso_code) for area in areas if area != kept)
+
+            cleaned = ((canonical_names.get(iso_code, area), iso_code, year, value)
+                       for area, iso_code, year, value in iter_long_rows(spool.paths[row_element, item])
+                       if area in kept_areas)
+            out_path = os.path.join(output_dir, output_name(row_element or "all", item))
+            sort_long_rows(cleaned, OUTPUT_HEADER, out_path, index=True)
+            write_series_for(out_path)
+            outputs[row_element, item] = out_path
+
+    print(f"✓ {len(outputs)} cleaned datasets written to {output_dir}/")
+    for area, iso_code in sorted(duplicates):
+        print(f"  '{area}' dropped: another area is already kept as {iso_code}")
+    return outputs
+
+
+def spool_partitions(zip_path, spool, iso_mapping, element, wanted_items, encoding):
+    """
+    Write the kept observations of `zip_path` to `spool`, keyed by
+    (element, item). Returns {(element, item): {iso_code: areas}}.
+    """
+    areas_by_code = defaultdict(lambda: defaultdict(set))
+    rows_read = 0
+    unmapped = set()
+
+    with zipfile.ZipFile(zip_path) as zf:
+        member = find_data_member(zf)
+        print(f"Streaming {member} from {zip_path}")
+        with zf.open(member) as raw:
+            text = io.TextIOWrapper(raw, encoding=encoding, newline='')
+            reader = csv.reader(text)
+            header = next(reader)
+            schema = detect_schema_from_header(header)
+            if schema.item_col is None:
+                raise ValueError(f"{member} is not a FAOSTAT bulk file ({schema.source})")
+            print(f"✓ Layout detected ({schema.source})")
+
+            for area, item, row_element, year_str, value in iter_observations(reader, schema):
+                rows_read += 1
+                if element and row_element != element:
+                    continue
+                if wanted_items is not None and item not in wanted_items:
+                    continue
+                iso_code = iso_mapping.get(area, "")
+                if not iso_code:
+                    unmapped.add(area)
+                    continue
+                try:
+                    year = int(year_str)
+                except ValueError:
+                    continue
+                spool.write((row_element, item), (area, iso_code, year, value))
+                areas_by_code[row_element, item][iso_code].add(area)
+
+    print(f"✓ {rows_read} observations read, {sum(spool.rows.values())} kept "
+          f"across {len(spool.paths)} datasets")
+    if unmapped:
+        print(f"  {len(unmapped)} areas without an ISO code were removed (regions and unmapped names)")
+    return areas_by_code
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Clean every item of a FAOSTAT bulk zip in one pass.")
+    parser.add_argument('zip_path')
+    parser.add_argument('--element', default='Production', help="element to keep ('' keeps all)")
+    parser.add_argument('--items', help="comma-separated item names to keep (default: all)")
+    parser.add_argument('--output-dir', default=CLEAN_DIR)
+    parser.add_argument('--encoding', default='latin-1', help="encoding of the CSV inside the zip")
+    args = parser.parse_args(argv)
+
+    if not os.path.exists(args.zip_path):
+        print(f"Error: File '{args.zip_path}' does not exist")
+        sys.exit(1)
+
+    items = [i.strip() for i in args.items.split(',')] if args.items else None
+    outputs = ingest_bulk_zip(args.zip_path, args.output_dir, args.element, items, args.encoding)
+    for (element, item), path in outputs.items():
+        print(f"  {element} / {item}: {path}")
+
+
+if __name__ == "__main__":
+    main()
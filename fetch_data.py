@@ -4,7 +4,6 @@ Simple script to fetch CSV data from Google Sheets and save it locally.
 Also fetches all data from OWID_datalink column.
 """
 
-import urllib.request
 import csv
 import sys
 import os
@@ -12,10 +11,16 @@ import re
 import time
 from urllib.parse import urlparse
 
+from http_pool import ConnectionPool
+
 CSV_URL = "https://docs.google.com/spreadsheets/d/e/2PACX-1vQ1ZutdIgCWij_xYeMYn5ye-ZtjgxtEBX_1Ic76F8bBwf027nMvXHYRbOTMDyz5ZpX-znTd2urlI_fK/pub?gid=1891885088&single=true&output=csv"
 OUTPUT_FILE = "data.csv"
 BACKUP_DIR = "backup"
 MAPPING_FILE = "backup_mapping.csv"
+POOL_SIZE_PER_HOST = 4  # Idle keep-alive connections kept per host
+
+# Shared by every download in the run so connections and DNS lookups are reused
+http_pool = ConnectionPool(maxsize_per_host=POOL_SIZE_PER_HOST)
 
 def extract_filename_from_owid_url(url):
     """Extract filename from OWID URL.
@@ -66,7 +71,7 @@ def fetch_and_save_csv():
     """Fetch CSV from URL and save to local file."""
     try:
         print(f"Fetching data from: {CSV_URL}")
-        urllib.request.urlretrieve(CSV_URL, OUTPUT_FILE)
+        http_pool.fetch_to_file(CSV_URL, OUTPUT_FILE)
         print(f"Data successfully saved to {OUTPUT_FILE}")
     except Exception as e:
         print(f"Error fetching data: {e}", file=sys.stderr)
@@ -147,7 +152,7 @@ def fetch_owid_data():
                 continue
             
             try:
-                urllib.request.urlretrieve(owid_link, filepath)
+                http_pool.fetch_to_file(owid_link, filepath)
                 print(f"  ✓ SUCCESS - Saved to {filepath}\n")
                 successful.append({
                     'title': title,
@@ -188,6 +193,10 @@ def fetch_owid_data():
         print(f"  ✓ Correctly extracted from URL: {correctly_count}")
         print(f"  ⚠ Used fallback method: {fallback_count}")
         
+        # Connection reuse summary
+        print(f"\nConnection Reuse:")
+        print(http_pool.format_stats())
+        
         if successful:
             print(f"\n✓ Successfully downloaded files ({len(successful)}):")
             for item in successful:
@@ -268,7 +277,8 @@ def create_mapping_csv(rows_with_links):
     except Exception as e:
         print(f"Error creating mapping CSV: {e}", file=sys.stderr)
 
-if __name__ == "__main__":
+def main():
+    """Fetch data.csv, every OWID data link, and write the backup mapping."""
     fetch_and_save_csv()
     print()
     rows_with_links, successful, failed, skipped = fetch_owid_data()
@@ -280,3 +290,7 @@ if __name__ == "__main__":
     print("=" * 70)
     print()
     fetch_owid_data()
+    http_pool.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+#!/usr/bin/env python3
+"""
+File fingerprints and the local .cache/ directory shared by the pipeline
+stages that memoize per-file results.
+"""
+
+import hashlib
+import json
+import os
+import tempfile
+from contextlib import contextmanager
+
+CACHE_DIR = os.environ.get(
+    'CHARTLE_CACHE_DIR',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), '.cache'),
+)
+HEAD_BYTES = 64 * 1024
+
+# mkstemp creates files readable by the owner only; atomic_path gives them
+# the permissions open() would
+_UMASK = os.umask(0)
+os.umask(_UMASK)
+
+
+def cache_path(*parts):
+    """Return a path inside the cache directory, creating parent dirs."""
+    path = os.path.join(CACHE_DIR, *parts)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    return path
+
+
+def file_fingerprint(file_path):
+    """
+    Cheap fingerprint of a file: its size plus a hash of its first 64 KB.
+    Good enough to detect a replaced download without reading the whole file.
+    """
+    h = hashlib.sha1()
+    with open(file_path, 'rb') as f:
+        h.update(f.read(HEAD_BYTES))
+    h.update(str(os.path.getsize(file_path)).encode())
+    return h.hexdigest()
+
+
+def file_sha256(file_path):
+    """Full content hash of a file."""
+    h = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def load_json(path, default=None):
+    """Load a JSON cache file, returning `default` if it is missing or corrupt."""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {} if default is None else default
+
+
+@contextmanager
+def atomic_path(path):
+    """
+    Yield a unique temporary path in the directory of `path`, which replaces
+    `path` when the block succeeds and is removed otherwise. Processes
+    writing the same file concurrently each get their own temporary file;
+    the last replace wins.
+    """
+    directory = os.path.dirname(path) or '.'
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=os.path.basename(path) + '.', suffix='.tmp')
+    os.close(fd)
+    os.chmod(tmp_path, 0o666 & ~_UMASK)
+    try:
+        yield tmp_path
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+@contextmanager
+def atomic_write(path, mode='w', encoding='utf-8', newline=None):
+    """open() look-alike that writes `path` through atomic_path."""
+    with atomic_path(path) as tmp_path:
+        if 'b' in mode:
+            with open(tmp_path, mode) as f:
+                yield f
+        else:
+            with open(tmp_path, mode, encoding=encoding, newline=newline) as f:
+                yield f
+
+
+def save_json(path, data):
+    """Atomically write a JSON cache file."""
+    with atomic_write(path) as f:
+        json.dump(data, f, separators=(',', ':'))
@@ -1,23 +1,43 @@
 import csv
 
-# Find the top value for 2014 in the Ebola death rate dataset
-input_csv = 'data/GBD_ebola_death_rate.csv'
-top_val = None
-top_row = None
+from offset_index import IndexedDataset, has_index
 
-with open(input_csv, newline='', encoding='utf-8') as infile:
-    reader = csv.DictReader(infile)
-    for row in reader:
-        if row.get('year') == '2014':
-            try:
-                val = float(row['val'])
-                if (top_val is None) or (val > top_val):
-                    top_val = val
-                    top_row = row
-            except Exception:
-                continue
+def iter_year_rows(input_csv, year):
+    """Yield the rows of `year` as dicts, through the offset index when the file has one."""
+    if has_index(input_csv):
+        with IndexedDataset(input_csv) as dataset:
+            for row in dataset.year(int(year)):
+                yield dict(zip(dataset.header, row))
+        return
+    with open(input_csv, newline='', encoding='utf-8') as infile:
+        for row in csv.DictReader(infile):
+            if row.get('year', row.get('Year')) == year:
+                yield row
 
-if top_row:
-    print(f"Top value in 2014: {top_val} for {top_row['location']} (Code: {top_row.get('Code', '')})")
-else:
-    print("No data for 2014 found.")
+def find_top_value(input_csv, year='2014'):
+    """Return (top_val, top_row) for the given year in a GBD-style dataset."""
+    top_val = None
+    top_row = None
+
+    for row in iter_year_rows(input_csv, year):
+        try:
+            val = float(row['val'])
+            if (top_val is None) or (val > top_val):
+                top_val = val
+                top_row = row
+        except (KeyError, TypeError, ValueError):
+            # Missing 'val' column, short row or non-numeric value
+            continue
+    return top_val, top_row
+
+def print_top_value(input_csv, year='2014'):
+    top_val, top_row = find_top_value(input_csv, year)
+    if top_row:
+        entity = top_row.get('location', top_row.get('Entity', ''))
+        print(f"Top value in {year}: {top_val} for {entity} (Code: {top_row.get('Code', '')})")
+    else:
+        print(f"No data for {year} found.")
+
+if __name__ == '__main__':
+    # Find the top value for 2014 in the Ebola death rate dataset
+    print_top_value('data/GBD_ebola_death_rate.csv', '2014')
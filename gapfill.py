@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+"""
+gapfill.py - Fill missing years inside each country's series
+
+Methods:
+    linear  straight line between the observations on either side of the gap
+    locf    last observation carried forward
+    none    leave gaps as they are
+
+Only gaps of at most `max_gap` consecutive years are filled; longer gaps are
+left alone, as are years before a country's first observation. With locf,
+empty cells after the last observation are also filled, within `max_gap`
+years of it. Rows with an empty or NA value count as missing years.
+
+Filled rows are marked in an extra `Filled` column holding the method name
+(empty for original rows). The dataset is processed in one pass over rows
+sorted by (Entity, Year).
+
+Usage:
+    python3 gapfill.py <input_csv> <output_csv> [--method linear|locf|none] [--max-gap 3]
+"""
+
+import argparse
+import csv
+import os
+import sys
+
+from dataset_io import iter_long_rows
+
+METHODS = ('linear', 'locf', 'none')
+DEFAULT_MAX_GAP = 3
+FLAG_COLUMN = 'Filled'
+
+
+def _parse(value):
+    if value in ("", "NA"):
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        return None
+
+
+def format_value(value):
+    """Render a filled value without float noise: 12.50000 -> 12.5, 3.0 -> 3"""
+    text = f"{value:.6f}".rstrip('0').rstrip('.')
+    return "0" if text == "-0" else text
+
+
+def fill_rows(rows, method='linear', max_gap=DEFAULT_MAX_GAP):
+    """
+    Yield (entity, code, year, value, flag) from (entity, code, year, value)
+    rows sorted by (Entity, Year). `flag` is the method for filled rows and
+    "" for original ones.
+    """
+    if method not in METHODS:
+        raise ValueError(f"Unknown gap-fill method '{method}' (expected one of {', '.join(METHODS)})")
+
+    series = None
+    last = None        # (year, value) of the last observation in the series
+    pending = []       # rows with missing values since `last`
+
+    def flush_pending(at_end):
+        # Missing cells not filled by a closing observation. Only trailing
+        # cells (at_end) are carried forward; a gap closed by a later
+        # observation but longer than max_gap is left as it is.
+        for entity, code, year, value in pending:
+            if at_end and method == 'locf' and last is not None and year - last[0] <= max_gap:
+                yield entity, code, year, format_value(last[1]), 'locf'
+            else:
+                yield entity, code, year, value, ""
+        pending.clear()
+
+    for entity, code, year, value in rows:
+        if (entity, code) != series:
+            yield from flush_pending(at_end=True)
+            series = (entity, code)
+            last = None
+
+        number = _parse(value)
+        if number is None:
+            pending.append((entity, code, year, value))
+            continue
+
+        if last is not None and method != 'none' and 1 < year - last[0] <= max_gap + 1:
+            start_year, start_value = last
+            span = year - start_year
+            for gap_year in range(start_year + 1, year):
+                if method == 'linear':
+                    filled = start_value + (number - start_value) * (gap_year - start_year) / span
+                else:
+                    filled = start_value
+                yield entity, code, gap_year, format_value(filled), method
+            pending.clear()
+        else:
+            yield from flush_pending(at_end=False)
+
+        yield entity, code, year, value, ""
+        last = (year, number)
+
+    yield from flush_pending(at_end=True)
+
+
+def fill_file(input_csv, output_csv, method='linear', max_gap=DEFAULT_MAX_GAP):
+    """Gap-fill a long CSV, keeping its header and adding the flag column."""
+    with open(input_csv, 'r', newline='', encoding='utf-8') as f:
+        header = next(csv.reader(f))
+    rows = sorted(iter_long_rows(input_csv), key=lambda r: (r[0], r[2]))
+
+    filled = 0
+    with open(output_csv, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(header[:4] + [FLAG_COLUMN])
+        for row in fill_rows(rows, method, max_gap):
+            writer.writerow(row)
+            if row[4]:
+                filled += 1
+    return filled
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Fill missing years in a long dataset.")
+    parser.add_argument('input_csv')
+    parser.add_argument('output_csv')
+    parser.add_argument('--method', choices=METHODS, default='linear')
+    parser.add_argument('--max-gap', type=int, default=DEFAULT_MAX_GAP,
+                        help="longest run of missing years to fill")
+    args = parser.parse_args(argv)
+
+    if not os.path.exists(args.input_csv):
+        print(f"Error: File '{args.input_csv}' does not exist")
+        sys.exit(1)
+
+    filled = fill_file(args.input_csv, args.output_csv, args.method, args.max_gap)
+    print(f"✓ {filled} cells filled ({args.method}, max gap {args.max_gap}) -> {args.output_csv}")
+
+
+if __name__ == "__main__":
+    main()
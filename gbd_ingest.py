@@ -0,0 +1,204 @@
+#!/usr/bin/env python3
+"""
+gbd_ingest.py - Split a full GBD results export into per-cause datasets
+
+A GBD results export holds every cause, measure, metric, sex and age group in
+one large CSV. This script reads it once, row by row, keeps the rows matching
+the wanted measure/metric/sex/age and writes each cause to its own cleaned
+file in the format produced by clean_GBD_ebola.run_gbd_pipeline:
+
+    entity, Code, year, val
+
+Country names are standardized and ISO codes added on the way through, using
+the same replacements and manual codes as the per-cause GBD scripts. Rows are
+written as they are read, so memory use does not grow with the export; at
+most MAX_OPEN_FILES (dataset_io) output files are kept open at a time.
+Exports are ordered by cause, year or location depending on how they were
+requested, so each cause file is then sorted by (Entity, Year) like every
+cleaned output, its offset index built as it is rewritten.
+
+Full exports also hold subnational locations, some named like a country (the
+US state of Georgia). When the export has a location level column only
+country-level rows are kept. Whatever still maps two rows to the same
+(Code, year) in a cause is ambiguous: that country is dropped from the cause
+and reported rather than written twice.
+
+Usage:
+    python3 gbd_ingest.py <export.csv> [--output-dir clean]
+                          [--filter measure=Deaths] [--filter sex=Both] ...
+                          [--causes "Ebola,Breast cancer"]
+"""
+
+import argparse
+import csv
+import os
+import re
+import sys
+
+from add_country_codes import get_iso_mapping
+from clean_GBD_ebola import COUNTRY_REPLACEMENTS as EBOLA_REPLACEMENTS
+from correct_country_names import COUNTRY_REPLACEMENTS as CANCER_REPLACEMENTS
+from country_names import load_canonical_names
+from dataset_io import CLEAN_DIR, OutputFiles, iter_long_rows, sort_long_csv
+from fill_missing_iso_codes import MANUAL_CODES
+from reshape import write_series_for
+from schema_detect import detect_schema_from_header
+
+# Default selection: age-standardized death rate, both sexes
+DEFAULT_FILTERS = {
+    'measure': 'Deaths',
+    'metric': 'Rate',
+    'sex': 'Both',
+    'age': 'Age-standardized',
+}
+OUTPUT_HEADER = ['entity', 'Code', 'year', 'val']
+# Location level columns of GBD exports and their country-level values
+LOCATION_LEVEL_COLUMNS = ('location_type', 'location_level', 'level')
+COUNTRY_LEVELS = {'country', 'admin0', '3'}
+
+COUNTRY_REPLACEMENTS = {**CANCER_REPLACEMENTS, **EBOLA_REPLACEMENTS}
+
+
+def cause_filename(cause):
+    """'Breast cancer' -> 'GBD_breast_cancer.csv'"""
+    return "GBD_" + re.sub(r'[^a-z0-9]+', '_', cause.lower()).strip('_') + ".csv"
+
+
+def ambiguous_codes(path):
+    """
+    Codes with several rows for one year in a cause file. Returns
+    (rows of the other codes, ambiguous codes).
+    """
+    seen = set()
+    rows = {}
+    ambiguous = set()
+    for _, code, year, _ in iter_long_rows(path):
+        if (code, year) in seen:
+            ambiguous.add(code)
+        seen.add((code, year))
+        rows[code] = rows.get(code, 0) + 1
+    return sum(n for code, n in rows.items() if code not in ambiguous), ambiguous
+
+
+def ingest_gbd_export(input_csv, output_dir=CLEAN_DIR, filters=None, causes=None):
+    """
+    Stream `input_csv` once and write one cleaned file per cause.
+    Returns {cause: (output_path, row_count)}.
+    """
+    filters = DEFAULT_FILTERS if filters is None else filters
+    wanted_causes = set(causes) if causes else None
+    iso_mapping = get_iso_mapping()
+    canonical_names = load_canonical_names()
+
+    os.makedirs(output_dir, exist_ok=True)
+    outputs = OutputFiles(lambda cause: os.path.join(output_dir, cause_filename(cause)), OUTPUT_HEADER)
+    rows_read = 0
+    unmapped = set()
+    # Each location repeats for every cause and year, so resolve its name once
+    resolved = {}
+
+    with open(input_csv, newline='', encoding='utf-8-sig') as infile:
+        reader = csv.reader(infile)
+        header = next(reader)
+        schema = detect_schema_from_header(header)
+        if schema.source != 'gbd':
+            raise ValueError(f"{input_csv} is not a GBD results export ({schema.source})")
+
+        cause_col = schema.filter_cols.get('cause')
+        checks = []
+        for name, wanted in filters.items():
+            if name in schema.filter_cols:
+                checks.append((schema.filter_cols[name], wanted))
+            else:
+                print(f"  Warning: no '{name}' column, filter {name}={wanted} ignored")
+        lower = [h.strip().lower() for h in header]
+        level_col = next((lower.index(name) for name in LOCATION_LEVEL_COLUMNS if name in lower), None)
+        if level_col is not None:
+            print(f"✓ Keeping country-level locations ({header[level_col]})")
+        entity_col, year_col, value_col = schema.entity_col, schema.year_col, schema.value_col
+        width = len(header)
+
+        try:
+            for row in reader:
+                rows_read += 1
+                if len(row) < width:
+                    continue
+                if any(row[col] != wanted for col, wanted in checks):
+                    continue
+                cause = row[cause_col] if cause_col is not None else "all causes"
+                if wanted_causes is not None and cause not in wanted_causes:
+                    continue
+                if level_col is not None and row[level_col].strip().lower() not in COUNTRY_LEVELS:
+                    continue
+
+                location = row[entity_col]
+                if location not in resolved:
+                    name = COUNTRY_REPLACEMENTS.get(location, location)
+                    code = iso_mapping.get(name) or MANUAL_CODES.get(name, "")
+                    resolved[location] = (canonical_names.get(code, name), code) if code else None
+                match = resolved[location]
+                if match is None:
+                    unmapped.add(location)
+                    continue
+                outputs.write(cause, [match[0], match[1], row[year_col], row[value_col]])
+        finally:
+            outputs.close()
+
+    ambiguous = {}
+    for cause, path in outputs.paths.items():
+        outputs.rows[cause], dropped = ambiguous_codes(path)
+        sort_long_csv(path, keep=(lambda row: row[1] not in dropped) if dropped else None, index=True)
+        for code in dropped:
+            ambiguous.setdefault(code, []).append(cause)
+        write_series_for(path)
+
+    print(f"✓ {rows_read} rows read, {sum(outputs.rows.values())} written across {len(outputs.paths)} causes")
+    if unmapped:
+        print(f"  {len(unmapped)} locations without an ISO code were removed (regions and unmapped names)")
+    for code in sorted(ambiguous):
+        print(f"  ⚠ {code} dropped from {len(ambiguous[code])} cause(s): several locations map to it "
+              f"(subnational locations? export country level only)")
+    return {cause: (outputs.paths[cause], outputs.rows[cause]) for cause in outputs.paths}
+
+
+def parse_filters(filter_args):
+    """['measure=Deaths', 'sex=Female'] -> DEFAULT_FILTERS updated with those values."""
+    filters = dict(DEFAULT_FILTERS)
+    for item in filter_args or []:
+        name, sep, value = item.partition('=')
+        if not sep:
+            raise ValueError(f"Filter must look like name=value, got '{item}'")
+        if value:
+            filters[name.strip()] = value.strip()
+        else:
+            filters.pop(name.strip(), None)  # 'age=' drops the age filter
+    return filters
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Split a GBD results export into per-cause datasets.")
+    parser.add_argument('input_csv')
+    parser.add_argument('--output-dir', default=CLEAN_DIR)
+    parser.add_argument('--filter', action='append', metavar='NAME=VALUE',
+                        help="measure/metric/sex/age selection (default: age-standardized death rate, both sexes)")
+    parser.add_argument('--causes', help="comma-separated causes to keep (default: all)")
+    args = parser.parse_args(argv)
+
+    if not os.path.exists(args.input_csv):
+        print(f"Error: File '{args.input_csv}' does not exist")
+        sys.exit(1)
+    try:
+        filters = parse_filters(args.filter)
+    except ValueError as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+
+    causes = [c.strip() for c in args.causes.split(',')] if args.causes else None
+    results = ingest_gbd_export(args.input_csv, args.output_dir, filters, causes)
+    for cause in sorted(results):
+        path, count = results[cause]
+        print(f"  {cause}: {path} ({count} rows)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,336 @@
+#!/usr/bin/env python3
+"""
+Pooled keep-alive HTTP client used by the fetch scripts.
+
+urllib.request opens a new TCP+TLS connection for every download. This module
+keeps idle connections per (scheme, host, port) and hands them back out for the
+next request to the same host, and resolves each host name only once per run.
+Each cached address is tried in turn; a host none of whose addresses answer is
+looked up again on the next connection. HTTP_PROXY / HTTPS_PROXY / NO_PROXY are
+honoured as by urllib.request: proxied connections go through the proxy (a
+CONNECT tunnel for https) and skip the DNS cache.
+
+Usage:
+    from http_pool import ConnectionPool
+
+    pool = ConnectionPool(maxsize_per_host=4)
+    pool.fetch_to_file(url, "backup/banana-production.csv")
+    print(pool.format_stats())
+"""
+
+import base64
+import http.client
+import os
+import socket
+import ssl
+import threading
+import urllib.error
+import urllib.request
+from urllib.parse import unquote, urljoin, urlsplit
+
+DEFAULT_POOL_SIZE = 4
+DEFAULT_TIMEOUT = 60
+MAX_REDIRECTS = 5
+CHUNK_SIZE = 64 * 1024
+USER_AGENT = "chartle-data-fetch/1.0"
+
+# Errors raised when a pooled connection was closed by the server while idle
+STALE_CONNECTION_ERRORS = (
+    http.client.RemoteDisconnected,
+    http.client.BadStatusLine,
+    BrokenPipeError,
+    ConnectionResetError,
+)
+
+
+class DNSCache:
+    """
+    Resolves each (host, port) once and reuses its addresses for every
+    connection opened afterwards.
+    """
+
+    def __init__(self):
+        self._addresses = {}
+        self._lock = threading.Lock()
+        self.lookups = 0
+        self.hits = 0
+
+    def resolve(self, host, port):
+        """Every address of (host, port), the last one that answered first."""
+        key = (host, port)
+        with self._lock:
+            if key in self._addresses:
+                self.hits += 1
+                return list(self._addresses[key])
+        infos = socket.getaddrinfo(host, port, type=socket.SOCK_STREAM)
+        addresses = list(dict.fromkeys(info[4][0] for info in infos))
+        with self._lock:
+            self.lookups += 1
+            self._addresses[key] = addresses
+        return list(addresses)
+
+    def forget(self, host, port):
+        with self._lock:
+            self._addresses.pop((host, port), None)
+
+    def connect(self, host, port, timeout, source_address=None):
+        """
+        Open a socket to the first cached address of (host, port) that
+        accepts it. If none does, the host is forgotten so the next
+        connection resolves it again, and the last error is raised.
+        """
+        error = None
+        for address in self.resolve(host, port):
+            try:
+                sock = socket.create_connection((address, port), timeout, source_address)
+            except OSError as e:
+                error = e
+                continue
+            with self._lock:
+                addresses = self._addresses.get((host, port))
+                if addresses and addresses[0] != address and address in addresses:
+                    addresses.remove(address)
+                    addresses.insert(0, address)
+            return sock
+        self.forget(host, port)
+        raise error or OSError(f"No address found for {host}")
+
+
+class CachedDNSConnection(http.client.HTTPConnection):
+    """HTTPConnection that connects through a DNSCache."""
+
+    def __init__(self, host, port, dns, **kwargs):
+        super().__init__(host, port, **kwargs)
+        self.dns = dns
+
+    def connect(self):
+        self.sock = self.dns.connect(self.host, self.port, self.timeout, self.source_address)
+        self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+
+class CachedDNSHTTPSConnection(http.client.HTTPSConnection):
+    """
+    HTTPSConnection that connects through a DNSCache, keeping `host` for
+    TLS SNI and certificate checks.
+    """
+
+    def __init__(self, host, port, dns, context, **kwargs):
+        super().__init__(host, port, context=context, **kwargs)
+        self.dns = dns
+        self.ssl_context = context
+
+    def connect(self):
+        sock = self.dns.connect(self.host, self.port, self.timeout, self.source_address)
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        try:
+            self.sock = self.ssl_context.wrap_socket(sock, server_hostname=self.host)
+        except BaseException:
+            sock.close()
+            raise
+
+
+def proxy_authorization(proxy_url):
+    """Proxy-Authorization header for the credentials in `proxy_url` ({} if none)."""
+    parts = urlsplit(proxy_url)
+    if parts.username is None:
+        return {}
+    credentials = f"{unquote(parts.username)}:{unquote(parts.password or '')}"
+    return {'Proxy-Authorization': 'Basic ' + base64.b64encode(credentials.encode()).decode('ascii')}
+
+
+class ConnectionPool:
+    """
+    Keep-alive connection pool with at most `maxsize_per_host` idle
+    connections kept for each host.
+    """
+
+    def __init__(self, maxsize_per_host=DEFAULT_POOL_SIZE, timeout=DEFAULT_TIMEOUT):
+        self.maxsize_per_host = maxsize_per_host
+        self.timeout = timeout
+        self.dns = DNSCache()
+        self.ssl_context = ssl.create_default_context()
+        self.proxies = urllib.request.getproxies()
+        self._routes = {}
+        self._idle = {}
+        self._lock = threading.Lock()
+        self.stats = {
+            'requests': 0,
+            'connections_opened': 0,
+            'connections_reused': 0,
+            'stale_retries': 0,
+            'redirects': 0,
+        }
+
+    def _count(self, key):
+        with self._lock:
+            self.stats[key] += 1
+
+    def _proxy(self, key):
+        """The proxy URL requests for `key` go through, or None to connect directly."""
+        with self._lock:
+            if key in self._routes:
+                return self._routes[key]
+        scheme, host, _ = key
+        proxy = self.proxies.get(scheme)
+        if proxy and urllib.request.proxy_bypass(host):
+            proxy = None
+        if proxy and '://' not in proxy:
+            proxy = 'http://' + proxy
+        with self._lock:
+            self._routes[key] = proxy
+        return proxy
+
+    def _new_connection(self, scheme, host, port):
+        """
+        Open a connection to `host`, through the proxy configured for
+        `scheme` if any, else to its cached addresses.
+        """
+        proxy = self._proxy((scheme, host, port))
+        if proxy is None:
+            if scheme == 'https':
+                conn = CachedDNSHTTPSConnection(host, port, self.dns, self.ssl_context, timeout=self.timeout)
+            else:
+                conn = CachedDNSConnection(host, port, self.dns, timeout=self.timeout)
+        else:
+            parts = urlsplit(proxy)
+            proxy_port = parts.port or (443 if parts.scheme == 'https' else 80)
+            if scheme == 'https':
+                conn = http.client.HTTPSConnection(parts.hostname, proxy_port, timeout=self.timeout,
+                                                   context=self.ssl_context)
+                conn.set_tunnel(host, port, headers=proxy_authorization(proxy))
+            else:
+                conn = http.client.HTTPConnection(parts.hostname, proxy_port, timeout=self.timeout)
+        self._count('connections_opened')
+        return conn
+
+    def _get_connection(self, key):
+        with self._lock:
+            idle = self._idle.get(key)
+            if idle:
+                self.stats['connections_reused'] += 1
+                return idle.pop(), True
+        return self._new_connection(*key), False
+
+    def _release(self, key, conn):
+        with self._lock:
+            idle = self._idle.setdefault(key, [])
+            if len(idle) < self.maxsize_per_host:
+                idle.append(conn)
+                return
+        conn.close()
+
+    def _send(self, key, path, headers):
+        """Send a GET, retrying once on a fresh connection if a reused one went stale."""
+        conn, reused = self._get_connection(key)
+        try:
+            conn.request('GET', path, headers=headers)
+            return conn, conn.getresponse()
+        except STALE_CONNECTION_ERRORS:
+            conn.close()
+            if not reused:
+                raise
+        except OSError:
+            conn.close()
+            raise
+
+        self._count('stale_retries')
+        conn = self._new_connection(*key)
+        try:
+            conn.request('GET', path, headers=headers)
+            return conn, conn.getresponse()
+        except OSError:
+            conn.close()
+            raise
+
+    def stream(self, url, on_chunk):
+        """
+        GET `url`, following redirects, and pass each body chunk to `on_chunk`.
+        Returns the final URL. Raises urllib.error.HTTPError on HTTP errors.
+        """
+        for _ in range(MAX_REDIRECTS + 1):
+            parts = urlsplit(url)
+            scheme = parts.scheme or 'http'
+            port = parts.port or (443 if scheme == 'https' else 80)
+            key = (scheme, parts.hostname, port)
+            path = parts.path or '/'
+            if parts.query:
+                path += '?' + parts.query
+
+            headers = {'User-Agent': USER_AGENT, 'Accept': '*/*'}
+            proxy = self._proxy(key)
+            if proxy is not None and scheme == 'http':
+                # Plain http goes to the proxy with the absolute URL
+                path = f"http://{parts.netloc.rpartition('@')[2]}{path}"
+                headers.update(proxy_authorization(proxy))
+            self._count('requests')
+            conn, response = self._send(key, path, headers)
+
+            try:
+                if response.status in (301, 302, 303, 307, 308):
+                    location = response.getheader('Location')
+                    response.read()
+                    if not location:
+                        raise urllib.error.HTTPError(url, response.status, 'Redirect without Location', response.headers, None)
+                    self._count('redirects')
+                    url = urljoin(url, location)
+                    continue
+
+                if response.status >= 400:
+                    response.read()
+                    raise urllib.error.HTTPError(url, response.status, response.reason, response.headers, None)
+
+                while True:
+                    chunk = response.read(CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    on_chunk(chunk)
+                return url
+            except BaseException:
+                conn.close()
+                conn = None
+                raise
+            finally:
+                if conn is not None:
+                    if response.will_close:
+                        conn.close()
+                    else:
+                        self._release(key, conn)
+
+        raise urllib.error.HTTPError(url, 310, 'Too many redirects', None, None)
+
+    def fetch_to_file(self, url, filepath):
+        """
+        Download `url` to `filepath`. The body is written to a temporary file
+        first so a failed download never leaves a partial file behind.
+        """
+        tmp_path = filepath + '.part'
+        try:
+            with open(tmp_path, 'wb') as f:
+                self.stream(url, f.write)
+            os.replace(tmp_path, filepath)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        return filepath
+
+    def close(self):
+        with self._lock:
+            idle, self._idle = self._idle, {}
+        for conns in idle.values():
+            for conn in conns:
+                conn.close()
+
+    def format_stats(self):
+        """Return a short multi-line summary of connection reuse."""
+        s = self.stats
+        opened = s['connections_opened']
+        reused = s['connections_reused']
+        reuse_rate = (100.0 * reused / (opened + reused)) if (opened + reused) else 0.0
+        lines = [
+            f"  HTTP requests: {s['requests']} ({s['redirects']} redirects)",
+            f"  Connections opened: {opened}",
+            f"  Connections reused: {reused} ({reuse_rate:.0f}% reuse)",
+            f"  Stale connection retries: {s['stale_retries']}",
+            f"  DNS lookups: {self.dns.lookups} ({self.dns.hits} served from cache)",
+        ]
+        return "\n".join(lines)
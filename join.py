@@ -0,0 +1,239 @@
+#!/usr/bin/env python3
+"""
+join.py - Derive new datasets from cleaned ones
+
+Aligns datasets on (Code, Year) and computes derived metrics, so "per
+capita", "per million" or "share of world" puzzles can be generated from a
+base dataset and a population dataset already on disk:
+
+    ratio    A / B * factor              (e.g. patents per million people)
+    share    A as % of the world total   (World row if present, else the sum of countries)
+    rolling  rolling mean of A over `window` years, per country
+
+Both the hash join (index the smaller side, probe with the larger) and the
+sort-merge join (walk both sides in (Code, Year) order) are available; they
+give the same rows. Only countries are kept, and rows are written sorted by
+(Entity, Year).
+
+Results are cached in .cache/join/ under a key built from the content hashes
+of the inputs and the operation, so rerunning a derivation is a file copy.
+
+Usage:
+    python3 join.py ratio <a.csv> <b.csv> -o out.csv [--factor 1000000] [--method hash|merge]
+    python3 join.py share <a.csv> -o out.csv
+    python3 join.py rolling <a.csv> -o out.csv [--window 5]
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import sys
+from array import array
+
+from dataset_io import iter_long_rows, write_long_csv
+from file_cache import atomic_path, cache_path, file_sha256
+from reshape import parse_number
+from schema_detect import detect_schema
+
+JOIN_VERSION = 1
+WORLD_CODE = "OWID_WRL"
+SIGNIFICANT_DIGITS = 6
+
+
+class Frame:
+    """Country rows of a dataset as parallel columns sorted by (Code, Year)."""
+
+    def __init__(self, rows):
+        rows = sorted(rows, key=lambda r: (r[1], r[2]))
+        self.entities = [r[0] for r in rows]
+        self.codes = [r[1] for r in rows]
+        self.years = array('l', (r[2] for r in rows))
+        self.values = array('d', (r[3] for r in rows))
+
+    def __len__(self):
+        return len(self.years)
+
+    def keys(self):
+        return zip(self.codes, self.years)
+
+
+def load_frame(file_path):
+    """Load the numeric country rows of a cleaned dataset."""
+    from build_bundles import iter_country_rows
+
+    rows = []
+    for entity, code, year, value in iter_country_rows(file_path):
+        number = parse_number(value)
+        if number is not None:
+            rows.append((entity, code, year, float(number)))
+    return Frame(rows)
+
+
+def hash_join(left, right):
+    """Return (left_index, right_index) pairs for keys present in both frames."""
+    if len(right) <= len(left):
+        index = {key: i for i, key in enumerate(right.keys())}
+        return [(i, index[key]) for i, key in enumerate(left.keys()) if key in index]
+    index = {key: i for i, key in enumerate(left.keys())}
+    return sorted((index[key], j) for j, key in enumerate(right.keys()) if key in index)
+
+
+def merge_join(left, right):
+    """Same result as hash_join, walking both (Code, Year)-sorted frames once."""
+    pairs = []
+    i = j = 0
+    left_codes, right_codes = left.codes, right.codes
+    left_years, right_years = left.years, right.years
+    while i < len(left) and j < len(right):
+        left_key = (left_codes[i], left_years[i])
+        right_key = (right_codes[j], right_years[j])
+        if left_key == right_key:
+            pairs.append((i, j))
+            i += 1
+            j += 1
+        elif left_key < right_key:
+            i += 1
+        else:
+            j += 1
+    return pairs
+
+
+JOIN_METHODS = {'hash': hash_join, 'merge': merge_join}
+
+
+def _round(value):
+    return float(f"{value:.{SIGNIFICANT_DIGITS}g}")
+
+
+def ratio(left, right, factor=1.0, method='hash'):
+    """Rows of left / right * factor on matching (Code, Year); zero denominators are skipped."""
+    pairs = JOIN_METHODS[method](left, right)
+    lv, rv = left.values, right.values
+    return [(left.entities[i], left.codes[i], left.years[i], _round(lv[i] / rv[j] * factor))
+            for i, j in pairs if rv[j] != 0]
+
+
+def world_totals(file_path, frame):
+    """{year: world total}, from the World row when the file has one."""
+    totals = {}
+    if detect_schema(file_path).layout != 'long':
+        rows = ()
+    else:
+        rows = iter_long_rows(file_path)
+    for _, code, year, value in rows:
+        if code == WORLD_CODE:
+            number = parse_number(value)
+            if number is not None:
+                totals[year] = float(number)
+    if totals:
+        return totals
+    for year, value in zip(frame.years, frame.values):
+        totals[year] = totals.get(year, 0.0) + value
+    return totals
+
+
+def share(frame, totals):
+    """Rows of each value as a percentage of its year's world total."""
+    return [(frame.entities[i], frame.codes[i], year, _round(value / totals[year] * 100))
+            for i, (year, value) in enumerate(zip(frame.years, frame.values))
+            if totals.get(year)]
+
+
+def rolling_mean(frame, window=5):
+    """
+    Rolling mean over the last `window` years of each country. Years missing
+    from a series shorten the window instead of being filled.
+    """
+    rows = []
+    start = 0
+    total = 0.0
+    codes, years, values = frame.codes, frame.years, frame.values
+    for i in range(len(frame)):
+        if i > 0 and codes[i] != codes[i - 1]:
+            start, total = i, 0.0
+        total += values[i]
+        while years[start] <= years[i] - window:
+            total -= values[start]
+            start += 1
+        rows.append((frame.entities[i], codes[i], years[i], _round(total / (i - start + 1))))
+    return rows
+
+
+def cache_key(operation, inputs, params):
+    h = hashlib.sha256()
+    h.update(json.dumps([JOIN_VERSION, operation, params], sort_keys=True).encode())
+    for file_path in inputs:
+        h.update(file_sha256(file_path).encode())
+    return h.hexdigest()[:20]
+
+
+def derive(operation, inputs, out_path, value_name, method='hash', **params):
+    """
+    Compute `operation` on the input files and write a long CSV to `out_path`.
+    Returns True when the result came from the cache.
+    """
+    key = cache_key(operation, inputs, dict(params, value_name=value_name))
+    cached = cache_path('join', key + '.csv')
+    if os.path.exists(cached):
+        shutil.copyfile(cached, out_path)
+        return True
+
+    frames = [load_frame(path) for path in inputs]
+    if operation == 'ratio':
+        rows = ratio(frames[0], frames[1], params.get('factor', 1.0), method)
+    elif operation == 'share':
+        rows = share(frames[0], world_totals(inputs[0], frames[0]))
+    elif operation == 'rolling':
+        rows = rolling_mean(frames[0], params.get('window', 5))
+    else:
+        raise ValueError(f"Unknown operation '{operation}'")
+
+    rows.sort(key=lambda r: (r[0], r[2]))
+    with atomic_path(cached) as tmp_path:
+        write_long_csv(tmp_path, ['Entity', 'Code', 'Year', value_name], rows)
+    shutil.copyfile(cached, out_path)
+    return False
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Derive ratio, share and rolling-mean datasets.")
+    sub = parser.add_subparsers(dest='operation', metavar='<operation>')
+    sub.required = True
+
+    p = sub.add_parser('ratio', help="A / B * factor on matching (Code, Year)")
+    p.add_argument('inputs', nargs=2, metavar='file')
+    p.add_argument('--factor', type=float, default=1.0, help="e.g. 1000000 for per million")
+    p.add_argument('--method', choices=sorted(JOIN_METHODS), default='hash')
+
+    p = sub.add_parser('share', help="A as a percentage of the world total")
+    p.add_argument('inputs', nargs=1, metavar='file')
+
+    p = sub.add_parser('rolling', help="rolling mean of A per country")
+    p.add_argument('inputs', nargs=1, metavar='file')
+    p.add_argument('--window', type=int, default=5)
+
+    for p in sub.choices.values():
+        p.add_argument('-o', '--output', required=True)
+        p.add_argument('--name', default='Value', help="value column name in the output")
+
+    args = parser.parse_args(argv)
+    for file_path in args.inputs:
+        if not os.path.exists(file_path):
+            print(f"Error: File '{file_path}' does not exist")
+            sys.exit(1)
+
+    params = {}
+    if args.operation == 'ratio':
+        params['factor'] = args.factor
+    elif args.operation == 'rolling':
+        params['window'] = args.window
+
+    from_cache = derive(args.operation, args.inputs, args.output, args.name,
+                        method=getattr(args, 'method', 'hash'), **params)
+    print(f"✓ {args.output} written{' (cached)' if from_cache else ''}")
+
+
+if __name__ == "__main__":
+    main()
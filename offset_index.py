@@ -0,0 +1,297 @@
+#!/usr/bin/env python3
+"""
+offset_index.py - Sidecar byte-offset index for cleaned CSVs
+
+Looking up one country or one year in a cleaned CSV otherwise means reading
+the whole file. Each cleaned CSV can get two sidecar files:
+
+- <name>.offsets.bin, fixed-width (byte offset, byte length) records as
+  unsigned 64-bit ints: first the blocks of consecutive rows of each Code
+  (one block per code, as cleaned files are sorted by Entity), then every
+  data row grouped by Year
+- <name>.offsets.json, small enough to parse on every lookup: for each Code
+  and each Year, [first record, record count] in the .bin file
+
+A lookup reads only the records it needs from the .bin file.
+
+The reader mmaps the CSV and parses only the requested slice. The CSV stays
+the source of truth: the index records the CSV's size and modification time
+and is rebuilt when they no longer match.
+
+FAOstat_clean builds the index while it writes its output (IndexedWriter);
+other cleaned files are indexed with `build`, which reads the CSV record by
+record so quoted fields spanning lines are kept whole. Rows are addressed by
+the long layout's positions: Code in column 2, Year in column 3.
+
+Usage:
+    python3 offset_index.py build <file.csv> [...]
+    python3 offset_index.py series <file.csv> <code>
+    python3 offset_index.py year <file.csv> <year>
+"""
+
+import argparse
+import csv
+import io
+import mmap
+import os
+import sys
+from array import array
+
+from file_cache import atomic_write, load_json, save_json
+
+INDEX_VERSION = 2
+CODE_COL = 1
+YEAR_COL = 2
+RECORD_TYPECODE = 'Q'   # (offset, length) pairs in the .bin file
+RECORD_BYTES = 2 * array(RECORD_TYPECODE).itemsize
+
+
+def index_path_for(file_path):
+    return os.path.splitext(file_path)[0] + '.offsets.json'
+
+
+def records_path_for(file_path):
+    return os.path.splitext(file_path)[0] + '.offsets.bin'
+
+
+def parse_rows(text):
+    return list(csv.reader(io.StringIO(text)))
+
+
+def _append_record(groups, key, offset, length):
+    records = groups.get(key)
+    if records is None:
+        records = groups[key] = array(RECORD_TYPECODE)
+    records.append(offset)
+    records.append(length)
+    return records
+
+
+class IndexBuilder:
+    """Collects code blocks and per-year row records from rows seen in file order."""
+
+    def __init__(self):
+        self.data_start = 0
+        self.codes = {}   # code -> array of offset, length, offset, length, ...
+        self.years = {}   # year -> the same, one pair per row
+        self._code = None
+
+    def add(self, row, offset, length):
+        code = row[CODE_COL] if len(row) > CODE_COL else ""
+        if code != self._code:
+            self._code = code
+            _append_record(self.codes, code, offset, 0)
+        blocks = self.codes[code]
+        blocks[-1] = offset + length - blocks[-2]
+        try:
+            year = int(row[YEAR_COL])
+        except (IndexError, ValueError):
+            return
+        _append_record(self.years, year, offset, length)
+
+    def save(self, file_path):
+        """Write the .bin records, then the .json index. Returns the index dict."""
+        codes = {}
+        years = {}
+        count = 0
+        with atomic_write(records_path_for(file_path), 'wb') as f:
+            for positions, groups in ((codes, self.codes),
+                                      (years, {str(y): self.years[y] for y in sorted(self.years)})):
+                for key, records in groups.items():
+                    positions[key] = [count, len(records) // 2]
+                    count += len(records) // 2
+                    records.tofile(f)
+
+        st = os.stat(file_path)
+        index = {
+            'version': INDEX_VERSION,
+            'size': st.st_size,
+            'mtime_ns': st.st_mtime_ns,
+            'data_start': self.data_start,
+            'records': count,
+            'codes': codes,
+            'years': years,
+        }
+        save_json(index_path_for(file_path), index)
+        return index
+
+
+class IndexedWriter:
+    """
+    csv.writer look-alike that also records the byte offset of every data
+    row. The first row written is the header. Call save() after closing
+    the file.
+    """
+
+    def __init__(self, f):
+        self.file = f
+        self.buffer = io.StringIO()
+        self.writer = csv.writer(self.buffer)
+        self.builder = IndexBuilder()
+        self.offset = 0
+        self.header_written = False
+
+    def writerow(self, row):
+        self.writer.writerow(row)
+        line = self.buffer.getvalue()
+        self.buffer.seek(0)
+        self.buffer.truncate()
+        self.file.write(line)
+        length = len(line.encode('utf-8'))
+        if self.header_written:
+            self.builder.add(row, self.offset, length)
+        else:
+            self.builder.data_start = length
+        self.header_written = True
+        self.offset += length
+
+    def writerows(self, rows):
+        for row in rows:
+            self.writerow(row)
+
+    def save(self, file_path):
+        self.builder.save(file_path)
+
+
+def iter_records(f):
+    """
+    Yield (offset, raw bytes) of each CSV record of a binary file, keeping
+    lines together while a quoted field is open.
+    """
+    offset = 0
+    record = b''
+    quotes = 0
+    for line in f:
+        record += line
+        quotes += line.count(b'"')
+        if quotes % 2:
+            continue
+        yield offset, record
+        offset += len(record)
+        record = b''
+        quotes = 0
+    if record:
+        yield offset, record
+
+
+def build_index(file_path):
+    """Index an existing CSV by scanning it once. Returns the index dict."""
+    builder = IndexBuilder()
+    with open(file_path, 'rb') as f:
+        records = iter_records(f)
+        header = next(records, None)
+        builder.data_start = len(header[1]) if header else 0
+        for offset, record in records:
+            rows = parse_rows(record.decode('utf-8'))
+            if rows:
+                builder.add(rows[0], offset, len(record))
+    return builder.save(file_path)
+
+
+def load_index(file_path):
+    """Load the sidecar index of `file_path`, rebuilding it when missing or stale."""
+    index = load_json(index_path_for(file_path))
+    st = os.stat(file_path)
+    records_path = records_path_for(file_path)
+    if (index.get('version') != INDEX_VERSION or index.get('size') != st.st_size
+            or index.get('mtime_ns') != st.st_mtime_ns or not os.path.exists(records_path)
+            or os.path.getsize(records_path) != index.get('records', 0) * RECORD_BYTES):
+        index = build_index(file_path)
+    return index
+
+
+def has_index(file_path):
+    return os.path.exists(index_path_for(file_path))
+
+
+class IndexedDataset:
+    """Read-only, memory-mapped view of a cleaned CSV served through its index."""
+
+    def __init__(self, file_path):
+        self.file_path = file_path
+        self.index = load_index(file_path)
+        self.file = open(file_path, 'rb')
+        size = os.fstat(self.file.fileno()).st_size
+        self.data = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ) if size else b''
+        header = parse_rows(self.data[:self.index['data_start']].decode('utf-8-sig'))
+        self.header = header[0] if header else []
+
+    def _slice(self, offset, length):
+        return self.data[offset:offset + length].decode('utf-8')
+
+    def _records(self, first, count):
+        records = array(RECORD_TYPECODE)
+        if count:
+            with open(records_path_for(self.file_path), 'rb') as f:
+                f.seek(first * RECORD_BYTES)
+                records.frombytes(f.read(count * RECORD_BYTES))
+        return [(records[i], records[i + 1]) for i in range(0, len(records), 2)]
+
+    def codes(self):
+        return list(self.index['codes'])
+
+    def years(self):
+        return [int(year) for year in self.index['years']]
+
+    def series(self, code):
+        """Rows of the country with `code`, in file order ([] if absent)."""
+        rows = []
+        for offset, length in self._records(*self.index['codes'].get(code, (0, 0))):
+            rows.extend(parse_rows(self._slice(offset, length)))
+        return rows
+
+    def year(self, year):
+        """Rows for `year`, one per country, in file order."""
+        return [parse_rows(self._slice(offset, length))[0]
+                for offset, length in self._records(*self.index['years'].get(str(year), (0, 0)))]
+
+    def close(self):
+        if isinstance(self.data, mmap.mmap):
+            self.data.close()
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build or query sidecar offset indexes of cleaned CSVs.")
+    sub = parser.add_subparsers(dest='action', metavar='<action>')
+    sub.required = True
+
+    p = sub.add_parser('build', help="(re)build the index of each file")
+    p.add_argument('files', nargs='+')
+
+    p = sub.add_parser('series', help="print the rows of one country")
+    p.add_argument('file')
+    p.add_argument('code')
+
+    p = sub.add_parser('year', help="print the rows of one year")
+    p.add_argument('file')
+    p.add_argument('year', type=int)
+
+    args = parser.parse_args(argv)
+    files = args.files if args.action == 'build' else [args.file]
+    for file_path in files:
+        if not os.path.exists(file_path):
+            print(f"Error: File '{file_path}' does not exist")
+            sys.exit(1)
+
+    if args.action == 'build':
+        for file_path in files:
+            index = build_index(file_path)
+            print(f"✓ {index_path_for(file_path)}: {len(index['codes'])} codes, {len(index['years'])} years")
+        return
+
+    with IndexedDataset(args.file) as dataset:
+        rows = dataset.series(args.code) if args.action == 'series' else dataset.year(args.year)
+        writer = csv.writer(sys.stdout)
+        writer.writerow(dataset.header)
+        writer.writerows(rows)
+
+
+if __name__ == "__main__":
+    main()
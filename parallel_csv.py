@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""
+parallel_csv.py - Process one large CSV on several cores
+
+The file is split into byte ranges that each start and end on a record
+boundary, so every range can be parsed independently by csv.reader in a
+worker process. A newline only ends a record when it is outside a quoted
+field; fields such as the multi-line `infoDescription` in data.csv contain
+newlines inside quotes. Quote characters are counted while scanning for
+boundaries: a newline preceded by an even number of quotes (escaped quotes
+"" count twice) is a record boundary.
+
+Workers return compact, already sorted results which the caller merges with
+heapq.merge.
+
+Example:
+    ranges = split_ranges("data/huge.csv", 8)
+    results = map_ranges("data/huge.csv", ranges, clean_chunk, workers=4)
+"""
+
+import csv
+import heapq
+import io
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+BLOCK_SIZE = 1024 * 1024
+# Files smaller than this are not worth the process start-up cost
+PARALLEL_THRESHOLD = 64 * 1024 * 1024
+CHUNKS_PER_WORKER = 4
+
+
+def _next_boundary(f, offset, quote_parity):
+    """
+    Return the offset just after the first record-ending newline at or after
+    `offset`, given the quote parity at `offset`. Returns the file size when
+    the rest of the file is one record.
+    """
+    f.seek(offset)
+    position = offset
+    while True:
+        block = f.read(BLOCK_SIZE)
+        if not block:
+            return position
+        start = 0
+        while True:
+            newline = block.find(b'\n', start)
+            if newline == -1:
+                quote_parity ^= block.count(b'"', start) & 1
+                break
+            quote_parity ^= block.count(b'"', start, newline) & 1
+            if not quote_parity:
+                return position + newline + 1
+            start = newline + 1
+        position += len(block)
+
+
+def _quote_parity(f, start, end):
+    """Parity of the quote characters in bytes [start, end)."""
+    f.seek(start)
+    parity = 0
+    remaining = end - start
+    while remaining > 0:
+        block = f.read(min(BLOCK_SIZE, remaining))
+        if not block:
+            break
+        parity ^= block.count(b'"') & 1
+        remaining -= len(block)
+    return parity
+
+
+def split_ranges(file_path, n_chunks, skip_header=True):
+    """
+    Split `file_path` into at most `n_chunks` (start, end) byte ranges aligned
+    to record boundaries. The header record is excluded when `skip_header`.
+    """
+    size = os.path.getsize(file_path)
+    with open(file_path, 'rb') as f:
+        data_start = _next_boundary(f, 0, 0) if skip_header else 0
+        if data_start >= size:
+            return []
+        target = max(1, (size - data_start) // max(1, n_chunks))
+
+        ranges = []
+        start = data_start
+        while start < size:
+            guess = start + target
+            if guess >= size:
+                ranges.append((start, size))
+                break
+            # Quote parity from the last boundary (parity 0) to the guess
+            parity = _quote_parity(f, start, guess)
+            end = _next_boundary(f, guess, parity)
+            ranges.append((start, end))
+            start = end
+    return ranges
+
+
+def iter_range_rows(file_path, start, end, encoding='utf-8'):
+    """Parse the records in bytes [start, end) of `file_path` with csv.reader."""
+    with open(file_path, 'rb') as f:
+        f.seek(start)
+        text = f.read(end - start).decode(encoding)
+    return csv.reader(io.StringIO(text, newline=''))
+
+
+def map_ranges(file_path, ranges, func, *args, workers=None):
+    """
+    Call func(file_path, start, end, *args) for every range in a process pool.
+    Results are returned in file order.
+    """
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(func, file_path, start, end, *args) for start, end in ranges]
+        return [future.result() for future in futures]
+
+
+def should_parallelize(file_path, workers=None):
+    workers = workers or os.cpu_count() or 1
+    return workers > 1 and os.path.getsize(file_path) >= PARALLEL_THRESHOLD
+
+
+def merge_sorted(results, key=None):
+    """Merge already sorted per-chunk sequences, keeping chunk order for ties."""
+    return heapq.merge(*results, key=key)
@@ -0,0 +1,264 @@
+#!/usr/bin/env python3
+"""
+planner.py - Prefetch and prebuild the next days of puzzles
+
+data.csv schedules one puzzle per `date`. The planner takes the puzzles of
+the next `days` dates and, earliest deadline first:
+
+1. re-downloads each puzzle's data link and runs its cleaning stage
+   (async_pipeline.py: concurrency limit, per-host delay, cleaning
+   overlapped with the other downloads)
+2. builds the day's bundle from its data.csv row as
+   bundles/day-<date>.<hash>.json (+ .gz), like build_bundles.py does for
+   config/*.json
+
+A failed or slow download is reported with the number of days left before
+the puzzle goes live; the day is still built from the local copy when there
+is one. Built days are recorded in bundles/schedule.json, which is a
+bounded cache: a day is only rebuilt when its data.csv row or its dataset
+changed, past days are dropped, and at most MAX_BUILT_DAYS future days are
+kept (the furthest out are dropped first).
+
+The catalog entries of the planned datasets are brought up to date after the
+downloads (unchanged files are not rescanned) and used to warn about puzzles
+whose dataset stops before the row's yearEnd.
+
+Usage:
+    python3 planner.py [--days 7] [--today 2026-01-31] [--offline]
+                       [--concurrency 4] [--workers N] [--max-built 30]
+"""
+
+import argparse
+import asyncio
+import csv
+import glob
+import hashlib
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date
+
+from build_bundles import BUNDLE_DIR, PUZZLE_FILE
+
+DEFAULT_DAYS = 7
+MAX_BUILT_DAYS = 30
+SLOW_DOWNLOAD_SECONDS = 60
+SCHEDULE_FILE = os.path.join(BUNDLE_DIR, "schedule.json")
+
+
+def day_name(day):
+    return f"day-{day}"
+
+
+def upcoming_puzzles(today, days, puzzle_file=PUZZLE_FILE):
+    """The data.csv rows of the next `days` scheduled dates from `today`, by date."""
+    by_date = {}
+    with open(puzzle_file, 'r', newline='', encoding='utf-8') as f:
+        for row in csv.DictReader(f):
+            day = (row.get('date') or '').strip()
+            try:
+                scheduled = date.fromisoformat(day)
+            except ValueError:
+                continue
+            if scheduled >= today:
+                by_date.setdefault(day, row)   # first row wins on a repeated date
+    return [by_date[day] for day in sorted(by_date)[:days]]
+
+
+def load_schedule():
+    if not os.path.exists(SCHEDULE_FILE):
+        return {}
+    with open(SCHEDULE_FILE, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def save_schedule(schedule):
+    os.makedirs(BUNDLE_DIR, exist_ok=True)
+    with open(SCHEDULE_FILE, 'w', encoding='utf-8') as f:
+        json.dump(schedule, f, indent=2, sort_keys=True)
+
+
+def build_key(row, dataset_path):
+    """Changes when the puzzle row or its dataset changes."""
+    from file_cache import file_sha256
+
+    payload = json.dumps([row, dataset_path, file_sha256(dataset_path)], sort_keys=True)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()[:16]
+
+
+def build_day(row, previous=None):
+    """
+    Build the bundle of one scheduled puzzle in a worker process. Returns a
+    schedule entry, or None when the dataset is not available locally.
+    `previous` is the day's entry from the last run, reused when unchanged.
+    """
+    from build_bundles import build_bundle, resolve_dataset, write_bundle
+
+    dataset_path = resolve_dataset(row.get('OWID_datalink', ''))
+    if dataset_path is None:
+        return None
+    key = build_key(row, dataset_path)
+    if (previous and previous.get('key') == key
+            and os.path.exists(os.path.join(BUNDLE_DIR, previous['file']))):
+        return dict(previous, cached=True)
+    entry = write_bundle(day_name(row['date']), build_bundle(row, dataset_path))
+    entry.update(key=key, dataset=dataset_path, title=row.get('title', ''), cached=False)
+    return entry
+
+
+def evict_days(schedule, today, max_built=MAX_BUILT_DAYS):
+    """Drop past days and the furthest-out days beyond `max_built`. Returns the dropped dates."""
+    future = sorted(day for day in schedule if day >= today.isoformat())
+    dropped = [day for day in schedule if day < today.isoformat()] + future[max_built:]
+    for day in dropped:
+        for path in glob.glob(os.path.join(BUNDLE_DIR, f"{day_name(day)}.*.json*")):
+            os.remove(path)
+        del schedule[day]
+    return dropped
+
+
+def stale_datasets(rows):
+    """
+    {date: message} for puzzles whose dataset ends before yearEnd. The
+    catalog entries of the datasets are updated first.
+    """
+    from build_bundles import parse_year, resolve_dataset
+    from catalog import update_catalog
+
+    paths = {row['date']: resolve_dataset(row.get('OWID_datalink', '')) for row in rows}
+    datasets = update_catalog(sorted({p for p in paths.values() if p}), verbose=False)['datasets']
+    warnings = {}
+    for row in rows:
+        year_end = parse_year(row.get('yearEnd'))
+        path = paths[row['date']]
+        entry = datasets.get(path) if path else None
+        if year_end and entry and entry.get('latest_year') and entry['latest_year'] < year_end:
+            warnings[row['date']] = f"{path} ends in {entry['latest_year']}, yearEnd is {year_end}"
+    return warnings
+
+
+async def plan_day(row, fetch, pool, schedule):
+    """Wait for the day's download (if any), then build its bundle."""
+    outcome = {'date': row['date'], 'title': row.get('title', ''), 'fetch': None, 'build': None}
+    if fetch is not None:
+        outcome['fetch'] = await fetch
+    loop = asyncio.get_running_loop()
+    try:
+        outcome['build'] = await loop.run_in_executor(pool, build_day, row, schedule.get(row['date']))
+    except Exception as e:
+        outcome['error'] = str(e)
+    return outcome
+
+
+async def run_plan(rows, fetch=True, concurrency=4, workers=None, host_delay=None):
+    """Fetch and build every row, earliest date first. Returns one outcome per row."""
+    from async_pipeline import HOST_DELAY, HostThrottle, process_job
+    from fetch_data import BACKUP_DIR, extract_filename_from_owid_url
+
+    os.makedirs(BACKUP_DIR, exist_ok=True)
+    semaphore = asyncio.Semaphore(concurrency)
+    throttle = HostThrottle(HOST_DELAY if host_delay is None else host_delay)
+    schedule = load_schedule()
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        # Tasks are created in date order and the semaphore wakes waiters
+        # in order, so earlier deadlines are downloaded first
+        fetches = {}
+        for row in rows:
+            url = (row.get('OWID_datalink') or '').strip()
+            if fetch and url and url not in fetches:
+                filename, _ = extract_filename_from_owid_url(url)
+                fetches[url] = asyncio.ensure_future(
+                    process_job(url, filename, pool, semaphore, throttle))
+        return await asyncio.gather(*(
+            plan_day(row, fetches.get((row.get('OWID_datalink') or '').strip()), pool, schedule)
+            for row in rows
+        ))
+
+
+def record_outcomes(outcomes, today, max_built=MAX_BUILT_DAYS):
+    """Update the schedule cache with the built days and evict old ones."""
+    schedule = load_schedule()
+    for outcome in outcomes:
+        entry = outcome['build']
+        if entry and not entry.get('cached'):
+            entry = {k: v for k, v in entry.items() if k != 'cached'}
+            schedule[outcome['date']] = entry
+    dropped = evict_days(schedule, today, max_built)
+    save_schedule(schedule)
+    return dropped
+
+
+def print_report(outcomes, today, warnings):
+    problems = 0
+    for outcome in outcomes:
+        days_left = (date.fromisoformat(outcome['date']) - today).days
+        when = "today" if days_left == 0 else f"in {days_left} day{'s' if days_left != 1 else ''}"
+        fetch, build = outcome['fetch'], outcome['build']
+        print(f"{outcome['date']} ({when}): {outcome['title']}")
+
+        if fetch is not None and fetch['status'] == 'failed':
+            problems += 1
+            print(f"  ⚠ upstream failed: {fetch['detail']}")
+            print(f"    URL: {fetch['url']}")
+        elif fetch is not None and (fetch.get('seconds') or 0) > SLOW_DOWNLOAD_SECONDS:
+            print(f"  ⚠ slow upstream: {fetch['seconds']:.0f}s for {fetch['filename']}")
+        if outcome['date'] in warnings:
+            print(f"  ⚠ {warnings[outcome['date']]}")
+
+        if 'error' in outcome:
+            problems += 1
+            print(f"  ✗ build failed: {outcome['error']}")
+        elif build is None:
+            problems += 1
+            print(f"  ✗ not built: dataset not available locally")
+        elif build.get('cached'):
+            print(f"  ✓ already built, unchanged")
+        else:
+            print(f"  ✓ {build['file']} ({build['bytes']} bytes, {build['gzipBytes']} gzipped)")
+    return problems
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Prefetch and prebuild the next days of puzzles.")
+    parser.add_argument('--days', type=int, default=DEFAULT_DAYS, help="scheduled dates to prepare")
+    parser.add_argument('--today', type=date.fromisoformat, default=None,
+                        help="plan from this date (YYYY-MM-DD) instead of today")
+    parser.add_argument('--offline', action='store_true', help="build from local datasets only")
+    parser.add_argument('--concurrency', type=int, default=4, help="parallel downloads")
+    parser.add_argument('--workers', type=int, help="cleaning and build processes")
+    parser.add_argument('--host-delay', type=float, help="seconds between requests to a host")
+    parser.add_argument('--max-built', type=int, default=MAX_BUILT_DAYS,
+                        help="future days kept in bundles/schedule.json")
+    args = parser.parse_args(argv)
+
+    if not os.path.exists(PUZZLE_FILE):
+        print(f"Error: {PUZZLE_FILE} not found. Please run the main fetch first.")
+        sys.exit(1)
+
+    today = args.today or date.today()
+    rows = upcoming_puzzles(today, args.days)
+    if not rows:
+        print(f"No puzzles scheduled from {today}")
+        return 0
+    print(f"Planning {len(rows)} puzzles: {rows[0]['date']} to {rows[-1]['date']}\n")
+
+    from fetch_data import http_pool
+    try:
+        outcomes = asyncio.run(run_plan(rows, not args.offline, args.concurrency,
+                                        args.workers, args.host_delay))
+    finally:
+        http_pool.close()
+
+    print("=" * 70)
+    problems = print_report(outcomes, today, stale_datasets(rows))
+    dropped = record_outcomes(outcomes, today, args.max_built)
+    built = sum(1 for o in outcomes if o['build'] and not o['build'].get('cached'))
+    unchanged = sum(1 for o in outcomes if o['build'] and o['build'].get('cached'))
+    print(f"\n✓ {built} days built, {unchanged} unchanged, {problems} problems, "
+          f"{len(dropped)} evicted from {SCHEDULE_FILE}")
+    return 1 if problems else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Registry of regions and aggregates (continents, FAO/WB/UNDP/EI/Ember groups,
+income groups, OWID_* aggregate codes).
+
+Every check is a frozenset lookup, so filtering is O(1) per row. Names are
+matched exactly, never by substring, so countries such as "Central African
+Republic" or "Solomon Islands" are not mistaken for regions.
+
+Usage:
+    from regions import is_aggregate, is_country
+
+    is_aggregate("Africa (FAO)")          # True
+    is_aggregate("Solomon Islands")       # False
+    is_country("Kosovo", "OWID_KOS")      # True
+"""
+
+# OWID codes for aggregates
+AGGREGATE_CODES = frozenset({
+    "OWID_WRL",   # World
+    "OWID_AFR",   # Africa
+    "OWID_ASI",   # Asia
+    "OWID_EUR",   # Europe
+    "OWID_EU27",  # European Union (27)
+    "OWID_NAM",   # North America
+    "OWID_SAM",   # South America
+    "OWID_OCE",   # Oceania
+    "OWID_MNS",   # Melanesia
+    "OWID_PYA",   # Polynesia
+    "OWID_MIC",   # Micronesia (region)
+    "OWID_HIC",   # High-income countries
+    "OWID_UMC",   # Upper-middle-income countries
+    "OWID_LMC",   # Lower-middle-income countries
+    "OWID_LIC",   # Low-income countries
+    "OWID_INT",   # International transport
+})
+
+# OWID codes for real (including historical) countries without an ISO code
+OWID_COUNTRY_CODES = frozenset({
+    "OWID_KOS",   # Kosovo
+    "OWID_CYN",   # Northern Cyprus
+    "OWID_SML",   # Somaliland
+    "OWID_CZS",   # Czechoslovakia
+    "OWID_USS",   # USSR
+    "OWID_YGS",   # Yugoslavia
+    "OWID_SRM",   # Serbia and Montenegro
+    "OWID_ERE",   # Ethiopia (former)
+    "OWID_GFR",   # West Germany
+    "OWID_GDR",   # East Germany
+})
+
+# Suffixes OWID appends to aggregates from other sources, e.g. "Africa (FAO)"
+AGGREGATE_SUFFIXES = frozenset({"FAO", "WB", "EI", "Ember", "UNDP", "WHO", "UN", "BP", "Shift"})
+
+AGGREGATE_NAMES = frozenset({
+    # Continents and world
+    "World", "Africa", "Americas", "Asia", "Europe", "Oceania",
+    "North America", "South America", "Latin America", "Antarctica",
+
+    # FAO / UN M49 regions
+    "Australia and New Zealand", "Caribbean", "Central America", "Central Asia",
+    "Eastern Africa", "Eastern Asia", "Eastern Europe", "Melanesia", "Micronesia (region)",
+    "Middle Africa", "Northern Africa", "Northern America", "Northern Europe",
+    "Polynesia", "South-eastern Asia", "Southern Africa", "Southern Asia",
+    "Southern Europe", "Western Africa", "Western Asia", "Western Europe",
+    "Sub-Saharan Africa", "Other non-specified areas", "Other",
+
+    # FAO country groups
+    "European Union", "European Union (27)", "EU-27",
+    "Land Locked Developing Countries", "Least Developed Countries",
+    "Low Income Food Deficit Countries", "Net Food Importing Developing Countries",
+    "Small Island Developing States",
+
+    # World Bank regions and income groups
+    "East Asia and Pacific", "Europe and Central Asia", "Latin America and Caribbean",
+    "Middle East and North Africa", "South Asia",
+    "High-income countries", "Upper-middle-income countries",
+    "Lower-middle-income countries", "Low-income countries",
+    "High income", "Upper middle income", "Lower middle income", "Low income",
+
+    # Other groupings seen in OWID downloads
+    "OECD", "Non-OECD", "G7", "G20", "ASEAN", "CIS", "Middle East", "Asia Pacific",
+    "International transport", "International aviation", "International shipping",
+})
+
+
+def _source_suffix(entity):
+    """Return 'FAO' for 'Africa (FAO)', else None."""
+    if entity.endswith(')'):
+        base, sep, suffix = entity[:-1].rpartition(' (')
+        if sep:
+            return suffix
+    return None
+
+
+def is_aggregate(entity, code=""):
+    """True if the row is a region, continent, income group or other aggregate."""
+    if code:
+        if code in AGGREGATE_CODES:
+            return True
+        if code.startswith("OWID_"):
+            return code not in OWID_COUNTRY_CODES
+    if entity in AGGREGATE_NAMES:
+        return True
+    return _source_suffix(entity) in AGGREGATE_SUFFIXES
+
+
+def is_country(entity, code):
+    """True for rows that belong to an actual country: a code and not an aggregate."""
+    return bool(code) and not is_aggregate(entity, code)
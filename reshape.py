@@ -0,0 +1,239 @@
+#!/usr/bin/env python3
+"""
+reshape.py - Pre-pivot cleaned datasets for the chart front end
+
+Cleaned datasets are long (Entity, Code, Year, Value), one row per
+country-year. This script writes the per-country series layout next to the
+long CSV so the client no longer pivots on every load:
+
+    <name>.series.json
+    {"columns":["entity","years","values"],
+     "series":{"AGO":["Angola",[2015,2016],[71485,73007]], ...}}
+
+The cleaners (FAOstat_clean, faostat_bulk, gbd_ingest) write it with every
+cleaned output in clean/; `series` builds it for any other long file.
+
+It can also convert between long and wide layouts:
+- long  -> wide: Year, <country>, <country>, ...  (like cleaned_banana_production.csv)
+- wide  -> long: from entities-as-columns or years-as-columns files
+
+Usage:
+    python3 reshape.py series <long_file> [<long_file> ...]
+    python3 reshape.py wide <long_file> <output_file>
+    python3 reshape.py long <wide_file> <output_file>
+"""
+
+import bisect
+import csv
+import json
+import os
+import sys
+from array import array
+
+from dataset_io import LONG_HEADER, iter_long_rows, write_long_csv
+from schema_detect import detect_schema, iter_wide_rows
+
+
+def parse_number(text):
+    """Convert a value string to int/float for JSON, None when empty or NA."""
+    if text == "" or text == "NA":
+        return None
+    try:
+        if '.' in text or 'e' in text or 'E' in text:
+            return float(text)
+        return int(text)
+    except ValueError:
+        return None
+
+
+def build_series(file_path):
+    """Build {code: [entity, years, values]} from a long CSV."""
+    return build_series_from_rows(iter_long_rows(file_path))
+
+
+def build_series_from_rows(rows):
+    """
+    Build the series dict from (entity, code, year, value) tuples.
+
+    Rows are read once into flat columns (years in an int array); series
+    lists are then allocated at their final size and filled by index, so no
+    per-country list is grown row by row. Rows without a code are skipped.
+    """
+    code_ids = {}
+    codes = []
+    entities = []
+    counts = []
+    row_code = array('I')
+    row_year = array('i')
+    row_value = []
+
+    for entity, code, year, value in rows:
+        if not code:
+            continue
+        code_id = code_ids.get(code)
+        if code_id is None:
+            code_id = code_ids[code] = len(codes)
+            codes.append(code)
+            entities.append(entity)
+            counts.append(0)
+        counts[code_id] += 1
+        row_code.append(code_id)
+        row_year.append(year)
+        row_value.append(parse_number(value))
+
+    years_out = [[0] * n for n in counts]
+    values_out = [[None] * n for n in counts]
+    cursor = [0] * len(codes)
+    needs_sort = [False] * len(codes)
+
+    for code_id, year, value in zip(row_code, row_year, row_value):
+        pos = cursor[code_id]
+        years = years_out[code_id]
+        if pos and years[pos - 1] > year:
+            needs_sort[code_id] = True
+        years[pos] = year
+        values_out[code_id][pos] = value
+        cursor[code_id] = pos + 1
+
+    series = {}
+    for code_id, code in enumerate(codes):
+        years, values = years_out[code_id], values_out[code_id]
+        if needs_sort[code_id]:
+            pairs = sorted(zip(years, values), key=lambda p: p[0])
+            years = [p[0] for p in pairs]
+            values = [p[1] for p in pairs]
+        series[code] = [entities[code_id], years, values]
+    return series
+
+
+def series_path_for(file_path):
+    return os.path.splitext(file_path)[0] + '.series.json'
+
+
+def write_series(series, out_path):
+    payload = {'columns': ['entity', 'years', 'values'], 'series': series}
+    with open(out_path, 'w', encoding='utf-8') as f:
+        json.dump(payload, f, separators=(',', ':'), ensure_ascii=False)
+
+
+def load_series(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)['series']
+
+
+def apply_delta_to_series(series, delta):
+    """Update a series dict in place from a delta_refresh delta."""
+    for code, year in delta['removed']:
+        entry = series.get(code)
+        if entry is None:
+            continue
+        years = entry[1]
+        idx = bisect.bisect_left(years, year)
+        if idx < len(years) and years[idx] == year:
+            del years[idx]
+            del entry[2][idx]
+            if not years:
+                del series[code]
+
+    for row in delta['changed']:
+        code, year, new_value = row[1], row[2], row[4]
+        entry = series.get(code)
+        if entry is None:
+            continue
+        idx = bisect.bisect_left(entry[1], year)
+        if idx < len(entry[1]) and entry[1][idx] == year:
+            entry[2][idx] = parse_number(new_value)
+
+    for entity, code, year, value in delta['added']:
+        entry = series.setdefault(code, [entity, [], []])
+        idx = bisect.bisect_left(entry[1], year)
+        entry[1].insert(idx, year)
+        entry[2].insert(idx, parse_number(value))
+
+
+def write_series_for(file_path):
+    """Build and write the .series.json file next to a long CSV."""
+    series = build_series(file_path)
+    out_path = series_path_for(file_path)
+    write_series(series, out_path)
+    return out_path, len(series)
+
+
+def long_to_wide(file_path, out_path, missing=""):
+    """Pivot a long CSV to Year, <entity>, <entity>, ... with one row per year."""
+    series = build_series(file_path)
+    entities = sorted(entry[0] for entry in series.values())
+    by_entity = {entry[0]: dict(zip(entry[1], entry[2])) for entry in series.values()}
+    all_years = sorted({year for entry in series.values() for year in entry[1]})
+
+    with open(out_path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(['Year'] + entities)
+        for year in all_years:
+            row = [year]
+            for entity in entities:
+                value = by_entity[entity].get(year)
+                row.append(missing if value is None else value)
+            writer.writerow(row)
+
+
+def iter_wide_as_long(file_path, schema=None):
+    """
+    Yield (entity, "", year, value) tuples from an entities-as-columns or
+    years-as-columns file. Empty and NA cells are skipped.
+    """
+    if schema is None:
+        schema = detect_schema(file_path)
+
+    with open(file_path, 'r', newline='', encoding='utf-8') as f:
+        reader = csv.reader(f)
+        next(reader)
+        if schema.layout == 'wide_entities':
+            for row in reader:
+                try:
+                    year = int(row[schema.year_col])
+                except (IndexError, ValueError):
+                    continue
+                for col in schema.entity_columns:
+                    if col < len(row) and row[col] not in ("", "NA"):
+                        yield schema.header[col], "", year, row[col]
+        elif schema.layout == 'wide_years':
+            for entity, _, year, value in iter_wide_rows(reader, schema):
+                if value != "NA":
+                    yield entity, "", int(year), value
+        else:
+            raise ValueError(f"{file_path} is not in a wide layout ({schema.source})")
+
+
+def wide_to_long(file_path, out_path):
+    """Melt an entities-as-columns or years-as-columns file to the long layout."""
+    rows = sorted(iter_wide_as_long(file_path), key=lambda r: (r[0], r[2]))
+    write_long_csv(out_path, LONG_HEADER, rows)
+    return len(rows)
+
+
+def main():
+    if len(sys.argv) < 3 or sys.argv[1] not in ('series', 'wide', 'long'):
+        print("Usage: python3 reshape.py series <long_file> [<long_file> ...]")
+        print("       python3 reshape.py wide <long_file> <output_file>")
+        print("       python3 reshape.py long <wide_file> <output_file>")
+        sys.exit(1)
+
+    mode = sys.argv[1]
+    if mode == 'series':
+        for file_path in sys.argv[2:]:
+            out_path, count = write_series_for(file_path)
+            print(f"✓ {out_path} ({count} series)")
+    elif len(sys.argv) != 4:
+        print(f"Usage: python3 reshape.py {mode} <input_file> <output_file>")
+        sys.exit(1)
+    elif mode == 'wide':
+        long_to_wide(sys.argv[2], sys.argv[3])
+        print(f"✓ Wide layout written to {sys.argv[3]}")
+    else:
+        count = wide_to_long(sys.argv[2], sys.argv[3])
+        print(f"✓ Long layout written to {sys.argv[3]} ({count} rows)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""
+result_cache.py - Persistent cache of cleaner outputs
+
+A cleaner's output is fully determined by the raw input, the cleaner code and
+the country-name table. Each cleaner declares a CLEANER_VERSION (bumped when
+its output changes), and results are stored in .cache/results/ under a key
+built from:
+
+    (sha256 of the raw file, cleaner name, CLEANER_VERSION,
+     country_names.names_version(), cleaner options)
+
+Cleaning the same raw file again is then a file copy. Entries are evicted
+least recently used first once the cache exceeds MAX_BYTES or MAX_ENTRIES;
+every hit refreshes the entry's modification time.
+
+Usage:
+    python3 result_cache.py stats
+    python3 result_cache.py evict [--max-mb 256]
+    python3 result_cache.py clear
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import shutil
+
+from file_cache import atomic_path, cache_path, file_sha256
+
+MAX_BYTES = int(os.environ.get('CHARTLE_RESULT_CACHE_MB', '256')) * 1024 * 1024
+MAX_ENTRIES = 500
+
+
+def results_dir():
+    return os.path.dirname(cache_path('results', 'x'))
+
+
+def result_key(raw_path, cleaner, version, options=None):
+    """Cache key of cleaning `raw_path` with `cleaner` at `version`."""
+    from country_names import names_version
+
+    parts = [file_sha256(raw_path), cleaner, str(version), names_version(), options or {}]
+    return hashlib.sha256(json.dumps(parts, sort_keys=True).encode()).hexdigest()[:24]
+
+
+def _entry_path(key):
+    return os.path.join(results_dir(), key + '.csv')
+
+
+def get_result(key, out_path):
+    """Copy the cached result for `key` to `out_path`. Returns False on a miss."""
+    entry = _entry_path(key)
+    try:
+        with atomic_path(out_path) as tmp_path:
+            shutil.copyfile(entry, tmp_path)
+        os.utime(entry)  # mark as recently used
+    except FileNotFoundError:   # missing, or evicted by a concurrent process
+        return False
+    return True
+
+
+def put_result(key, result_path):
+    """Store a cleaner output under `key`, then evict old entries if needed."""
+    with atomic_path(_entry_path(key)) as tmp_path:
+        shutil.copyfile(result_path, tmp_path)
+    evict()
+
+
+def _entries():
+    """[(mtime, size, path)] of cached results, least recently used first."""
+    entries = []
+    with os.scandir(results_dir()) as it:
+        for item in it:
+            if item.is_file() and item.name.endswith('.csv'):
+                try:
+                    st = item.stat()
+                except FileNotFoundError:   # evicted by a concurrent process
+                    continue
+                entries.append((st.st_mtime, st.st_size, item.path))
+    entries.sort()
+    return entries
+
+
+def evict(max_bytes=MAX_BYTES, max_entries=MAX_ENTRIES):
+    """Remove least recently used results until both limits hold. Returns the count removed."""
+    entries = _entries()
+    total = sum(size for _, size, _ in entries)
+    removed = 0
+    while entries and (total > max_bytes or len(entries) > max_entries):
+        _, size, path = entries.pop(0)
+        try:
+            os.remove(path)
+        except FileNotFoundError:   # evicted by a concurrent process
+            pass
+        total -= size
+        removed += 1
+    return removed
+
+
+def stats():
+    entries = _entries()
+    return {'entries': len(entries), 'bytes': sum(size for _, size, _ in entries)}
+
+
+def clear():
+    removed = 0
+    for _, _, path in _entries():
+        os.remove(path)
+        removed += 1
+    return removed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Inspect or trim the cleaner result cache.")
+    parser.add_argument('action', choices=('stats', 'evict', 'clear'))
+    parser.add_argument('--max-mb', type=float,
+                        help="size limit for evict (default: CHARTLE_RESULT_CACHE_MB or 256)")
+    args = parser.parse_args(argv)
+
+    if args.action == 'stats':
+        info = stats()
+        print(f"{info['entries']} cached results, {info['bytes'] / 1024 / 1024:.1f} MB "
+              f"(limit {MAX_BYTES / 1024 / 1024:.0f} MB, {MAX_ENTRIES} entries) in {results_dir()}")
+    elif args.action == 'evict':
+        max_bytes = int(args.max_mb * 1024 * 1024) if args.max_mb is not None else MAX_BYTES
+        print(f"✓ {evict(max_bytes)} cached results evicted")
+    else:
+        print(f"✓ {clear()} cached results removed")
+
+
+if __name__ == "__main__":
+    main()
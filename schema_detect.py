@@ -0,0 +1,266 @@
+#!/usr/bin/env python3
+"""
+schema_detect.py - Recognize the source format of a dataset by its header
+
+Supported signatures:
+- owid_grapher        entity, code, year, <value columns>   (any case)
+- owid_explorer       country, year, <value columns>, or several value columns
+- faostat_normalized  Area, Item, Element, Year, Unit, Value (FAOSTAT bulk "Normalized")
+- faostat_undata      "Country or Area", Element, Year, Unit, Value, "Value Footnotes"
+- faostat_bulk_wide   Area, Item, Element, Unit, Y1961, Y1962, ... (years as columns)
+- gbd                 location(_name), year, val, plus measure/metric/sex/age/cause
+- wide_years          <entity>, [code], 1990, 1991, ...  (e.g. World Bank)
+- wide_entities       Year, <country>, <country>, ...   (e.g. cleaned_banana_production.csv)
+
+Detection results are cached in .cache/schema/<fingerprint>.json, one file
+per fingerprint so parallel workers never overwrite each other's entries;
+cleaning the same file again skips detection.
+
+Usage:
+    python3 schema_detect.py <filename> [<filename> ...]
+"""
+
+import csv
+import re
+import sys
+from dataclasses import asdict, dataclass, field
+from typing import List, Optional
+
+from file_cache import cache_path, file_fingerprint, load_json, save_json
+
+SCHEMA_CACHE_VERSION = 1
+SAMPLE_ROWS = 6
+
+YEAR_COLUMN_RE = re.compile(r'^Y?(\d{4})$')
+
+GBD_FILTER_COLUMNS = ('measure', 'metric', 'sex', 'age', 'cause')
+
+
+@dataclass
+class Schema:
+    """Typed description of a dataset's layout. Column fields are indexes."""
+    source: str
+    layout: str                      # 'long', 'wide_years' or 'wide_entities'
+    header: List[str]
+    entity_col: Optional[int] = None
+    code_col: Optional[int] = None
+    year_col: Optional[int] = None
+    value_cols: List[int] = field(default_factory=list)
+    element_col: Optional[int] = None
+    item_col: Optional[int] = None
+    unit_col: Optional[int] = None
+    footnote_cols: List[int] = field(default_factory=list)
+    # Wide layouts: (column index, year) for years-as-columns,
+    # column indexes of entities for entities-as-columns
+    year_columns: List[List[int]] = field(default_factory=list)
+    entity_columns: List[int] = field(default_factory=list)
+    # GBD: column index of each filter dimension ('measure', 'cause', ...)
+    filter_cols: dict = field(default_factory=dict)
+
+    @property
+    def value_col(self):
+        return self.value_cols[0] if self.value_cols else None
+
+
+def _index(lower_header, *names):
+    """Index of the first header column matching one of `names`, else None."""
+    for name in names:
+        if name in lower_header:
+            return lower_header.index(name)
+    return None
+
+
+def _is_year(text):
+    try:
+        return 1800 <= int(text) <= 2100
+    except ValueError:
+        return False
+
+
+def detect_schema_from_header(header, sample_rows=()):
+    """Detect a Schema from a header row and a few sample rows."""
+    lower = [col.strip().lower() for col in header]
+
+    # Years as columns (FAOSTAT bulk "All_Data", World Bank, ...)
+    year_columns = []
+    for i, col in enumerate(header):
+        match = YEAR_COLUMN_RE.match(col.strip())
+        if match:
+            year_columns.append([i, int(match.group(1))])
+
+    if len(year_columns) >= 2:
+        if 'area' in lower and 'item' in lower:
+            return Schema(
+                source='faostat_bulk_wide', layout='wide_years', header=header,
+                entity_col=lower.index('area'),
+                item_col=lower.index('item'),
+                element_col=_index(lower, 'element'),
+                unit_col=_index(lower, 'unit'),
+                year_columns=year_columns,
+            )
+        return Schema(
+            source='wide_years', layout='wide_years', header=header,
+            entity_col=_index(lower, 'country name', 'country', 'entity', 'area') or 0,
+            code_col=_index(lower, 'country code', 'code', 'iso3'),
+            year_columns=year_columns,
+        )
+
+    # GBD results export
+    entity_col = _index(lower, 'location_name', 'location')
+    if entity_col is not None and 'val' in lower and 'year' in lower:
+        filter_cols = {}
+        for name in GBD_FILTER_COLUMNS:
+            idx = _index(lower, name + '_name', name)
+            if idx is not None:
+                filter_cols[name] = idx
+        return Schema(
+            source='gbd', layout='long', header=header,
+            entity_col=entity_col,
+            code_col=_index(lower, 'code'),
+            year_col=lower.index('year'),
+            value_cols=[lower.index('val')],
+            filter_cols=filter_cols,
+        )
+
+    # FAOSTAT bulk normalized download
+    if 'area' in lower and 'item' in lower and 'year' in lower and 'value' in lower:
+        return Schema(
+            source='faostat_normalized', layout='long', header=header,
+            entity_col=lower.index('area'),
+            item_col=lower.index('item'),
+            element_col=_index(lower, 'element'),
+            unit_col=_index(lower, 'unit'),
+            year_col=lower.index('year'),
+            value_cols=[lower.index('value')],
+        )
+
+    # FAOSTAT via UNdata export
+    if 'country or area' in lower and 'year' in lower and 'value' in lower:
+        return Schema(
+            source='faostat_undata', layout='long', header=header,
+            entity_col=lower.index('country or area'),
+            element_col=_index(lower, 'element'),
+            unit_col=_index(lower, 'unit'),
+            year_col=lower.index('year'),
+            value_cols=[lower.index('value')],
+            footnote_cols=[i for i, col in enumerate(lower) if 'footnote' in col],
+        )
+
+    # OWID grapher / cleaned long outputs
+    if lower[:3] in (['entity', 'code', 'year'], ['entity', 'year', 'code']):
+        year_col = lower.index('year')
+        code_col = lower.index('code')
+        value_cols = list(range(3, len(header)))
+        return Schema(
+            source='owid_grapher' if len(value_cols) <= 1 else 'owid_explorer',
+            layout='long', header=header,
+            entity_col=0, code_col=code_col, year_col=year_col, value_cols=value_cols,
+        )
+
+    # OWID explorer data files
+    if lower[:2] == ['country', 'year']:
+        return Schema(
+            source='owid_explorer', layout='long', header=header,
+            entity_col=0, year_col=1, value_cols=list(range(2, len(header))),
+        )
+
+    # Entities as columns: Year, <country>, <country>, ...
+    year_col = _index(lower, 'year')
+    if year_col is not None and year_col <= 1 and len(header) > 3:
+        return Schema(
+            source='wide_entities', layout='wide_entities', header=header,
+            year_col=year_col,
+            entity_columns=list(range(year_col + 1, len(header))),
+        )
+
+    # Unknown: fall back to the substring heuristics of FAOstat_clean
+    schema = Schema(source='unknown', layout='long', header=header, entity_col=0)
+    for i, col in enumerate(lower):
+        if 'year' in col:
+            schema.year_col = i
+        elif 'value' in col and 'footnote' not in col:
+            schema.value_cols = [i]
+        elif 'element' in col and schema.element_col is None:
+            schema.element_col = i
+        elif col == 'unit':
+            schema.unit_col = i
+        if 'footnote' in col:
+            schema.footnote_cols.append(i)
+    if schema.year_col is None:
+        for row in sample_rows:
+            for i, cell in enumerate(row):
+                if _is_year(cell.strip('"')):
+                    schema.year_col = i
+                    break
+            if schema.year_col is not None:
+                break
+    return schema
+
+
+def _read_sample(file_path):
+    if file_path.endswith('.parquet'):
+        # Parquet exports (columnar.py) are always in the long layout
+        from dataset_io import read_header
+        return read_header(file_path), []
+    with open(file_path, 'r', newline='', encoding='utf-8-sig') as f:
+        reader = csv.reader(f)
+        header = next(reader, [])
+        sample_rows = []
+        for row in reader:
+            sample_rows.append(row)
+            if len(sample_rows) >= SAMPLE_ROWS:
+                break
+    return header, sample_rows
+
+
+def detect_schema(file_path, use_cache=True):
+    """
+    Return the Schema of `file_path`, served from the fingerprint cache when
+    the file has been seen before.
+    """
+    cache_file = cache_path('schema', file_fingerprint(file_path) + '.json')
+    cached = load_json(cache_file) if use_cache else {}
+    if cached.get('version') == SCHEMA_CACHE_VERSION:
+        return Schema(**cached['schema'])
+
+    header, sample_rows = _read_sample(file_path)
+    schema = detect_schema_from_header(header, sample_rows)
+
+    if use_cache:
+        save_json(cache_file, {'version': SCHEMA_CACHE_VERSION, 'schema': asdict(schema)})
+    return schema
+
+
+def iter_wide_rows(reader, schema):
+    """
+    Melt rows of a wide_years file into long rows laid out as
+    [entity, element, year, value], skipping empty cells.
+    """
+    entity_col = schema.entity_col
+    element_col = schema.element_col
+    for row in reader:
+        if len(row) <= entity_col:
+            continue
+        entity = row[entity_col]
+        element = row[element_col] if element_col is not None and element_col < len(row) else ""
+        for col, year in schema.year_columns:
+            if col < len(row) and row[col] != "":
+                yield [entity, element, str(year), row[col]]
+
+
+def main():
+    if len(sys.argv) < 2:
+        print("Usage: python3 schema_detect.py <filename> [<filename> ...]")
+        sys.exit(1)
+
+    for file_path in sys.argv[1:]:
+        schema = detect_schema(file_path)
+        print(f"{file_path}: {schema.source} ({schema.layout})")
+        if schema.value_cols:
+            print(f"  Value columns: {[schema.header[i] for i in schema.value_cols]}")
+        if schema.year_columns:
+            print(f"  Year columns: {schema.year_columns[0][1]}-{schema.year_columns[-1][1]}")
+
+
+if __name__ == "__main__":
+    main()
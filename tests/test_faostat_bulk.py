@@ -0,0 +1,89 @@
+"""
+A FAOSTAT bulk zip is split into one cleaned, sorted and indexed dataset
+per element and item.
+
+    python3 -m unittest discover tests
+"""
+
+import contextlib
+import csv
+import io
+import os
+import sys
+import tempfile
+import unittest
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_DIR)
+
+# Normalized layout with Area Code (M49), Item Code (CPC) and Note columns,
+# AreaCodes and Flags members, China next to "China, mainland", a World
+# region, two elements and two items; rows grouped by area, years descending.
+SAMPLE_ZIP = os.path.join(PROJECT_DIR, 'tests', 'fixtures', 'faostat_bulk_sample.zip')
+
+
+def read_csv(path):
+    with open(path, newline='', encoding='utf-8') as f:
+        return list(csv.reader(f))
+
+
+class FaostatBulkTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        os.environ['CHARTLE_CACHE_DIR'] = os.path.join(self.tmp.name, '.cache')
+        import file_cache
+        file_cache.CACHE_DIR = os.environ['CHARTLE_CACHE_DIR']
+        self.out_dir = os.path.join(self.tmp.name, 'clean')
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def ingest(self, **kwargs):
+        from faostat_bulk import ingest_bulk_zip
+        with contextlib.redirect_stdout(io.StringIO()):
+            return ingest_bulk_zip(SAMPLE_ZIP, self.out_dir, **kwargs)
+
+    def test_partitions(self):
+        outputs = self.ingest(element='')
+        self.assertEqual(sorted(outputs), [
+            ('Area harvested', 'Apricots'), ('Area harvested', 'Cherries'),
+            ('Production', 'Apricots'), ('Production', 'Cherries'),
+        ])
+        self.assertEqual(os.path.basename(outputs['Production', 'Cherries']), 'production-of-cherries.csv')
+        self.assertEqual(os.path.basename(outputs['Area harvested', 'Apricots']),
+                         'area-harvested-of-apricots.csv')
+
+    def test_default_element_output_is_sorted_and_deduplicated(self):
+        outputs = self.ingest()
+        self.assertEqual(sorted(outputs), [('Production', 'Apricots'), ('Production', 'Cherries')])
+        self.assertEqual(read_csv(outputs['Production', 'Cherries']), [
+            ['Entity', 'CODE', 'Year', 'Value'],
+            ['China', 'CHN', '2000', '90'],
+            ['China', 'CHN', '2001', '91'],
+            ["Cote d'Ivoire", 'CIV', '2000', '3'],
+            ["Cote d'Ivoire", 'CIV', '2001', '4'],
+            ['France', 'FRA', '2000', '40'],
+            ['France', 'FRA', '2001', '41'],
+        ])
+
+    def test_outputs_are_indexed(self):
+        from offset_index import IndexedDataset
+        path = self.ingest(items=['Apricots'])['Production', 'Apricots']
+        self.assertTrue(os.path.exists(os.path.splitext(path)[0] + '.series.json'))
+        with IndexedDataset(path) as dataset:
+            self.assertEqual(sorted(dataset.codes()), ['CHN', 'CIV', 'FRA'])
+            self.assertEqual(dataset.series('FRA'), [['France', 'FRA', '2000', '40.5'],
+                                                     ['France', 'FRA', '2001', '41.5']])
+            self.assertEqual(len(dataset.year(2001)), 3)
+
+    def test_sort_long_rows_merges_spilled_runs(self):
+        from dataset_io import sort_long_rows
+        rows = [('B', 'BBB', 2001, '4'), ('A', 'AAA', 2001, '2'), ('B', 'BBB', 2000, '3'),
+                ('C', 'CCC', 2000, '5'), ('A', 'AAA', 2000, '1')]
+        out_path = os.path.join(self.tmp.name, 'sorted.csv')
+        sort_long_rows(iter(rows), ['Entity', 'Code', 'Year', 'Value'], out_path, chunk_rows=2)
+        self.assertEqual([row[3] for row in read_csv(out_path)[1:]], ['1', '2', '3', '4', '5'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,108 @@
+"""
+Pooled connections fall back to the other cached addresses of a host,
+re-resolve a host none of whose addresses answer, and go through the
+proxy configured in the environment.
+
+    python3 -m unittest discover tests
+"""
+
+import os
+import sys
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_DIR)
+
+PROXY_VARIABLES = ('http_proxy', 'https_proxy', 'no_proxy', 'all_proxy')
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        self.server.paths.append(self.path)
+        body = self.server.body
+        self.send_response(200)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def start_server(body):
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    server.body = body
+    server.paths = []
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def fetch(pool, url):
+    chunks = []
+    pool.stream(url, chunks.append)
+    return b''.join(chunks)
+
+
+class HTTPPoolTest(unittest.TestCase):
+    def setUp(self):
+        environ = {k: v for k, v in os.environ.items()
+                   if k.lower() not in PROXY_VARIABLES}
+        self.environ = mock.patch.dict(os.environ, environ, clear=True)
+        self.environ.start()
+        self.server = start_server(b'origin')
+        self.port = self.server.server_address[1]
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        self.environ.stop()
+
+    def test_falls_back_to_next_address(self):
+        from http_pool import ConnectionPool
+        pool = ConnectionPool()
+        # The server only listens on 127.0.0.1, so 127.0.0.2 refuses
+        pool.dns._addresses['localhost', self.port] = ['127.0.0.2', '127.0.0.1']
+        self.assertEqual(fetch(pool, f'http://localhost:{self.port}/a.csv'), b'origin')
+        self.assertEqual(pool.dns.resolve('localhost', self.port)[0], '127.0.0.1')
+        pool.close()
+
+    def test_unreachable_host_is_resolved_again(self):
+        from http_pool import ConnectionPool
+        pool = ConnectionPool()
+        pool.dns._addresses['localhost', self.port] = ['127.0.0.2']
+        with self.assertRaises(OSError):
+            fetch(pool, f'http://localhost:{self.port}/a.csv')
+        self.assertEqual(pool.dns.lookups, 0)
+        self.assertEqual(fetch(pool, f'http://localhost:{self.port}/a.csv'), b'origin')
+        self.assertEqual(pool.dns.lookups, 1)
+        pool.close()
+
+    def test_http_proxy_from_environment(self):
+        from http_pool import ConnectionPool
+        proxy = start_server(b'proxied')
+        try:
+            os.environ['http_proxy'] = f'http://127.0.0.1:{proxy.server_address[1]}'
+            pool = ConnectionPool()
+            url = f'http://example.invalid:{self.port}/a.csv?v=1'
+            self.assertEqual(fetch(pool, url), b'proxied')
+            self.assertEqual(proxy.paths, [url])
+            self.assertEqual(self.server.paths, [])
+            pool.close()
+
+            os.environ['no_proxy'] = 'localhost'
+            pool = ConnectionPool()
+            self.assertEqual(fetch(pool, f'http://localhost:{self.port}/b.csv'), b'origin')
+            self.assertEqual(proxy.paths, [url])
+            pool.close()
+        finally:
+            proxy.shutdown()
+            proxy.server_close()
+
+
+if __name__ == '__main__':
+    unittest.main()
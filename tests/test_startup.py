@@ -0,0 +1,39 @@
+"""
+The CLI starts within its budget and imports no subsystem eagerly, the
+same check as `chartle_data.py check-startup`.
+
+    python3 -m unittest discover tests
+"""
+
+import os
+import subprocess
+import sys
+import unittest
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_DIR)
+
+
+class StartupBudgetTest(unittest.TestCase):
+    def test_no_subsystem_imported_eagerly(self):
+        from chartle_data import measure_startup
+        _, eager = measure_startup(runs=1)
+        self.assertEqual(eager, [])
+
+    def test_within_budget(self):
+        from chartle_data import STARTUP_BUDGET_MS, measure_startup
+        best_ms, _ = measure_startup()
+        self.assertLessEqual(best_ms, STARTUP_BUDGET_MS)
+
+    def test_check_startup_exits_non_zero_over_budget(self):
+        result = subprocess.run(
+            [sys.executable, os.path.join(PROJECT_DIR, 'chartle_data.py'),
+             'check-startup', '--budget-ms', '0', '--runs', '1'],
+            capture_output=True, text=True,
+        )
+        self.assertEqual(result.returncode, 1)
+        self.assertIn('Startup budget exceeded', result.stdout)
+
+
+if __name__ == '__main__':
+    unittest.main()
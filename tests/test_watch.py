@@ -0,0 +1,82 @@
+"""
+A dataset dropped into backup/ reaches clean/ and the bundles of the
+configs using it, while data/ stays untouched.
+
+    python3 -m unittest discover tests
+"""
+
+import csv
+import json
+import os
+import sys
+import tempfile
+import unittest
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, PROJECT_DIR)
+
+CSV_URL = "https://ourworldindata.org/grapher/test-production.csv?v=1&csvType=full"
+HEADER = ['Entity', 'Code', 'Year', 'Test production']
+
+
+def write_csv(path, rows):
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        writer = csv.writer(f)
+        writer.writerow(HEADER)
+        writer.writerows(rows)
+
+
+def read_bundle():
+    with open(os.path.join('bundles', 'manifest.json'), encoding='utf-8') as f:
+        entry = json.load(f)['001_test']
+    with open(os.path.join('bundles', entry['file']), encoding='utf-8') as f:
+        return entry, f.read()
+
+
+class WatchBackupDropTest(unittest.TestCase):
+    def setUp(self):
+        self.cwd = os.getcwd()
+        self.tmp = tempfile.TemporaryDirectory()
+        os.chdir(self.tmp.name)
+        os.environ['CHARTLE_CACHE_DIR'] = os.path.join(self.tmp.name, '.cache')
+        import file_cache
+        file_cache.CACHE_DIR = os.environ['CHARTLE_CACHE_DIR']
+
+        for directory in ('config', 'data', 'backup'):
+            os.makedirs(directory)
+        with open(os.path.join('config', '001_test.json'), 'w', encoding='utf-8') as f:
+            json.dump({'csvUrl': CSV_URL, 'title': 'Test production', 'target': 'Spain'}, f)
+        write_csv(os.path.join('data', 'test-production.csv'),
+                  [['France', 'FRA', 2020, 10], ['Spain', 'ESP', 2020, 20]])
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+        self.tmp.cleanup()
+
+    def test_backup_download_updates_clean_copy_and_bundle(self):
+        import build_bundles
+        from watch import WATCH_DIRS, changed_paths, process_path, snapshot
+
+        build_bundles.main([os.path.join('config', '001_test.json')])
+        before_entry, before = read_bundle()
+        with open(os.path.join('data', 'test-production.csv'), 'rb') as f:
+            raw = f.read()
+
+        state = snapshot(WATCH_DIRS)
+        write_csv(os.path.join('backup', 'test-production.csv'),
+                  [['France', 'FRA', 2020, 10], ['Spain', 'ESP', 2020, 20], ['Spain', 'ESP', 2021, 777]])
+        changed = changed_paths(state, snapshot(WATCH_DIRS))
+        self.assertEqual(changed, [os.path.join('backup', 'test-production.csv')])
+
+        self.assertEqual(process_path(changed[0]), ['delta'])
+        after_entry, after = read_bundle()
+        self.assertNotEqual(before_entry['file'], after_entry['file'])
+        self.assertNotIn('777', before)
+        self.assertIn('777', after)
+        self.assertEqual(after_entry['dataset'], os.path.join('clean', 'test-production.csv'))
+        with open(os.path.join('data', 'test-production.csv'), 'rb') as f:
+            self.assertEqual(f.read(), raw)
+
+
+if __name__ == '__main__':
+    unittest.main()
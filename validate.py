@@ -0,0 +1,371 @@
+#!/usr/bin/env python3
+"""
+validate.py - Check cleaned datasets before they reach the game
+
+Each dataset is read once into flat columns (series id, year, value) and a
+list of declarative rules is run over those columns:
+
+- numeric      every value parses as a number (empty / NA cells are allowed)
+- unique_key   no duplicate (Code, Year) pairs
+- sorted       rows are grouped by country with increasing years
+- year_range   years lie within [min, max]
+- value_range  values lie within [min, max] (e.g. no negative production)
+- jumps        no year-on-year change by a factor of `max_ratio` or more
+- outliers     no value more than `max_zscore` standard deviations from its
+               country's mean (warning only)
+- target       the `target` country of every config/*.json using the dataset
+               has data, including in the latest year
+
+DEFAULT_RULES applies to every dataset; DATASET_RULES adds or overrides
+settings for file names matching a pattern. Checking stops early once a
+dataset has more than `max_errors` failing rows.
+
+Usage:
+    python3 validate.py [file ...] [--report report.json] [--max-errors 1000]
+
+Without files, every dataset referenced by config/*.json is checked. The exit
+status is 1 when any dataset has errors.
+"""
+
+import argparse
+import csv
+import datetime
+import fnmatch
+import glob
+import json
+import math
+import os
+import sys
+from array import array
+
+from schema_detect import detect_schema
+
+CONFIG_DIR = "config"
+MAX_EXAMPLES = 5
+DEFAULT_MAX_ERRORS = 1000
+
+DEFAULT_RULES = {
+    'numeric': {'severity': 'error'},
+    'unique_key': {'severity': 'error'},
+    'sorted': {'severity': 'warning'},
+    'year_range': {'severity': 'error', 'min': 1500, 'max': datetime.date.today().year + 1},
+    'value_range': {'severity': 'error', 'min': None, 'max': None},
+    'jumps': {'severity': 'error', 'max_ratio': 1000},
+    'outliers': {'severity': 'warning', 'max_zscore': 6.0, 'min_points': 8},
+    'target': {'severity': 'error'},
+}
+
+# Extra settings by file name pattern, applied in order on top of DEFAULT_RULES
+DATASET_RULES = [
+    ('*production*', {'value_range': {'min': 0}}),
+    ('*Production*', {'value_range': {'min': 0}}),
+    ('exports-of-*', {'value_range': {'min': 0}}),
+    ('imports-of-*', {'value_range': {'min': 0}}),
+    ('share-*', {'value_range': {'min': 0, 'max': 100}}),
+    ('GBD_*', {'value_range': {'min': 0}}),
+]
+
+LONG_SOURCES = ('owid_grapher', 'owid_explorer')
+WIDE_LAYOUTS = ('wide_years', 'wide_entities')
+
+
+def rules_for(file_path):
+    """Merge DEFAULT_RULES with every DATASET_RULES entry matching the file name."""
+    rules = {name: dict(settings) for name, settings in DEFAULT_RULES.items()}
+    name = os.path.basename(file_path)
+    for pattern, overrides in DATASET_RULES:
+        if fnmatch.fnmatchcase(name, pattern):
+            for rule, settings in overrides.items():
+                rules[rule].update(settings)
+    return rules
+
+
+class Columns:
+    """A dataset as flat columns. Series are identified by Code, or Entity when there is no code."""
+
+    def __init__(self):
+        self.series_ids = array('l')
+        self.years = array('l')
+        self.values = array('d')       # NaN for empty or non-numeric cells
+        self.series_names = []         # series id -> entity name
+        self.series_codes = []         # series id -> code ("" when the file has none)
+        self.series_keys = {}          # Code (or Entity) -> series id
+        self.bad_values = []           # (row number, raw value)
+        self.bad_years = []            # (row number, raw year)
+
+    def append(self, line, entity, code, year_text, value_text):
+        try:
+            year = int(year_text)
+        except ValueError:
+            self.bad_years.append((line, year_text))
+            return
+        key = code or entity
+        series_id = self.series_keys.get(key)
+        if series_id is None:
+            series_id = self.series_keys[key] = len(self.series_names)
+            self.series_names.append(entity)
+            self.series_codes.append(code)
+        if value_text in ("", "NA"):
+            value = math.nan
+        else:
+            try:
+                value = float(value_text)
+            except ValueError:
+                value = math.nan
+                self.bad_values.append((line, value_text))
+        self.series_ids.append(series_id)
+        self.years.append(year)
+        self.values.append(value)
+
+    def __len__(self):
+        return len(self.years)
+
+
+def load_columns(file_path, schema):
+    columns = Columns()
+    if schema.layout in WIDE_LAYOUTS:
+        from reshape import iter_wide_as_long
+        for line, (entity, code, year, value) in enumerate(iter_wide_as_long(file_path, schema), 2):
+            columns.append(line, entity, code, str(year), value)
+        return columns
+
+    entity_col, code_col = schema.entity_col, schema.code_col
+    year_col, value_col = schema.year_col, schema.value_col
+    width = max(col for col in (entity_col, code_col, year_col, value_col) if col is not None) + 1
+    with open(file_path, 'r', newline='', encoding='utf-8') as f:
+        reader = csv.reader(f)
+        next(reader, None)
+        for line, row in enumerate(reader, 2):
+            if len(row) < width:
+                continue
+            code = row[code_col] if code_col is not None else ""
+            columns.append(line, row[entity_col], code, row[year_col], row[value_col])
+    return columns
+
+
+# --- Rules: each takes (columns, settings) and returns a list of examples ---
+
+def check_numeric(columns, settings):
+    return [f"row {line}: value {raw!r}" for line, raw in columns.bad_values] + \
+           [f"row {line}: year {raw!r}" for line, raw in columns.bad_years]
+
+
+def check_unique_key(columns, settings):
+    seen = set()
+    failures = []
+    names = columns.series_names
+    for sid, year in zip(columns.series_ids, columns.years):
+        key = (sid, year)
+        if key in seen:
+            failures.append(f"{names[sid]} {year} appears more than once")
+        else:
+            seen.add(key)
+    return failures
+
+
+def check_sorted(columns, settings):
+    failures = []
+    finished = set()
+    names = columns.series_names
+    ids, years = columns.series_ids, columns.years
+    for i in range(1, len(ids)):
+        if ids[i] == ids[i - 1]:
+            if years[i] < years[i - 1]:
+                failures.append(f"{names[ids[i]]}: {years[i]} after {years[i - 1]}")
+        else:
+            finished.add(ids[i - 1])
+            if ids[i] in finished:
+                failures.append(f"{names[ids[i]]}: rows are not grouped together")
+    return failures
+
+
+def check_year_range(columns, settings):
+    low, high = settings.get('min'), settings.get('max')
+    names = columns.series_names
+    return [f"{names[sid]}: year {year}"
+            for sid, year in zip(columns.series_ids, columns.years)
+            if (low is not None and year < low) or (high is not None and year > high)]
+
+
+def check_value_range(columns, settings):
+    low, high = settings.get('min'), settings.get('max')
+    if low is None and high is None:
+        return []
+    low = -math.inf if low is None else low
+    high = math.inf if high is None else high
+    names = columns.series_names
+    # NaN compares False both ways, so missing values never fail
+    return [f"{names[sid]} {year}: {value:g}"
+            for sid, year, value in zip(columns.series_ids, columns.years, columns.values)
+            if value < low or value > high]
+
+
+def _series_slices(columns):
+    """Yield (series id, [(year, value), ...]) with values present, sorted by year."""
+    by_series = {}
+    for sid, year, value in zip(columns.series_ids, columns.years, columns.values):
+        if value == value:  # skip NaN
+            by_series.setdefault(sid, []).append((year, value))
+    for sid, points in by_series.items():
+        points.sort()
+        yield sid, points
+
+
+def check_jumps(columns, settings):
+    max_ratio = settings['max_ratio']
+    names = columns.series_names
+    failures = []
+    for sid, points in _series_slices(columns):
+        for (y0, v0), (y1, v1) in zip(points, points[1:]):
+            if v0 > 0 and v1 > 0 and (v1 / v0 >= max_ratio or v0 / v1 >= max_ratio):
+                failures.append(f"{names[sid]}: {v0:g} ({y0}) -> {v1:g} ({y1})")
+    return failures
+
+
+def check_outliers(columns, settings):
+    max_z, min_points = settings['max_zscore'], settings['min_points']
+    names = columns.series_names
+    failures = []
+    for sid, points in _series_slices(columns):
+        n = len(points)
+        if n < min_points:
+            continue
+        mean = sum(v for _, v in points) / n
+        std = math.sqrt(sum((v - mean) ** 2 for _, v in points) / n)
+        if std == 0:
+            continue
+        for year, value in points:
+            z = (value - mean) / std
+            if abs(z) > max_z:
+                failures.append(f"{names[sid]} {year}: {value:g} (z={z:.1f})")
+    return failures
+
+
+def check_target(columns, settings):
+    failures = []
+    names = columns.series_names
+    latest = max(columns.years) if len(columns) else None
+    for target in settings.get('targets', []):
+        sids = {sid for sid, name in enumerate(names) if name == target}
+        if not sids:
+            failures.append(f"target '{target}' is missing")
+            continue
+        years = [year for sid, year, value in zip(columns.series_ids, columns.years, columns.values)
+                 if sid in sids and value == value]
+        if not years:
+            failures.append(f"target '{target}' has no values")
+        elif max(years) < latest:
+            failures.append(f"target '{target}' has no value for {latest} (last {max(years)})")
+    return failures
+
+
+RULE_CHECKS = [
+    ('numeric', check_numeric),
+    ('unique_key', check_unique_key),
+    ('sorted', check_sorted),
+    ('year_range', check_year_range),
+    ('value_range', check_value_range),
+    ('jumps', check_jumps),
+    ('outliers', check_outliers),
+    ('target', check_target),
+]
+
+
+def targets_by_dataset():
+    """Map dataset paths to the `target` countries of the configs using them."""
+    from build_bundles import resolve_dataset
+
+    targets = {}
+    for config_path in sorted(glob.glob(os.path.join(CONFIG_DIR, "*.json"))):
+        try:
+            with open(config_path, 'r', encoding='utf-8') as f:
+                config = json.load(f)
+        except (OSError, ValueError):
+            continue
+        path = resolve_dataset(config.get('csvUrl', ''))
+        if path and config.get('target'):
+            targets.setdefault(os.path.normpath(path), []).append(config['target'])
+    return targets
+
+
+def validate_dataset(file_path, targets=(), max_errors=DEFAULT_MAX_ERRORS):
+    """Run every rule on one dataset and return its report dict."""
+    report = {'file': file_path, 'rows': 0, 'errors': 0, 'warnings': 0, 'checks': []}
+    schema = detect_schema(file_path)
+    report['schema'] = schema.source
+    if schema.source not in LONG_SOURCES and schema.layout not in WIDE_LAYOUTS:
+        report['status'] = 'unsupported'
+        return report
+
+    columns = load_columns(file_path, schema)
+    report['rows'] = len(columns)
+    rules = rules_for(file_path)
+    rules['target']['targets'] = list(targets)
+
+    for name, check in RULE_CHECKS:
+        if name == 'sorted' and schema.layout in WIDE_LAYOUTS:
+            continue  # melted wide files come out year by year
+        settings = rules[name]
+        if report['errors'] > max_errors:
+            report['checks'].append({'rule': name, 'status': 'skipped'})
+            continue
+        failures = check(columns, settings)
+        severity = settings['severity']
+        entry = {'rule': name, 'status': 'ok' if not failures else severity, 'count': len(failures)}
+        if failures:
+            entry['examples'] = failures[:MAX_EXAMPLES]
+            report['errors' if severity == 'error' else 'warnings'] += len(failures)
+        report['checks'].append(entry)
+
+    report['status'] = 'failed' if report['errors'] else 'ok'
+    return report
+
+
+def print_report(report):
+    mark = {'ok': '✓', 'failed': '✗', 'unsupported': '-'}[report['status']]
+    print(f"{mark} {report['file']} ({report['rows']} rows, {report['errors']} errors, "
+          f"{report['warnings']} warnings)")
+    for entry in report['checks']:
+        if entry['status'] in ('error', 'warning'):
+            print(f"    {entry['status']}: {entry['rule']} x{entry['count']}")
+            for example in entry['examples']:
+                print(f"      {example}")
+        elif entry['status'] == 'skipped':
+            print(f"    skipped: {entry['rule']} (error budget exceeded)")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Validate cleaned datasets.")
+    parser.add_argument('files', nargs='*', help="datasets to check (default: all used by config/*.json)")
+    parser.add_argument('--report', help="write the full report as JSON to this file")
+    parser.add_argument('--max-errors', type=int, default=DEFAULT_MAX_ERRORS,
+                        help="stop checking a dataset after this many failing rows")
+    args = parser.parse_args(argv)
+
+    targets = targets_by_dataset()
+    files = args.files or sorted(targets)
+    if not files:
+        print("No datasets to validate")
+        return 0
+
+    reports = []
+    for file_path in files:
+        if not os.path.exists(file_path):
+            print(f"Error: File '{file_path}' does not exist")
+            sys.exit(1)
+        report = validate_dataset(file_path, targets.get(os.path.normpath(file_path), ()), args.max_errors)
+        print_report(report)
+        reports.append(report)
+
+    if args.report:
+        with open(args.report, 'w', encoding='utf-8') as f:
+            json.dump({'datasets': reports}, f, indent=2, ensure_ascii=False)
+        print(f"\nReport saved to {args.report}")
+
+    failed = sum(1 for r in reports if r['status'] == 'failed')
+    print(f"\n{len(reports) - failed}/{len(reports)} datasets passed")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+"""
+watch.py - Reprocess datasets as soon as they land in data/, backup/ or config/
+
+Runs until interrupted. New or modified files are debounced (a burst of writes
+to the same file triggers one run) and only the affected stages are sent to a
+worker pool:
+
+- raw FAOSTAT file in data/ or backup/  -> FAOstat_clean into clean/, then rebuild
+                                           bundles of configs using the cleaned file
+- long dataset with codes in data/ or backup/
+                                        -> delta_refresh onto clean/<name> (seeded
+                                           from data/<name> the first time), which
+                                           also updates its .series.json, index,
+                                           catalog entry and bundles
+- any other dataset in data/ or backup/ -> refresh its .series.json (if one exists)
+                                           and rebuild bundles of configs using it
+- config/*.json                          -> rebuild that puzzle's bundle
+
+File changes are picked up with the `watchdog` package (inotify on Linux) when
+it is installed, and by polling file modification times otherwise.
+
+Usage:
+    python3 watch.py [--interval 1.0] [--debounce 2.0] [--workers 2]
+"""
+
+import argparse
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+try:
+    from watchdog.events import FileSystemEventHandler
+    from watchdog.observers import Observer
+except ImportError:  # polling fallback
+    Observer = None
+    FileSystemEventHandler = object
+
+WATCH_DIRS = ["data", "backup", "config"]
+DATA_DIR = "data"
+CONFIG_DIR = "config"
+
+# Files written by the pipeline itself, never treated as new input
+IGNORED_SUFFIXES = ('.series.json', '.delta.json', '.tmp', '.part', '_original_backup.csv')
+
+RAW_FAOSTAT_SOURCES = ('faostat_undata', 'faostat_normalized', 'faostat_bulk_wide')
+
+
+def is_watched_file(path):
+    if path.endswith(IGNORED_SUFFIXES) or os.path.basename(path).startswith('.'):
+        return False
+    if os.path.dirname(path).endswith(CONFIG_DIR):
+        return path.endswith('.json')
+    return path.endswith('.csv')
+
+
+def snapshot(dirs):
+    """Return {path: (mtime_ns, size)} for every watched file in `dirs`."""
+    state = {}
+    for directory in dirs:
+        if not os.path.isdir(directory):
+            continue
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                if entry.is_file() and is_watched_file(entry.path):
+                    st = entry.stat()
+                    state[entry.path] = (st.st_mtime_ns, st.st_size)
+    return state
+
+
+def changed_paths(old, new):
+    """Paths that were added or modified between two snapshots."""
+    return [path for path, sig in new.items() if old.get(path) != sig]
+
+
+def process_path(path):
+    """
+    Run the pipeline stages affected by a change to `path`.
+    Executed in a worker process; returns a list of completed stage names.
+    """
+    import build_bundles
+
+    done = []
+    if not os.path.exists(path):
+        return done
+
+    if os.path.dirname(path).endswith(CONFIG_DIR):
+        build_bundles.main([path])
+        return ['bundle']
+
+    from schema_detect import detect_schema
+
+    schema = detect_schema(path)
+    if schema.source in RAW_FAOSTAT_SOURCES:
+        from FAOstat_clean import clean_faostat_dataset
+        # The raw file is left as is; later stages work on the cleaned copy
+        path = clean_faostat_dataset(path)
+        done.append('clean')
+    elif schema.layout == 'long' and schema.code_col is not None:
+        from delta_refresh import delta_is_empty, refresh_clean_copy
+        # Applied to clean/<name>, which bundles resolve before data/ and backup/
+        _, delta = refresh_clean_copy(path, os.path.join(DATA_DIR, os.path.basename(path)))
+        return ['delta'] if not delta_is_empty(delta) else ['up to date']
+
+    from reshape import series_path_for, write_series_for
+    if os.path.exists(series_path_for(path)):
+        write_series_for(path)
+        done.append('series')
+
+    configs = build_bundles.configs_using(path)
+    if configs:
+        build_bundles.main(configs)
+        done.append('bundle')
+    return done
+
+
+class _EventHandler(FileSystemEventHandler):
+    def __init__(self, watcher):
+        self.watcher = watcher
+
+    def on_any_event(self, event):
+        if not event.is_directory:
+            for path in (getattr(event, 'src_path', None), getattr(event, 'dest_path', None)):
+                if path:
+                    self.watcher.notify(os.path.relpath(path))
+
+
+class Watcher:
+    """Debounces file changes and dispatches them to a process pool."""
+
+    def __init__(self, dirs=WATCH_DIRS, interval=1.0, debounce=2.0, workers=2):
+        self.dirs = dirs
+        self.interval = interval
+        self.debounce = debounce
+        self.pool = ProcessPoolExecutor(max_workers=workers)
+        self.pending = {}      # path -> time of the last change
+        self.in_flight = set()
+        self.lock = threading.Lock()
+        self.state = snapshot(dirs)
+
+    def notify(self, path):
+        if is_watched_file(path):
+            with self.lock:
+                self.pending[path] = time.monotonic()
+
+    def poll(self):
+        new_state = snapshot(self.dirs)
+        for path in changed_paths(self.state, new_state):
+            self.notify(path)
+        self.state = new_state
+
+    def dispatch_ready(self):
+        """Send paths that have been quiet for `debounce` seconds to the pool."""
+        now = time.monotonic()
+        with self.lock:
+            ready = [p for p, t in self.pending.items()
+                     if now - t >= self.debounce and p not in self.in_flight]
+            for path in ready:
+                del self.pending[path]
+                self.in_flight.add(path)
+
+        for path in ready:
+            print(f"→ {path} changed, processing")
+            future = self.pool.submit(process_path, path)
+            future.add_done_callback(lambda f, p=path: self._finished(p, f))
+
+    def _finished(self, path, future):
+        with self.lock:
+            self.in_flight.discard(path)
+        try:
+            stages = future.result()
+            print(f"✓ {path}: {', '.join(stages) if stages else 'nothing to do'}")
+        except Exception as e:
+            print(f"✗ {path}: {e}")
+        # Stages write to clean/, .series.json files and bundles/, none of
+        # which are watched, so processing a file never re-triggers itself.
+
+    def run(self):
+        observer = None
+        if Observer is not None:
+            observer = Observer()
+            handler = _EventHandler(self)
+            for directory in self.dirs:
+                if os.path.isdir(directory):
+                    observer.schedule(handler, directory, recursive=False)
+            observer.start()
+            print(f"Watching {', '.join(self.dirs)} (inotify via watchdog)")
+        else:
+            print(f"Watching {', '.join(self.dirs)} (polling every {self.interval}s)")
+
+        try:
+            while True:
+                if observer is None:
+                    self.poll()
+                self.dispatch_ready()
+                time.sleep(min(self.interval, self.debounce))
+        except KeyboardInterrupt:
+            print("\nStopping watcher")
+        finally:
+            if observer is not None:
+                observer.stop()
+                observer.join()
+            self.pool.shutdown(wait=True)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Reprocess datasets when files change.")
+    parser.add_argument('--interval', type=float, default=1.0, help="polling interval in seconds")
+    parser.add_argument('--debounce', type=float, default=2.0, help="quiet time before processing a file")
+    parser.add_argument('--workers', type=int, default=2, help="worker processes")
+    args = parser.parse_args(argv)
+    Watcher(interval=args.interval, debounce=args.debounce, workers=args.workers).run()
+
+
+if __name__ == "__main__":
+    main()